@@ -1,5 +1,5 @@
 import axios from "axios";
-import { TenderSearchResult } from "../types/search";
+import { TenderFacetedSearchResult, TenderSearchResult } from "../types/search";
 import { DatabaseService } from "./databaseService";
 import { Database } from "../database.types";
 
@@ -16,6 +16,8 @@ interface ElasticsearchSearchParams {
   publication_date_after?: string;
   publication_date_before?: string;
   limit?: number;
+  // Defaults to true: one result per cross-source duplicate cluster
+  collapse_duplicates?: boolean;
 }
 
 export class MlService {
@@ -106,6 +108,84 @@ export class MlService {
     }
   }
 
+  async searchTendersWithFacets(
+    params: ElasticsearchSearchParams
+  ): Promise<TenderFacetedSearchResult> {
+    try {
+      const response = await axios.post(
+        `${this.baseUrl}/elasticsearch/search/faceted`,
+        params,
+        {
+          headers: {
+            "Content-Type": "application/json",
+          },
+          timeout: 30000, // 30 second timeout
+        }
+      );
+      return response.data;
+    } catch (error: any) {
+      if (error.code === "ECONNREFUSED") {
+        throw new Error(
+          "ML service unavailable: Elasticsearch backend is not running"
+        );
+      } else if (error.response) {
+        throw new Error(
+          `Elasticsearch faceted search failed: ${error.response.status} - ${error.response.data}`
+        );
+      } else {
+        throw new Error(`ML service error: ${error.message}`);
+      }
+    }
+  }
+
+  // Runs several searches in one request; results come back in request order
+  async searchTendersBatch(
+    searches: ElasticsearchSearchParams[]
+  ): Promise<TenderSearchResult[][]> {
+    try {
+      const response = await axios.post(
+        `${this.baseUrl}/elasticsearch/search/batch`,
+        searches,
+        {
+          headers: {
+            "Content-Type": "application/json",
+          },
+          timeout: 60000, // 60 second timeout
+        }
+      );
+      return response.data;
+    } catch (error: any) {
+      if (error.code === "ECONNREFUSED") {
+        throw new Error(
+          "ML service unavailable: Elasticsearch backend is not running"
+        );
+      } else if (error.response) {
+        throw new Error(
+          `Elasticsearch batch search failed: ${error.response.status} - ${error.response.data}`
+        );
+      } else {
+        throw new Error(`ML service error: ${error.message}`);
+      }
+    }
+  }
+
+  // Typeahead completions; cheap enough to call on every keystroke
+  async suggestTenders(
+    prefix: string,
+    size = 8
+  ): Promise<{ text: string; score: number }[]> {
+    try {
+      const response = await axios.get(`${this.baseUrl}/elasticsearch/suggest`, {
+        params: { q: prefix, size },
+        timeout: 2000,
+      });
+      return response.data;
+    } catch (error: any) {
+      console.error("❌ Suggest failed:", error.message);
+      return [];
+    }
+  }
+
   async syncTendersToElasticsearch() {
     try {
       console.log("🔄 Starting Elasticsearch sync...");
@@ -78,3 +78,16 @@ export interface SearchTendersResponse {
     max_score?: number;
   };
 }
+
+export interface TenderFacetedSearchResult {
+  results: TenderSearchResult[];
+  // Facet field -> value -> count. closing_date uses the
+  // closed / next_7_days / next_30_days / later buckets.
+  facets: {
+    delivery_location?: Record<string, number>;
+    category_primary?: Record<string, number>;
+    procurement_method?: Record<string, number>;
+    status?: Record<string, number>;
+    closing_date?: Record<string, number>;
+  };
+}
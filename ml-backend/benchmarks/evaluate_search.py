@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Offline relevance and recall evaluation for search modes.
+
+For each query in a labelled set, every registered search mode is compared
+against the exact-cosine baseline (brute-force cosine over all tenders that
+pass the same filters) and, when the query carries labels, against those
+labels too. recall@k, nDCG@k and latency percentiles are reported side by
+side so faster modes can be judged on the speed/quality trade-off.
+
+Query set format (JSON list or JSONL), labels optional:
+    {"query": "snow removal", "filters": {"regions": ["Ontario"]},
+     "relevant": {"<tender id>": 3, "<tender id>": 1}}
+
+Usage:
+    python benchmarks/evaluate_search.py --queries eval/queries.jsonl -k 10
+    python benchmarks/evaluate_search.py --synthetic 5000 --real-embeddings   # fake ES, generated corpus
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import our services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+os.environ.setdefault("ELASTICSEARCH_URL", "http://localhost:9200")
+
+from benchmarks.fake_elasticsearch import FakeElasticsearch
+from benchmarks.run_benchmarks import bench_bulk_index, git_commit, percentiles
+from benchmarks.synthetic import SyntheticTenders
+from services.vector_index import VectorIndex
+
+# A mode takes (service, query text, filters, k) and returns ranked tender ids
+SearchMode = Callable[[Any, str, Dict[str, Any], int], List[str]]
+
+
+def hybrid_mode(service, query: str, filters: Dict[str, Any], k: int) -> List[str]:
+    """The production search_tenders scoring (vector + multi_match)"""
+    return [result["id"] for result in service.search_tenders(query=query, limit=k, **filters)]
+
+
+def vector_index_mode(service, query: str, filters: Dict[str, Any], k: int) -> List[str]:
+    """In-process NumPy index used when Elasticsearch is unavailable"""
+    from services.search_service import CLOSED_STATUSES, TENDERS_INDEX
+
+    query_embedding = service.model.encode(query).tolist()
+    # Same hot/archive scope as the Elasticsearch modes
+    hot_only = service._search_indices(filters) == TENDERS_INDEX
+    hits = service.vector_index.search(query_embedding, limit=k,
+                                       exclude_closed_statuses=CLOSED_STATUSES if hot_only else None, **filters)
+    return [tender_id for tender_id, _ in hits]
+
+
+def prepare_vector_index(service):
+    """Build the in-process index from whatever is indexed in ES, outside the timed loop"""
+    if service.vector_index is None:
+        service.vector_index = VectorIndex(tempfile.mkdtemp(prefix="vector-index-eval-"))
+    service.refresh_vector_index(service.scan_tenders())
+
+
+SEARCH_MODES: Dict[str, SearchMode] = {
+    "hybrid": hybrid_mode,
+    "vector_index": vector_index_mode,
+}
+
+# Setup that must run once before a mode is timed
+MODE_SETUP: Dict[str, Callable[[Any], None]] = {
+    "vector_index": prepare_vector_index,
+}
+
+
+def exact_cosine(service, query: str, filters: Dict[str, Any], k: int) -> List[Dict[str, Any]]:
+    """Brute-force cosine top-k with the same filters; the ground truth for recall"""
+    query_embedding = service.model.encode(query).tolist()
+    body = {
+        "size": k,
+        "_source": ["id"],
+        "query": {
+            "script_score": {
+                "query": {"bool": {"filter": service._build_filters(**filters) + [{"exists": {"field": service.vector_field}}]}},
+                "script": {
+                    "source": f"cosineSimilarity(params.query_vector, '{service.vector_field}') + 1.0",
+                    "params": {"query_vector": query_embedding}
+                }
+            }
+        }
+    }
+    response = service.es.search(index=service._search_indices(filters), body=body)
+    return [{"id": hit["_source"]["id"], "similarity": hit["_score"] - 1.0} for hit in response["hits"]["hits"]]
+
+
+def recall_at_k(ranked: List[str], relevant: List[str], k: int) -> float:
+    if not relevant:
+        return 1.0
+    return len(set(ranked[:k]) & set(relevant)) / min(k, len(relevant))
+
+
+def ndcg_at_k(ranked: List[str], gains: Dict[str, float], k: int) -> float:
+    """nDCG with graded gains; ids missing from `gains` count as irrelevant"""
+    dcg = sum(gains.get(doc_id, 0.0) / math.log2(rank + 2) for rank, doc_id in enumerate(ranked[:k]))
+    ideal = sorted(gains.values(), reverse=True)[:k]
+    idcg = sum(gain / math.log2(rank + 2) for rank, gain in enumerate(ideal))
+    return dcg / idcg if idcg > 0 else 1.0
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        queries = json.loads(text)
+    else:
+        queries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for item in queries:
+        item.setdefault("filters", {})
+        if isinstance(item.get("relevant"), list):
+            item["relevant"] = {doc_id: 1.0 for doc_id in item["relevant"]}
+    return queries
+
+
+def evaluate(service, queries: List[Dict[str, Any]], modes: Dict[str, SearchMode], k: int) -> Dict[str, Any]:
+    """Score every mode on every query; returns averaged metrics per mode"""
+    baseline_latencies = []
+    per_mode = {name: {"recall": [], "ndcg": [], "label_recall": [], "label_ndcg": [], "latency": []} for name in modes}
+
+    for item in queries:
+        t0 = time.perf_counter()
+        exact = exact_cosine(service, item["query"], item["filters"], k)
+        baseline_latencies.append((time.perf_counter() - t0) * 1000)
+        exact_ids = [hit["id"] for hit in exact]
+        # Cosine similarity is the graded gain, so swaps near the top cost more than at the tail
+        exact_gains = {hit["id"]: max(hit["similarity"], 0.0) for hit in exact}
+        labels = item.get("relevant")
+
+        for name, mode in modes.items():
+            t0 = time.perf_counter()
+            ranked = mode(service, item["query"], item["filters"], k)
+            stats = per_mode[name]
+            stats["latency"].append((time.perf_counter() - t0) * 1000)
+            stats["recall"].append(recall_at_k(ranked, exact_ids, k))
+            stats["ndcg"].append(ndcg_at_k(ranked, exact_gains, k))
+            if labels:
+                stats["label_recall"].append(recall_at_k(ranked, list(labels), k))
+                stats["label_ndcg"].append(ndcg_at_k(ranked, labels, k))
+
+    def mean(values: List[float]) -> Optional[float]:
+        return round(sum(values) / len(values), 4) if values else None
+
+    report = {"exact_cosine": {"latency": percentiles(baseline_latencies)}}
+    for name, stats in per_mode.items():
+        report[name] = {
+            f"recall@{k}": mean(stats["recall"]),
+            f"ndcg@{k}": mean(stats["ndcg"]),
+            f"label_recall@{k}": mean(stats["label_recall"]),
+            f"label_ndcg@{k}": mean(stats["label_ndcg"]),
+            "latency": percentiles(stats["latency"]),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate search quality against the exact-cosine baseline")
+    parser.add_argument("--queries", help="Labelled query set (JSON or JSONL)")
+    parser.add_argument("-k", type=int, default=10, help="Cut-off for recall@k and nDCG@k")
+    parser.add_argument("--modes", default=",".join(SEARCH_MODES), help=f"Comma-separated subset of: {', '.join(SEARCH_MODES)}")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Index this many synthetic tenders into an in-process fake ES before evaluating")
+    parser.add_argument("--synthetic-queries", type=int, default=100)
+    parser.add_argument("--real-embeddings", action="store_true", help="Encode synthetic tenders with the model")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write the JSON report here as well as stdout")
+    args = parser.parse_args()
+
+    if not args.queries and not args.synthetic:
+        parser.error("pass --queries, --synthetic, or both")
+    if args.synthetic:
+        # The synthetic corpus lives in a fake ES; keep its index name clear of a TENDERS_INDEX from .env
+        os.environ["TENDERS_INDEX"] = "tenders_eval"
+        os.environ.pop("TENDERS_ARCHIVE_INDEX", None)
+
+    from services.search_service import search_service
+
+    queries = load_queries(args.queries) if args.queries else []
+    if args.synthetic:
+        search_service.es = FakeElasticsearch()
+        generator = SyntheticTenders(search_service._tenders_index_mapping()["mappings"]["properties"], seed=args.seed)
+        bench_bulk_index(search_service, generator, args.synthetic, 500, args.real_embeddings)
+        if not queries:
+            queries = [{"query": request.pop("query"), "filters": request}
+                       for request in generator.queries(args.synthetic_queries)]
+
+    modes = {name: SEARCH_MODES[name] for name in args.modes.split(",")}
+    for name in modes:
+        if name in MODE_SETUP:
+            MODE_SETUP[name](search_service)
+    report = {
+        "meta": {"commit": git_commit(), "k": args.k, "queries": len(queries), "synthetic": args.synthetic},
+        "modes": evaluate(search_service, queries, modes, args.k),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
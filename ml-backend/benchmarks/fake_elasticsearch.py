@@ -0,0 +1,678 @@
+"""
+In-process stand-in for the subset of the Elasticsearch client that
+SearchService uses. It keeps documents in memory, scores vectors with NumPy
+and text with a tiny inverted index, so benchmarks and evaluations can run
+without a cluster. Scores are not BM25 - use it for throughput and for
+comparing ml-backend code paths, not for absolute relevance numbers.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import re
+import threading
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercase word tokens, good enough to stand in for the english analyzer"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _parse_field_boost(field: str) -> Tuple[str, float]:
+    if "^" in field:
+        name, boost = field.split("^", 1)
+        return name, float(boost)
+    return field, 1.0
+
+
+_DATE_UNITS = {"d": "days", "h": "hours", "m": "minutes"}
+_DATE_MATH_RE = re.compile(r"^now(?:([+-])(\d+)([dhmMy]))?(?:/([dh]))?$")
+
+
+def _resolve_date_math(value: Any) -> Any:
+    """Support the now[+-N(d|h|m|M|y)][/d|/h] forms the services send"""
+    if not isinstance(value, str) or not value.startswith("now"):
+        return value
+    match = _DATE_MATH_RE.match(value)
+    moment = datetime.now(timezone.utc).replace(tzinfo=None)
+    if match and match.group(1):
+        amount = int(match.group(2)) * (1 if match.group(1) == "+" else -1)
+        unit = match.group(3)
+        if unit in ("d", "h", "m"):
+            moment += timedelta(**{_DATE_UNITS[unit]: amount})
+        else:
+            moment += timedelta(days=amount * (30 if unit == "M" else 365))
+    if match and match.group(4) == "d":
+        moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif match and match.group(4) == "h":
+        moment = moment.replace(minute=0, second=0, microsecond=0)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class _FakeIndex:
+    def __init__(self, body: Optional[Dict[str, Any]]):
+        body = body or {}
+        self.settings = body.get("settings", {})
+        self.properties = body.get("mappings", {}).get("properties", {})
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        # Per-document sequence numbers for conditional writes (if_seq_no)
+        self.seq_nos: Dict[str, int] = {}
+        self._next_seq_no = 0
+        self._snapshot = None
+
+    def put(self, doc_id: str, doc: Dict[str, Any]) -> int:
+        self.docs[str(doc_id)] = doc
+        self.seq_nos[str(doc_id)] = self._next_seq_no
+        self._next_seq_no += 1
+        self._snapshot = None
+        return self.seq_nos[str(doc_id)]
+
+    def delete(self, doc_id: str) -> bool:
+        removed = self.docs.pop(str(doc_id), None) is not None
+        self.seq_nos.pop(str(doc_id), None)
+        if removed:
+            self._snapshot = None
+        return removed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Columnar view of the index, rebuilt lazily after writes"""
+        if self._snapshot is not None:
+            return self._snapshot
+        ids = list(self.docs)
+        sources = [self.docs[i] for i in ids]
+        vectors = {}
+        postings = {}
+        for field, spec in self.properties.items():
+            field_type = spec.get("type")
+            if field_type == "dense_vector":
+                dims = spec.get("dims", 0)
+                matrix = np.zeros((len(ids), dims), dtype=np.float32)
+                for row, src in enumerate(sources):
+                    value = src.get(field)
+                    if value is not None and len(value) == dims:
+                        matrix[row] = value
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                vectors[field] = matrix / norms
+            elif field_type == "text":
+                field_postings: Dict[str, List[int]] = {}
+                for row, src in enumerate(sources):
+                    for token in set(tokenize(src.get(field))):
+                        field_postings.setdefault(token, []).append(row)
+                postings[field] = {t: np.asarray(rows, dtype=np.int64) for t, rows in field_postings.items()}
+        self._snapshot = {"ids": ids, "sources": sources, "vectors": vectors, "postings": postings}
+        return self._snapshot
+
+
+class _Indices:
+    def __init__(self, client: "FakeElasticsearch"):
+        self._client = client
+
+    def exists(self, index: str, **kwargs) -> bool:
+        return all(name in self._client._indices for name in index.split(","))
+
+    def create(self, index: str, body: Optional[Dict[str, Any]] = None, ignore=None, **kwargs) -> Dict[str, Any]:
+        with self._client._lock:
+            if index in self._client._indices:
+                return {"error": {"type": "resource_already_exists_exception"}, "status": 400}
+            if body is None:
+                body = {k: v for k, v in kwargs.items() if k in ("mappings", "settings")}
+            self._client._indices[index] = _FakeIndex(body)
+        return {"acknowledged": True, "index": index}
+
+    def delete(self, index: str, **kwargs) -> Dict[str, Any]:
+        with self._client._lock:
+            for name in index.split(","):
+                self._client._indices.pop(name, None)
+        return {"acknowledged": True}
+
+    def refresh(self, index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        return {"_shards": {"failed": 0}}
+
+    def put_mapping(self, index: str, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        with self._client._lock:
+            target = self._client._get_index(index)
+            target.properties.update((body or kwargs).get("properties", {}))
+            target._snapshot = None
+        return {"acknowledged": True}
+
+    def get_mapping(self, index: str, **kwargs) -> Dict[str, Any]:
+        return {index: {"mappings": {"properties": self._client._get_index(index).properties}}}
+
+    def put_settings(self, index: str, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        with self._client._lock:
+            target = self._client._get_index(index)
+            target.settings.setdefault("index", {}).update((body or kwargs.get("settings", {})).get("index", {}))
+        return {"acknowledged": True}
+
+    def get_settings(self, index: str, **kwargs) -> Dict[str, Any]:
+        return {name: {"settings": self._client._get_index(name).settings} for name in index.split(",")}
+
+
+class _Cluster:
+    def health(self, **kwargs) -> Dict[str, Any]:
+        return {"status": "green", "number_of_nodes": 1}
+
+
+class FakeElasticsearch:
+    """Drop-in replacement for `Elasticsearch` covering SearchService's calls"""
+
+    def __init__(self):
+        self._indices: Dict[str, _FakeIndex] = {}
+        self._lock = threading.Lock()
+        self.indices = _Indices(self)
+        self.cluster = _Cluster()
+        self._percolator_slots = {}
+        self._named_masks = {}
+
+    def _get_index(self, name: str) -> _FakeIndex:
+        if name not in self._indices:
+            raise KeyError(f"index_not_found_exception: {name}")
+        return self._indices[name]
+
+    def _auto_create(self, name: str) -> _FakeIndex:
+        if name not in self._indices:
+            self._indices[name] = _FakeIndex(None)
+        return self._indices[name]
+
+    # Document APIs
+
+    def index(self, index: str, id: str, body: Optional[Dict[str, Any]] = None,
+              document: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            self._auto_create(index).put(id, body if body is not None else document)
+        return {"_index": index, "_id": id, "result": "created"}
+
+    def get(self, index: str, id: str, **kwargs) -> Dict[str, Any]:
+        doc = self._get_index(index).docs.get(str(id))
+        if doc is None:
+            raise KeyError(f"document {id} not found in {index}")
+        return {"_index": index, "_id": id, "found": True, "_source": doc}
+
+    def delete(self, index: str, id: str, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            removed = self._get_index(index).delete(id)
+        return {"_index": index, "_id": id, "result": "deleted" if removed else "not_found"}
+
+    def bulk(self, operations: List[Dict[str, Any]], refresh: Any = False, **kwargs) -> Dict[str, Any]:
+        items = []
+        with self._lock:
+            ops = iter(operations)
+            for action in ops:
+                op_type, meta = next(iter(action.items()))
+                target = self._auto_create(meta.get("_index", kwargs.get("index")))
+                existed = str(meta["_id"]) in target.docs
+                document = next(ops) if op_type != "delete" else None
+                stale = "if_seq_no" in meta and target.seq_nos.get(str(meta["_id"])) != meta["if_seq_no"]
+                if stale or (op_type == "create" and existed):
+                    items.append({op_type: {"_index": meta.get("_index"), "_id": meta["_id"], "status": 409,
+                                            "error": {"type": "version_conflict_engine_exception"}}})
+                    continue
+                seq_no = None
+                if op_type == "delete":
+                    target.delete(meta["_id"])
+                    result = "deleted" if existed else "not_found"
+                elif op_type == "update":
+                    merged = dict(target.docs.get(str(meta["_id"]), {}))
+                    merged.update(document.get("doc", {}))
+                    seq_no = target.put(meta["_id"], merged)
+                    result = "updated"
+                else:
+                    seq_no = target.put(meta["_id"], document)
+                    result = "updated" if existed else "created"
+                items.append({op_type: {"_index": meta.get("_index"), "_id": meta["_id"], "status": 200, "result": result,
+                                        "_seq_no": seq_no, "_primary_term": 1}})
+        return {"errors": any(next(iter(item.values())).get("error") for item in items), "items": items}
+
+    def mget(self, index: Optional[str] = None, body: Optional[Dict[str, Any]] = None, ids: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+        # Either ids against one index, or a `docs` list naming the index per document
+        requests = [{"_index": index, "_id": doc_id} for doc_id in (ids if ids is not None else (body or {}).get("ids", []))]
+        requests += (body or {}).get("docs", [])
+        docs = []
+        for request in requests:
+            target = self._indices.get(request["_index"])
+            source = target.docs.get(str(request["_id"])) if target is not None else None
+            if source is not None and "_source" in request:
+                source = self._filter_source(source, request["_source"])
+            docs.append({"_index": request["_index"], "_id": request["_id"], "found": source is not None,
+                         **({"_source": source} if source is not None else {})})
+        return {"docs": docs}
+
+    def count(self, index: str, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        query = (body or {}).get("query", kwargs.get("query"))
+        if query is None:
+            return {"count": sum(len(self._get_index(name).docs) for name in index.split(","))}
+        return {"count": self.search(index=index, body={"query": query, "size": 0})["hits"]["total"]["value"]}
+
+    # Search
+
+    def search(self, index: str, body: Optional[Dict[str, Any]] = None, size: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        body = dict(body or {})
+        for key in ("query", "sort", "_source", "from_"):
+            if key in kwargs:
+                body[key.rstrip("_")] = kwargs[key]
+        if size is not None:
+            body["size"] = size
+
+        rows = []  # (index name, snapshot, mask, scores)
+        self._percolator_slots = {}
+        self._named_masks = {}
+        for name in index.split(","):
+            self._current_index = self._get_index(name)
+            snap = self._current_index.snapshot()
+            mask, scores = self._evaluate(snap, body.get("query", {"match_all": {}}))
+            rows.append((name, snap, mask, scores))
+
+        aggregations = {}
+        if body.get("aggs") or body.get("aggregations"):
+            aggregations = self._aggregate(rows, body.get("aggs") or body.get("aggregations"))
+        if body.get("post_filter"):
+            rows = [(name, snap, mask & self._evaluate(snap, body["post_filter"])[0], scores)
+                    for name, snap, mask, scores in rows]
+
+        candidates = []
+        for name, snap, mask, scores in rows:
+            for pos in np.flatnonzero(mask):
+                candidates.append((name, snap, int(pos), float(scores[pos])))
+
+        start = int(body.get("from", 0))
+        limit = int(body.get("size", 10))
+        sort_spec = body.get("sort") or [{"_score": {"order": "desc"}}]
+        search_after = body.get("search_after")
+        ordered = self._sort(candidates, sort_spec, start + limit if search_after is None else None)
+        if search_after is not None:
+            ordered = [c for c in ordered if self._is_after(c, search_after, sort_spec)]
+        if body.get("collapse"):
+            # Keep the first (best sorted) hit per value of the collapse field
+            field = body["collapse"]["field"]
+            seen = set()
+            collapsed = []
+            for candidate in ordered if search_after is not None else self._sort(candidates, sort_spec, None):
+                value = candidate[1]["sources"][candidate[2]].get(field)
+                if value not in seen:
+                    seen.add(value)
+                    collapsed.append(candidate)
+            ordered = collapsed
+
+        hits = []
+        for name, snap, pos, score in ordered[start:start + limit]:
+            source = snap["sources"][pos]
+            hit = {
+                "_index": name,
+                "_id": snap["ids"][pos],
+                "_score": score,
+                "_source": self._filter_source(source, body.get("_source", True)),
+                "sort": [self._sort_value(source, score, spec)[1] for spec in sort_spec],
+            }
+            if body.get("seq_no_primary_term"):
+                hit["_seq_no"], hit["_primary_term"] = self._indices[name].seq_nos.get(snap["ids"][pos], 0), 1
+            matched = [name for name, named_mask in self._named_masks.get(id(snap), {}).items() if named_mask[pos]]
+            if matched:
+                hit["matched_queries"] = matched
+            if body.get("highlight"):
+                highlight = self._highlight(source, body["highlight"], body.get("query", {}))
+                if highlight:
+                    hit["highlight"] = highlight
+            slots = self._percolator_slots.get((id(snap), pos))
+            if slots is not None:
+                hit["fields"] = {"_percolator_document_slot": slots}
+            hits.append(hit)
+        response = {
+            "took": 0,
+            "timed_out": False,
+            "hits": {"total": {"value": len(candidates), "relation": "eq"}, "max_score": hits[0]["_score"] if hits else None, "hits": hits},
+        }
+        if aggregations:
+            response["aggregations"] = aggregations
+        if body.get("suggest"):
+            response["suggest"] = {
+                name: [self._complete(index, spec["prefix"], spec["completion"])]
+                for name, spec in body["suggest"].items()
+            }
+        return response
+
+    @staticmethod
+    def _highlight(source: Dict[str, Any], spec: Dict[str, Any], query: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Tag query tokens in each requested field; one fragment starting near the first match"""
+        text_query = spec.get("highlight_query", query)
+        kind, params = next(iter(text_query.items()))
+        if kind == "match":
+            params = next(iter(params.values()))
+        needles = set(tokenize(params.get("query") if isinstance(params, dict) else params))
+        pre, post = spec.get("pre_tags", ["<em>"])[0], spec.get("post_tags", ["</em>"])[0]
+        highlight = {}
+        for field, options in spec.get("fields", {}).items():
+            text = str(source.get(field) or "")
+            matches = [m for m in _TOKEN_RE.finditer(text.lower()) if m.group() in needles]
+            if not matches:
+                continue
+            start = 0
+            end = len(text)
+            if options.get("number_of_fragments", 5) > 0:
+                start = max(0, matches[0].start() - options.get("fragment_size", 100) // 4)
+                end = min(len(text), start + options.get("fragment_size", 100))
+            fragment = []
+            cursor = start
+            for m in matches:
+                if m.start() < start or m.end() > end:
+                    continue
+                fragment.append(text[cursor:m.start()] + pre + text[m.start():m.end()] + post)
+                cursor = m.end()
+            fragment.append(text[cursor:end])
+            highlight[field] = ["".join(fragment)]
+        return highlight
+
+    def _complete(self, index: str, prefix: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Completion suggester: inputs starting with the prefix, highest weight first, one option per document"""
+        needle = prefix.lower()
+        best: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        for name in index.split(","):
+            for doc_id, source in self._get_index(name).docs.items():
+                for entry in source.get(spec["field"]) or []:
+                    for text in entry.get("input", []):
+                        if text.lower().startswith(needle) and entry.get("weight", 1) > best.get((name, doc_id), (-1, ""))[0]:
+                            best[(name, doc_id)] = (entry.get("weight", 1), text)
+        ordered = sorted(best.items(), key=lambda item: (-item[1][0], item[1][1]))
+        options, seen = [], set()
+        for (name, doc_id), (weight, text) in ordered:
+            if spec.get("skip_duplicates") and text in seen:
+                continue
+            seen.add(text)
+            options.append({"text": text, "_index": name, "_id": doc_id, "_score": float(weight)})
+            if len(options) >= spec.get("size", 5):
+                break
+        return {"text": prefix, "offset": 0, "length": len(prefix), "options": options}
+
+    def msearch(self, body: Optional[List[Dict[str, Any]]] = None, searches: Optional[List[Dict[str, Any]]] = None,
+                index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        lines = body if body is not None else searches
+        responses = []
+        for header, search_body in zip(lines[::2], lines[1::2]):
+            try:
+                responses.append({**self.search(index=header.get("index", index), body=search_body), "status": 200})
+            except Exception as e:
+                responses.append({"error": {"type": type(e).__name__, "reason": str(e)}, "status": 400})
+        return {"took": 0, "responses": responses}
+
+    # Aggregations: filter, terms and date_range, nested through "aggs"
+
+    def _aggregate(self, rows, aggs: Dict[str, Any]) -> Dict[str, Any]:
+        results = {}
+        for name, spec in aggs.items():
+            kind = next(k for k in spec if k not in ("aggs", "aggregations"))
+            params = spec[kind]
+            sub_aggs = spec.get("aggs") or spec.get("aggregations")
+            if kind == "filter":
+                narrowed = [(index, snap, mask & self._evaluate(snap, params)[0], scores)
+                            for index, snap, mask, scores in rows]
+                result = {"doc_count": int(sum(mask.sum() for _, _, mask, _ in narrowed))}
+                if sub_aggs:
+                    result.update(self._aggregate(narrowed, sub_aggs))
+            elif kind == "terms":
+                counts: Dict[Any, int] = {}
+                for _, snap, mask, _ in rows:
+                    for pos in np.flatnonzero(mask):
+                        value = snap["sources"][pos].get(params["field"])
+                        for item in (value if isinstance(value, list) else [value]):
+                            if item is not None:
+                                counts[item] = counts.get(item, 0) + 1
+                ranked = sorted(counts.items(), key=lambda kv: (-kv[1], str(kv[0])))[:params.get("size", 10)]
+                result = {"buckets": [{"key": key, "doc_count": count} for key, count in ranked]}
+            elif kind == "date_range":
+                buckets = []
+                for bucket in params["ranges"]:
+                    bounds = {}
+                    if "from" in bucket:
+                        bounds["gte"] = bucket["from"]
+                    if "to" in bucket:
+                        bounds["lt"] = bucket["to"]
+                    clause = {"range": {params["field"]: bounds}}
+                    count = sum(int((mask & self._evaluate(snap, clause)[0]).sum()) for _, snap, mask, _ in rows)
+                    buckets.append({"key": bucket.get("key", f"{bucket.get('from', '*')}-{bucket.get('to', '*')}"), "doc_count": count})
+                result = {"buckets": buckets}
+            else:
+                raise NotImplementedError(f"FakeElasticsearch does not support '{kind}' aggregations")
+            results[name] = result
+        return results
+
+    @staticmethod
+    def _filter_source(source: Dict[str, Any], spec: Any) -> Dict[str, Any]:
+        if spec is True or spec is None:
+            return dict(source)
+        if spec is False:
+            return {}
+        if isinstance(spec, dict):
+            spec = spec.get("includes", [])
+        return {k: source.get(k) for k in spec if k in source}
+
+    @staticmethod
+    def _sort_value(source: Dict[str, Any], score: float, spec: Any) -> Tuple[Any, Any]:
+        field, options = (spec, {}) if isinstance(spec, str) else next(iter(spec.items()))
+        if field == "_score":
+            return False, score
+        value = source.get(field)
+        return value is None, value
+
+    @staticmethod
+    def _sort_options(spec: Any) -> Tuple[str, bool]:
+        field, options = (spec, {}) if isinstance(spec, str) else next(iter(spec.items()))
+        options = options if isinstance(options, dict) else {"order": options}
+        return field, options.get("order", "desc" if field == "_score" else "asc") == "desc"
+
+    def _is_after(self, candidate, cursor: List[Any], sort_spec) -> bool:
+        """True when the candidate sorts strictly after the search_after cursor"""
+        source = candidate[1]["sources"][candidate[2]]
+        for spec, bound in zip(sort_spec, cursor):
+            _, descending = self._sort_options(spec)
+            _, value = self._sort_value(source, candidate[3], spec)
+            if value == bound:
+                continue
+            if value is None:
+                return True  # missing values sort last
+            if bound is None:
+                return False
+            return value < bound if descending else value > bound
+        return False
+
+    def _sort(self, candidates, sort_spec, needed: Optional[int]):
+        # Pre-select by score when it is the primary key so large result sets stay cheap
+        first = sort_spec[0]
+        first_field = first if isinstance(first, str) else next(iter(first))
+        if first_field == "_score" and needed is not None and len(candidates) > needed * 4:
+            scores = np.fromiter((c[3] for c in candidates), dtype=np.float64, count=len(candidates))
+            keep = np.argpartition(-scores, needed)[:needed * 2]
+            candidates = [candidates[i] for i in keep]
+
+        ordered = list(candidates)
+        for spec in reversed(sort_spec):
+            field, descending = self._sort_options(spec)
+            options = {} if isinstance(spec, str) else next(iter(spec.values()))
+            options = options if isinstance(options, dict) else {}
+            present = [c for c in ordered if not self._sort_value(c[1]["sources"][c[2]], c[3], spec)[0]]
+            missing = [c for c in ordered if self._sort_value(c[1]["sources"][c[2]], c[3], spec)[0]]
+            present.sort(key=lambda c: self._sort_value(c[1]["sources"][c[2]], c[3], spec)[1], reverse=descending)
+            ordered = missing + present if options.get("missing") == "_first" else present + missing
+        return ordered
+
+    # Query evaluation: every clause returns (match mask, score vector)
+
+    def _evaluate(self, snap: Dict[str, Any], query: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(snap["ids"])
+        kind, params = next(iter(query.items()))
+        handler = getattr(self, f"_q_{kind}", None)
+        if handler is None:
+            raise NotImplementedError(f"FakeElasticsearch does not support '{kind}' queries")
+        mask, scores = handler(snap, params, n)
+        if isinstance(params, dict) and "_name" in params:
+            self._named_masks.setdefault(id(snap), {})[params["_name"]] = mask
+        boost = params.get("boost", 1.0) if isinstance(params, dict) else 1.0
+        return mask, scores * boost
+
+    def _q_match_all(self, snap, params, n):
+        return np.ones(n, dtype=bool), np.ones(n, dtype=np.float32)
+
+    def _q_match_none(self, snap, params, n):
+        return np.zeros(n, dtype=bool), np.zeros(n, dtype=np.float32)
+
+    def _q_bool(self, snap, params, n):
+        mask = np.ones(n, dtype=bool)
+        scores = np.zeros(n, dtype=np.float32)
+        for clause in self._as_list(params.get("must")):
+            m, s = self._evaluate(snap, clause)
+            mask &= m
+            scores += np.where(m, s, 0)
+        for clause in self._as_list(params.get("filter")):
+            m, _ = self._evaluate(snap, clause)
+            mask &= m
+        for clause in self._as_list(params.get("must_not")):
+            m, _ = self._evaluate(snap, clause)
+            mask &= ~m
+        should = self._as_list(params.get("should"))
+        if should:
+            any_should = np.zeros(n, dtype=bool)
+            for clause in should:
+                m, s = self._evaluate(snap, clause)
+                any_should |= m
+                scores += np.where(m, s, 0)
+            required = params.get("minimum_should_match")
+            if required is None:
+                required = 0 if (params.get("must") or params.get("filter")) else 1
+            if int(required) > 0:
+                mask &= any_should
+        return mask, scores
+
+    def _q_script_score(self, snap, params, n):
+        mask, _ = self._evaluate(snap, params.get("query", {"match_all": {}}))
+        script = params["script"]
+        source = script["source"]
+        match = re.search(r"(cosineSimilarity|dotProduct)\(params\.(\w+),\s*'(\w+)'\)", source)
+        if not match:
+            raise NotImplementedError(f"Unsupported script: {source}")
+        vector = np.asarray(script["params"][match.group(2)], dtype=np.float32)
+        if match.group(1) == "cosineSimilarity":
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        matrix = snap["vectors"].get(match.group(3))
+        similarity = matrix @ vector if matrix is not None and n else np.zeros(n, dtype=np.float32)
+        offset = re.search(r"\+\s*([0-9.]+)", source)
+        scores = similarity + (float(offset.group(1)) if offset else 0.0)
+        return mask, scores.astype(np.float32)
+
+    def _text_scores(self, snap, field: str, text: Any, n: int) -> np.ndarray:
+        scores = np.zeros(n, dtype=np.float32)
+        field_postings = snap["postings"].get(field, {})
+        for token in set(tokenize(text)):
+            rows = field_postings.get(token)
+            if rows is not None and len(rows):
+                # Rare tokens count for more, like the idf half of BM25
+                scores[rows] += np.log1p(n / len(rows))
+        return scores
+
+    def _q_multi_match(self, snap, params, n):
+        per_field = []
+        for field in params.get("fields", []):
+            name, boost = _parse_field_boost(field)
+            per_field.append(self._text_scores(snap, name, params["query"], n) * boost)
+        if not per_field:
+            return np.zeros(n, dtype=bool), np.zeros(n, dtype=np.float32)
+        stacked = np.vstack(per_field)
+        scores = stacked.sum(axis=0) if params.get("type") == "most_fields" else stacked.max(axis=0)
+        if str(params.get("operator", "or")).lower() == "and":
+            # Every query token must appear in at least one of the fields
+            mask = np.ones(n, dtype=bool)
+            for token in set(tokenize(params["query"])):
+                in_any = np.zeros(n, dtype=bool)
+                for field in params.get("fields", []):
+                    rows = snap["postings"].get(_parse_field_boost(field)[0], {}).get(token)
+                    if rows is not None:
+                        in_any[rows] = True
+                mask &= in_any
+            return mask, np.where(mask, scores, 0).astype(np.float32)
+        return scores > 0, scores
+
+    def _q_match(self, snap, params, n):
+        field, value = next(iter(params.items()))
+        text = value.get("query") if isinstance(value, dict) else value
+        scores = self._text_scores(snap, field, text, n)
+        return scores > 0, scores
+
+    def _q_percolate(self, snap, params, n):
+        """Run each stored query against a throwaway index of the given documents"""
+        documents = params.get("documents") or [params["document"]]
+        # Map the documents like the percolator index maps the fields they share
+        properties = {f: spec for f, spec in self._current_index.properties.items() if spec.get("type") != "percolator"}
+        scratch = _FakeIndex({"mappings": {"properties": properties}})
+        for slot, document in enumerate(documents):
+            scratch.put(str(slot), document)
+        scratch_snap = scratch.snapshot()
+        mask = np.zeros(n, dtype=bool)
+        for pos, source in enumerate(snap["sources"]):
+            stored = source.get(params["field"])
+            if not stored:
+                continue
+            matched, _ = self._evaluate(scratch_snap, stored)
+            slots = [int(slot) for slot in np.flatnonzero(matched)]
+            if slots:
+                mask[pos] = True
+                self._percolator_slots[(id(snap), pos)] = slots
+        return mask, np.ones(n, dtype=np.float32)
+
+    def _column(self, snap, field: str) -> List[Any]:
+        return [src.get(field) for src in snap["sources"]]
+
+    def _q_term(self, snap, params, n):
+        field, value = next((k, v) for k, v in params.items() if k != "boost")
+        value = value.get("value") if isinstance(value, dict) else value
+        return self._q_terms(snap, {field: [value]}, n)
+
+    def _q_terms(self, snap, params, n):
+        field, values = next((k, v) for k, v in params.items() if k != "boost")
+        wanted = set(values)
+        mask = np.fromiter(
+            ((bool(wanted.intersection(v)) if isinstance(v, list) else v in wanted) for v in self._column(snap, field)),
+            dtype=bool, count=n,
+        )
+        return mask, np.ones(n, dtype=np.float32)
+
+    def _q_ids(self, snap, params, n):
+        wanted = set(str(v) for v in params.get("values", []))
+        mask = np.fromiter((i in wanted for i in snap["ids"]), dtype=bool, count=n)
+        return mask, np.ones(n, dtype=np.float32)
+
+    def _q_exists(self, snap, params, n):
+        mask = np.fromiter((v is not None for v in self._column(snap, params["field"])), dtype=bool, count=n)
+        return mask, np.ones(n, dtype=np.float32)
+
+    def _q_range(self, snap, params, n):
+        field, bounds = next(iter(params.items()))
+        bounds = {k: _resolve_date_math(v) for k, v in bounds.items()}
+
+        def within(value):
+            if value is None:
+                return False
+            for op, bound in bounds.items():
+                if op not in ("gt", "gte", "lt", "lte"):
+                    continue
+                left, right = (value, bound) if isinstance(value, (int, float)) else (str(value), str(bound))
+                if op == "gt" and not left > right:
+                    return False
+                if op == "gte" and not left >= right:
+                    return False
+                if op == "lt" and not left < right:
+                    return False
+                if op == "lte" and not left <= right:
+                    return False
+            return True
+
+        mask = np.fromiter((within(v) for v in self._column(snap, field)), dtype=bool, count=n)
+        return mask, np.ones(n, dtype=np.float32)
+
+    @staticmethod
+    def _as_list(value) -> List[Dict[str, Any]]:
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Memory per worker for server.py, with and without pre-fork model loading.
+
+Starts the server once with the models loaded in the master (shared
+copy-on-write) and once with --no-preload (every worker loads its own),
+warms each worker with query encodes, then reads /proc/<pid>/smaps_rollup
+for the master and every worker. PSS splits shared pages between the
+processes mapping them, so its sum is the real footprint; USS is what
+each worker holds on its own. Linux only.
+
+Usage:
+    python benchmarks/measure_worker_memory.py --workers 4
+    python benchmarks/measure_worker_memory.py --workers 1,2,4,8 --output report.json
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STARTUP_TIMEOUT_SECONDS = 300
+
+
+def smaps_rollup(pid: int) -> Dict[str, float]:
+    """rss, pss and uss of one process in MiB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    mib = lambda kb: round(kb / 1024, 1)
+    return {
+        "rss_mib": mib(fields.get("Rss", 0)),
+        "pss_mib": mib(fields.get("Pss", 0)),
+        "uss_mib": mib(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)),
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The ppid follows the parenthesised command name, which may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def request(url: str, body: Dict[str, Any] = None) -> int:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return response.status
+
+
+def wait_until_ready(process: subprocess.Popen, base_url: str, workers: int):
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode} during startup")
+        try:
+            if request(f"{base_url}/health") == 200 and len(child_pids(process.pid)) >= workers:
+                return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become ready in time")
+
+
+def measure(workers: int, preload: bool, port: int, warmup_requests: int) -> Dict[str, Any]:
+    env = dict(os.environ, ROLLOVER_INTERVAL_SECONDS="0", EMBEDDING_BACKFILL_INTERVAL_SECONDS="0")
+    command = [sys.executable, "server.py", "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"]
+    if not preload:
+        command.append("--no-preload")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        start = time.perf_counter()
+        wait_until_ready(process, base_url, workers)
+        ready_seconds = time.perf_counter() - start
+        # Concurrent encodes so every worker runs inference and touches its model pages
+        with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+            list(pool.map(lambda i: request(f"{base_url}/embeddings/generate/query", {"q": f"road repair {i}"}),
+                          range(warmup_requests)))
+        time.sleep(1)
+
+        master = smaps_rollup(process.pid)
+        per_worker = [smaps_rollup(pid) for pid in child_pids(process.pid)]
+        total_pss = master["pss_mib"] + sum(worker["pss_mib"] for worker in per_worker)
+        return {
+            "workers": workers,
+            "preload": preload,
+            "ready_seconds": round(ready_seconds, 2),
+            "master": master,
+            "per_worker": per_worker,
+            "total_pss_mib": round(total_pss, 1),
+            "mean_worker_uss_mib": round(sum(w["uss_mib"] for w in per_worker) / len(per_worker), 1),
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure server.py memory per worker, shared vs per-worker models")
+    parser.add_argument("--workers", default="2,4", help="Comma-separated worker counts")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--warmup-requests", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Report path (default benchmarks/results/worker-memory-<time>.json)")
+    args = parser.parse_args()
+
+    runs = []
+    for workers in [int(count) for count in args.workers.split(",")]:
+        shared = measure(workers, True, args.port, args.warmup_requests)
+        separate = measure(workers, False, args.port, args.warmup_requests)
+        saved = round(separate["total_pss_mib"] - shared["total_pss_mib"], 1)
+        runs.append({"workers": workers, "shared": shared, "per_worker_models": separate, "saved_mib": saved})
+        print(f"🧠 {workers} workers: {shared['total_pss_mib']} MiB shared vs "
+              f"{separate['total_pss_mib']} MiB per-worker models ({saved} MiB saved); "
+              f"worker USS {shared['mean_worker_uss_mib']} vs {separate['mean_worker_uss_mib']} MiB")
+
+    report = {
+        "meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "cpu_count": os.cpu_count(), "args": vars(args)},
+        "runs": runs,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"worker-memory-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Search and ingest benchmark for ml-backend.
+
+Generates synthetic tenders from the create_tenders_index schema, then
+measures query/document encode throughput, bulk index throughput and
+search_tenders latency percentiles at several concurrency levels. Results
+are written as JSON so runs can be compared across commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 1k,100k
+    python benchmarks/run_benchmarks.py --backend es --es-url http://localhost:9200 --sizes 1m
+    python benchmarks/run_benchmarks.py --sizes 1k --compare benchmarks/results/<old>.json
+    python benchmarks/run_benchmarks.py --backend es --sizes 100k --nodes 1,2,3 --compare-preference
+
+The es backend deletes and recreates --index (default "tenders_benchmark")
+and its archive. The name must contain "benchmark", and TENDERS_INDEX from
+the environment or .env is ignored, so a run can't land on production data.
+
+--nodes measures search throughput as the cluster grows. It starts the
+nodes of docker-compose.es-cluster.yml one count at a time (ascending, so
+shards only ever move onto new nodes), sets replicas to nodes - 1 so every
+node holds a full copy, waits for the cluster to settle and reruns the
+search benchmark through a client listing just the running nodes.
+--compare-preference runs each count with and without preference routing.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Add parent directory to path so we can import our services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+import numpy as np
+
+from benchmarks.fake_elasticsearch import FakeElasticsearch
+from benchmarks.synthetic import SyntheticTenders, parse_size
+
+BENCHMARK_INDEX_MARKER = "benchmark"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CLUSTER_COMPOSE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                    "docker-compose.es-cluster.yml")
+CLUSTER_NODES = ["es01", "es02", "es03"]
+CLUSTER_NODE_URLS = ["http://localhost:9200", "http://localhost:9201", "http://localhost:9202"]
+CLUSTER_SETTLE_SECONDS = 300
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 plus mean of a latency sample, in milliseconds"""
+    if not samples_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    values = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def bench_encode(service, generator: SyntheticTenders, sample: int, batch_size: int) -> Dict[str, Any]:
+    """Document encode throughput (batched) and single-query encode latency"""
+    texts = [row["embedding_input"] for row in generator.generate(sample)]
+    service.model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+
+    start = time.perf_counter()
+    service.model.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    query_latencies = []
+    for request in generator.queries(min(sample, 200)):
+        t0 = time.perf_counter()
+        service.model.encode(request["query"])
+        query_latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "documents": len(texts),
+        "batch_size": batch_size,
+        "docs_per_sec": round(len(texts) / elapsed, 1),
+        "query_encode": percentiles(query_latencies),
+    }
+
+
+def bench_bulk_index(service, generator: SyntheticTenders, count: int, batch_size: int,
+                     real_embeddings: bool) -> Dict[str, Any]:
+    """Bulk index throughput; embedding generation is excluded from the timing"""
+    from services.search_service import TENDERS_INDEX, TENDERS_ARCHIVE_INDEX, ALL_TENDERS_INDICES
+
+    for index_name in (TENDERS_INDEX, TENDERS_ARCHIVE_INDEX):
+        if service.es.indices.exists(index=index_name):
+            service.es.indices.delete(index=index_name)
+    service.create_tenders_index()
+
+    indexed = failed = 0
+    index_seconds = 0.0
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        rows = list(generator.generate(size, start=start))
+        if real_embeddings:
+            vectors = service.model.encode([row["embedding_input"] for row in rows], batch_size=64)
+        else:
+            vectors = generator.random_embeddings(size, start=start)
+        for row, vector in zip(rows, vectors):
+            row["embedding"] = vector.tolist()
+
+        t0 = time.perf_counter()
+        result = service.bulk_index_tenders(rows)
+        index_seconds += time.perf_counter() - t0
+        indexed += result["indexed"]
+        failed += result["failed"]
+
+    t0 = time.perf_counter()
+    service.es.indices.refresh(index=ALL_TENDERS_INDICES)
+    index_seconds += time.perf_counter() - t0
+
+    return {
+        "documents": count,
+        "batch_size": batch_size,
+        "indexed": indexed,
+        "failed": failed,
+        "seconds": round(index_seconds, 3),
+        "docs_per_sec": round(indexed / index_seconds, 1) if index_seconds else 0.0,
+    }
+
+
+def bench_search(service, generator: SyntheticTenders, query_count: int, concurrency_levels: List[int],
+                 limit: int) -> Dict[str, Any]:
+    """search_tenders latency percentiles and throughput per concurrency level"""
+    requests = generator.queries(query_count)
+    for request in requests[:5]:  # warm-up: model, caches, fake index snapshot
+        service.search_tenders(limit=limit, **request)
+
+    def timed(request):
+        t0 = time.perf_counter()
+        results = service.search_tenders(limit=limit, **request)
+        return (time.perf_counter() - t0) * 1000, len(results)
+
+    by_level = {}
+    for level in concurrency_levels:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            outcomes = list(pool.map(timed, requests))
+        wall = time.perf_counter() - start
+        latencies = [latency for latency, _ in outcomes]
+        by_level[str(level)] = {
+            **percentiles(latencies),
+            "queries": len(requests),
+            "qps": round(len(requests) / wall, 1),
+            "empty_results": sum(1 for _, hits in outcomes if hits == 0),
+        }
+    return {"limit": limit, "concurrency": by_level}
+
+
+def set_cluster_size(compose_file: str, nodes: int):
+    """Run the first `nodes` services of the cluster compose file and stop the rest"""
+    command = ["docker", "compose", "-f", compose_file]
+    subprocess.run(command + ["up", "-d"] + CLUSTER_NODES[:nodes], check=True)
+    if CLUSTER_NODES[nodes:]:
+        subprocess.run(command + ["stop"] + CLUSTER_NODES[nodes:], check=True)
+
+
+def wait_for_cluster(es, nodes: int, status: str) -> Dict[str, Any]:
+    """Block until `nodes` nodes have joined, health is at least `status` and no shard is moving"""
+    deadline = time.monotonic() + CLUSTER_SETTLE_SECONDS
+    while True:
+        try:
+            health = es.cluster.health(wait_for_nodes=str(nodes), wait_for_status=status,
+                                       wait_for_no_relocating_shards=True, wait_for_no_initializing_shards=True,
+                                       timeout="10s")
+            if not health.get("timed_out"):
+                return health
+            error = f"health {health['status']}, {health['number_of_nodes']} nodes"
+        except Exception as e:
+            # Nodes that were just started refuse connections for a while
+            error = str(e)
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"cluster did not settle at {nodes} nodes: {error}")
+        time.sleep(2)
+
+
+def start_cluster(compose_file: str, nodes: int):
+    """Resize the local cluster and return a client listing exactly its nodes"""
+    from services.search_service import create_es_client
+
+    set_cluster_size(compose_file, nodes)
+    es = create_es_client(",".join(CLUSTER_NODE_URLS[:nodes]))
+    wait_for_cluster(es, nodes, "yellow")
+    return es
+
+
+def bench_nodes(service, generator: SyntheticTenders, node_counts: List[int], compose_file: str,
+                query_count: int, concurrency_levels: List[int], limit: int,
+                compare_preference: bool) -> Dict[str, Any]:
+    """Search throughput per cluster size; the index must already hold the corpus"""
+    from services.search_service import ALL_TENDERS_INDICES
+
+    routings = [True, False] if compare_preference else [service.preference_routing]
+    by_nodes = {}
+    for nodes in node_counts:
+        service.es = start_cluster(compose_file, nodes)
+        service.es.indices.put_settings(index=ALL_TENDERS_INDICES, body={"index": {"number_of_replicas": nodes - 1}})
+        health = wait_for_cluster(service.es, nodes, "green")
+
+        runs = {}
+        for routing in routings:
+            service.preference_routing = routing
+            runs["preference" if routing else "adaptive"] = bench_search(service, generator, query_count,
+                                                                         concurrency_levels, limit)
+        by_nodes[str(nodes)] = {
+            "replicas": nodes - 1,
+            "active_shards": health["active_shards"],
+            "search": runs,
+        }
+    return by_nodes
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], prefix: str = "") -> List[str]:
+    """Lines describing the relative change of every shared numeric metric"""
+    lines = []
+    for key, value in current.items():
+        if key == "meta" or key not in baseline:
+            continue
+        path = f"{prefix}{key}"
+        old = baseline[key]
+        if isinstance(value, dict) and isinstance(old, dict):
+            lines.extend(compare_reports(old, value, prefix=f"{path}."))
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            change = (value - old) / old * 100
+            lines.append(f"{path}: {old} -> {value} ({change:+.1f}%)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ml-backend search and ingestion")
+    parser.add_argument("--sizes", default="1k", help="Comma-separated corpus sizes, e.g. 1k,100k,1m")
+    parser.add_argument("--backend", choices=["fake", "es"], default="fake",
+                        help="In-process fake or a real Elasticsearch at ELASTICSEARCH_URL")
+    parser.add_argument("--es-url", default=None, help="Override ELASTICSEARCH_URL for --backend es")
+    parser.add_argument("--index", default="tenders_benchmark",
+                        help=f"Index to (re)create; must contain '{BENCHMARK_INDEX_MARKER}'")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated search concurrency levels")
+    parser.add_argument("--queries", type=int, default=200, help="Search requests per concurrency level")
+    parser.add_argument("--limit", type=int, default=20, help="Results per search (SearchRequest default)")
+    parser.add_argument("--encode-sample", type=int, default=1000, help="Documents to encode for encode throughput")
+    parser.add_argument("--encode-batch-size", type=int, default=64)
+    parser.add_argument("--index-batch-size", type=int, default=500)
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Encode every document with the model instead of random unit vectors")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Report path (default benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier report to diff against")
+    parser.add_argument("--nodes", default=None,
+                        help="Comma-separated cluster sizes to sweep with docker-compose.es-cluster.yml (es backend)")
+    parser.add_argument("--compose-file", default=CLUSTER_COMPOSE_FILE)
+    parser.add_argument("--compare-preference", action="store_true",
+                        help="With --nodes, run every size with and without preference routing")
+    args = parser.parse_args()
+    if args.nodes and args.backend != "es":
+        parser.error("--nodes needs --backend es")
+    if BENCHMARK_INDEX_MARKER not in args.index:
+        parser.error(f"--index must contain '{BENCHMARK_INDEX_MARKER}'; the benchmark deletes the indices it uses")
+
+    # Set here rather than at import, so evaluate_search.py can import the helpers without them
+    load_dotenv()
+    # Assigned, not defaulted: a TENDERS_INDEX from .env must never be the index that gets deleted
+    os.environ["TENDERS_INDEX"] = args.index
+    os.environ["TENDERS_ARCHIVE_INDEX"] = f"{args.index}_archive"
+    os.environ.setdefault("ELASTICSEARCH_URL", "http://localhost:9200")
+    if args.es_url:
+        os.environ["ELASTICSEARCH_URL"] = args.es_url
+
+    from services.search_service import search_service, create_es_client, TENDERS_INDEX, ALL_TENDERS_INDICES
+
+    node_counts = sorted(int(count) for count in args.nodes.split(",")) if args.nodes else []
+    if args.backend == "fake":
+        search_service.es = FakeElasticsearch()
+    elif args.es_url:
+        search_service.es = create_es_client(args.es_url)
+
+    generator = SyntheticTenders(search_service._tenders_index_mapping()["mappings"]["properties"], seed=args.seed)
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "backend": args.backend,
+            "index": TENDERS_INDEX,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "encode": bench_encode(search_service, generator, args.encode_sample, args.encode_batch_size),
+        "sizes": {},
+    }
+    print(f"🧠 Encode: {report['encode']['docs_per_sec']} docs/s, query p50 {report['encode']['query_encode']['p50_ms']}ms")
+
+    for label in args.sizes.split(","):
+        count = parse_size(label)
+        print(f"📦 {label}: indexing {count} synthetic tenders into {args.backend}...")
+        if node_counts:
+            # Each corpus is indexed once, on the smallest cluster
+            search_service.es = start_cluster(args.compose_file, node_counts[0])
+        ingest = bench_bulk_index(search_service, generator, count, args.index_batch_size, args.real_embeddings)
+        print(f"   bulk index: {ingest['docs_per_sec']} docs/s")
+        search = bench_search(search_service, generator, args.queries, concurrency_levels, args.limit)
+        for level, stats in search["concurrency"].items():
+            print(f"   search c={level}: p50 {stats['p50_ms']}ms p95 {stats['p95_ms']}ms p99 {stats['p99_ms']}ms, {stats['qps']} qps")
+        report["sizes"][label] = {"bulk_index": ingest, "search": search}
+        if node_counts:
+            by_nodes = bench_nodes(search_service, generator, node_counts, args.compose_file, args.queries,
+                                   concurrency_levels, args.limit, args.compare_preference)
+            for nodes, result in by_nodes.items():
+                for routing, stats in result["search"].items():
+                    top = stats["concurrency"][str(concurrency_levels[-1])]
+                    print(f"   {nodes} nodes ({routing}): c={concurrency_levels[-1]} {top['qps']} qps, p95 {top['p95_ms']}ms")
+            report["sizes"][label]["nodes"] = by_nodes
+
+    if args.backend == "es":
+        search_service.es.indices.delete(index=ALL_TENDERS_INDICES)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{report['meta']['commit'] or 'nocommit'}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Report written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"📊 Compared with {args.compare} ({baseline.get('meta', {}).get('commit')}):")
+        for line in compare_reports(baseline, report):
+            print(f"   {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Seeded synthetic tender generator. Field names and types come from the
+mapping built by SearchService.create_tenders_index, so the generated rows
+track the real schema as it evolves.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+import random
+
+import numpy as np
+
+REGIONS = ["Ontario", "Quebec", "British Columbia", "Alberta", "Manitoba", "Saskatchewan",
+           "Nova Scotia", "New Brunswick", "Newfoundland and Labrador", "Prince Edward Island",
+           "National Capital Region", "Canada"]
+CATEGORIES = ["CNST", "GD", "SRV", "SRVTGD"]
+PROCUREMENT_METHODS = ["Competitive – Open Bidding", "Competitive – Selective Tendering",
+                       "Non-Competitive", "Advance Contract Award Notice"]
+PROCUREMENT_TYPES = ["Request for Proposal", "Request for Quotation", "Invitation to Tender",
+                     "Request for Information", "Notice of Proposed Procurement"]
+STATUSES = ["Open", "Open", "Open", "Closed", "Awarded", "Cancelled"]
+SOURCES = ["canadabuys", "ontario", "toronto", "mississauga", "brampton", "hamilton", "london", "quebec"]
+ENTITIES = ["Public Services and Procurement Canada", "City of Toronto", "City of Mississauga",
+            "Infrastructure Ontario", "Metrolinx", "Hydro-Québec", "City of Hamilton",
+            "Department of National Defence", "Health Canada", "Region of Peel"]
+CITIES = ["Ottawa", "Toronto", "Mississauga", "Montreal", "Hamilton", "London", "Brampton", "Gatineau"]
+
+SUBJECTS = ["road resurfacing", "snow removal", "network switches", "cybersecurity assessment",
+            "office furniture", "janitorial services", "bridge rehabilitation", "water main replacement",
+            "cloud hosting", "translation services", "fleet vehicles", "HVAC maintenance",
+            "legal advisory", "software licences", "landscaping", "roof replacement",
+            "medical supplies", "data analytics platform", "security guard services", "LED streetlights",
+            "asbestos abatement", "transit shelters", "engineering design", "payroll system"]
+QUALIFIERS = ["multi-year", "standing offer for", "supply and delivery of", "emergency",
+              "phase 2", "design-build", "on-call", "pilot project for", "upgrade of", "consulting on"]
+FILLER = ["The contractor shall provide all labour, materials and equipment.",
+          "Bidders must hold valid WSIB clearance and liability insurance.",
+          "Work is to be completed in accordance with the attached specifications.",
+          "Submissions will be evaluated on price and technical merit.",
+          "A mandatory site meeting will be held prior to closing.",
+          "French and English deliverables are required.",
+          "Security clearance at the Reliability level is mandatory.",
+          "The resulting contract may include options to extend for two additional years."]
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def parse_size(label: str) -> int:
+    """Turn '1k' / '100k' / '1m' / '2500' into a row count"""
+    label = label.strip().lower()
+    if label in SIZES:
+        return SIZES[label]
+    return int(label)
+
+
+class SyntheticTenders:
+    """Reproducible stream of tender rows shaped like the tenders table"""
+
+    def __init__(self, properties: Dict[str, Any], seed: int = 42, base_date: Optional[datetime] = None):
+        self.properties = properties
+        self.seed = seed
+        # Anchored to today so a realistic share of tenders is still open: open and
+        # closed tenders land in different indices, and that split depends on the clock
+        self.base_date = base_date or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.dims = next((spec.get("dims") for spec in properties.values() if spec.get("type") == "dense_vector"), 384)
+
+    def _subject(self, rng: random.Random) -> str:
+        return f"{rng.choice(QUALIFIERS)} {rng.choice(SUBJECTS)}"
+
+    def row(self, i: int, rng: random.Random) -> Dict[str, Any]:
+        subject = self._subject(rng)
+        entity = rng.choice(ENTITIES)
+        region = rng.choice(REGIONS)
+        published = self.base_date - timedelta(days=rng.randint(0, 180))
+        closing = published + timedelta(days=rng.randint(7, 180))
+        row: Dict[str, Any] = {
+            "id": f"synthetic-{self.seed}-{i}",
+            "source": rng.choice(SOURCES),
+            "source_reference": f"REF-{i:08d}",
+            "source_url": f"https://example.org/tenders/{i}",
+            "canonical_id": f"synthetic-{self.seed}-{i}",
+            "title": f"{subject.title()} - {entity}",
+            "description": f"{entity} requires {subject} in {region}. " + " ".join(rng.sample(FILLER, 3)),
+            "summary": f"{subject.capitalize()} for {entity}.",
+            "published_date": published.strftime("%Y-%m-%d"),
+            "closing_date": closing.strftime("%Y-%m-%dT%H:%M:%S"),
+            "status": rng.choice(STATUSES),
+            "procurement_type": rng.choice(PROCUREMENT_TYPES),
+            "procurement_method": rng.choice(PROCUREMENT_METHODS),
+            "category_primary": rng.choice(CATEGORIES),
+            "delivery_location": region,
+            "contracting_entity_name": entity,
+            "contracting_entity_city": rng.choice(CITIES),
+            "contracting_entity_province": region,
+            "contracting_entity_country": "Canada",
+        }
+        # Fill every remaining mapped field by type so the document is schema-complete
+        for field, spec in self.properties.items():
+            if field in row:
+                continue
+            field_type = spec.get("type")
+            if field_type == "date":
+                row[field] = (published + timedelta(days=rng.randint(0, 30))).strftime("%Y-%m-%d")
+            elif field_type == "float":
+                row[field] = round(rng.uniform(10_000, 5_000_000), 2)
+            elif field_type == "integer":
+                row[field] = rng.randint(0, 40)
+            elif field_type == "keyword":
+                row[field] = f"{field}-{rng.randint(0, 999)}"
+            elif field_type == "text" and field != "embedding_input":
+                row[field] = f"{field} {rng.randint(0, 999)}"
+        row["embedding_input"] = f"Title: {row['title']}\nDescription: {row['description']}"
+        return row
+
+    def generate(self, count: int, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield `count` rows; row i is identical for a given seed whatever the batch boundaries"""
+        for i in range(start, start + count):
+            yield self.row(i, random.Random(self.seed * 1_000_003 + i))
+
+    def random_embeddings(self, count: int, start: int = 0) -> np.ndarray:
+        """Unit vectors standing in for model output when encoding every row is too slow"""
+        rng = np.random.default_rng(self.seed + start)
+        vectors = rng.standard_normal((count, self.dims)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def queries(self, count: int) -> List[Dict[str, Any]]:
+        """Search requests mixing plain text queries with the common filter combinations"""
+        rng = random.Random(self.seed + 7)
+        requests = []
+        for _ in range(count):
+            request: Dict[str, Any] = {"query": rng.choice(SUBJECTS)}
+            roll = rng.random()
+            if roll < 0.3:
+                request["regions"] = [rng.choice(REGIONS)]
+            elif roll < 0.5:
+                request["status"] = ["Open"]
+                request["procurement_category"] = [rng.choice(CATEGORIES)]
+            requests.append(request)
+        return requests
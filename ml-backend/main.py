@@ -1,17 +1,52 @@
-from fastapi import FastAPI
-from routers import embeddings, data, elasticsearch
+from fastapi import FastAPI, Response
+from contextlib import asynccontextmanager
+from routers import embeddings, data, elasticsearch, alerts, tenders, profiling, recommendations
+from services.metrics import CONTENT_TYPE_LATEST, render_metrics
+from services.rollover_service import rollover_service
+from services.reembed_service import reembed_service
+from services.recommendation_service import recommendation_service
+from services.admission_service import AdmissionMiddleware
+from services.profiling_service import ServerTimingMiddleware
 import uvicorn
+import os
+
+# server.py turns this off in all but one worker so timers don't run once per process
+BACKGROUND_JOBS_ENABLED = os.getenv("BACKGROUND_JOBS_ENABLED", "true").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if BACKGROUND_JOBS_ENABLED:
+        # Periodically move closed/expired tenders from the hot index to the archive
+        rollover_service.start()
+        # Fill in vectors for a model upgrade, or for the serving model after a cut-over
+        reembed_service.start()
+        # Score tenders created since the last run against every user's profile
+        recommendation_service.start()
+    yield
+    rollover_service.stop()
+    reembed_service.stop()
+    recommendation_service.stop()
 
 app = FastAPI(
     title="MapleTenders ML Backend",
     description="AI-powered search and analysis for Canadian government tenders",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Interactive vs batch lanes: per-lane concurrency limits, bounded queues, early 429s
+app.add_middleware(AdmissionMiddleware)
+# Outermost, so a debug timing breakdown's total includes time queued for a lane
+app.add_middleware(ServerTimingMiddleware)
+
 # Include routers
 app.include_router(embeddings.router)
 app.include_router(data.router)
 app.include_router(elasticsearch.router)
+app.include_router(alerts.router)
+app.include_router(tenders.router)
+app.include_router(profiling.router)
+app.include_router(recommendations.router)
 
 @app.get("/")
 def read_root():
@@ -25,5 +60,10 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
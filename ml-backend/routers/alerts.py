@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from services.alert_service import alert_service
+from services.profiling_service import ProfiledRoute
+import logging
+
+router = APIRouter(prefix="/alerts", tags=["alerts"], route_class=ProfiledRoute)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class SavedSearchRequest(BaseModel):
+    user_id: str
+    query: str = ""
+    # Same keys as SearchRequest filters (regions, status, closing_date_after, ...)
+    filters: Dict[str, Any] = {}
+    # Match on meaning instead of keywords, using this embedding or one encoded from `query`
+    use_embedding: bool = False
+    embedding: Optional[List[float]] = None
+    min_similarity: Optional[float] = None
+
+class MatchRequest(BaseModel):
+    tender_ids: List[str]
+
+class AlertMatch(BaseModel):
+    saved_search_id: str
+    user_id: Optional[str] = None
+    tender_id: str
+
+@router.put("/saved-searches/{saved_search_id}")
+def register_saved_search_endpoint(saved_search_id: str, request: SavedSearchRequest):
+    """Register or replace a saved search as a percolator query"""
+    try:
+        return alert_service.register_saved_search(
+            saved_search_id=saved_search_id,
+            user_id=request.user_id,
+            query_text=request.query,
+            filters=request.filters,
+            embedding=request.embedding,
+            use_embedding=request.use_embedding,
+            min_similarity=request.min_similarity
+        )
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=f"Unsupported filter: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Failed to register saved search {saved_search_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/saved-searches/{saved_search_id}")
+def unregister_saved_search_endpoint(saved_search_id: str):
+    """Stop alerting on a saved search"""
+    return alert_service.unregister_saved_search(saved_search_id)
+
+@router.post("/match", response_model=List[AlertMatch])
+def match_tenders_endpoint(request: MatchRequest):
+    """Match already indexed tenders against all saved searches in one reverse search"""
+    try:
+        return alert_service.match_tender_ids(request.tender_ids)
+    except Exception as e:
+        logger.error(f"❌ Alert matching failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from services.search_service import search_service
 from services.sync_service import sync_service
+from services.similarity_service import similarity_service
+from services.recommendation_service import recommendation_service
+from services.rollover_service import rollover_service
+from services.suggest_service import suggest_service
+from services.reembed_service import reembed_service
+from services.profiling_service import ProfiledRoute
 import logging
-from datetime import datetime
+import time
+import os
 
-router = APIRouter(prefix="/elasticsearch", tags=["elasticsearch"])
+router = APIRouter(prefix="/elasticsearch", tags=["elasticsearch"], route_class=ProfiledRoute)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Upper bound on searches per /search/batch call
+MAX_BATCH_SEARCHES = int(os.getenv("MAX_BATCH_SEARCHES", "100"))
+
 class SearchRequest(BaseModel):
     query: str
     regions: Optional[List[str]] = None
@@ -24,6 +34,36 @@ class SearchRequest(BaseModel):
     publication_date_after: Optional[str] = None
     publication_date_before: Optional[str] = None
     limit: Optional[int] = 20
+    # Show one posting per cross-source duplicate cluster
+    collapse_duplicates: bool = True
+
+class BrowseRequest(BaseModel):
+    regions: Optional[List[str]] = None
+    procurement_method: Optional[str] = None
+    procurement_category: Optional[List[str]] = None
+    notice_type: Optional[List[str]] = None
+    status: Optional[List[str]] = None
+    contracting_entity_name: Optional[List[str]] = None
+    closing_date_after: Optional[str] = None
+    closing_date_before: Optional[str] = None
+    publication_date_after: Optional[str] = None
+    publication_date_before: Optional[str] = None
+    limit: Optional[int] = 20
+    collapse_duplicates: bool = True
+    # `next_search_after` from the previous page
+    search_after: Optional[List[Any]] = None
+
+class BrowseResult(BaseModel):
+    id: str
+    closing_date: Optional[str] = None
+
+class BrowseResponse(BaseModel):
+    results: List[BrowseResult]
+    next_search_after: Optional[List[Any]] = None
+
+class Suggestion(BaseModel):
+    text: str
+    score: float
 
 class SearchResult(BaseModel):
     # Only return minimal data from Elasticsearch
@@ -31,13 +71,15 @@ class SearchResult(BaseModel):
     search_score: float
     match_explanation: str
 
+class FacetedSearchResponse(BaseModel):
+    results: List[SearchResult]
+    # facet field -> value -> count; closing_date uses closed/next_7_days/next_30_days/later buckets
+    facets: Dict[str, Dict[str, int]]
+
 @router.post("/search", response_model=List[SearchResult])
 def search_tenders_endpoint(request: SearchRequest):
     """Search tenders with natural language using AI embeddings"""
-    request_start_time = datetime.now()
-    logger.info("🌐 API SEARCH REQUEST RECEIVED")
-    logger.info(f"📝 Request: query='{request.query}', limit={request.limit}")
-    logger.info(f"🔧 Filters: regions={request.regions}, method={request.procurement_method}")
+    request_start_time = time.perf_counter()
     
     try:
         results = search_service.search_tenders(
@@ -52,40 +94,108 @@ def search_tenders_endpoint(request: SearchRequest):
             closing_date_before=request.closing_date_before,
             publication_date_after=request.publication_date_after,
             publication_date_before=request.publication_date_before,
-            limit=request.limit
+            limit=request.limit,
+            collapse_duplicates=request.collapse_duplicates
         )
-        
-        request_time = (datetime.now() - request_start_time).total_seconds() * 1000
-        logger.info(f"✅ API SEARCH COMPLETED: {len(results)} results in {request_time:.1f}ms")
         return results
         
     except Exception as e:
-        request_time = (datetime.now() - request_start_time).total_seconds() * 1000
+        request_time = (time.perf_counter() - request_start_time) * 1000
         logger.error(f"❌ API SEARCH FAILED after {request_time:.1f}ms: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/search/faceted", response_model=FacetedSearchResponse)
+def search_tenders_faceted_endpoint(request: SearchRequest):
+    """Search tenders and get facet counts for the filter sidebar in one Elasticsearch round trip"""
+    request_start_time = time.perf_counter()
+    
+    try:
+        filters = request.model_dump(exclude={"query", "limit"})
+        return search_service.search_tenders_with_facets(query=request.query, limit=request.limit, **filters)
+        
+    except Exception as e:
+        request_time = (time.perf_counter() - request_start_time) * 1000
+        logger.error(f"❌ API FACETED SEARCH FAILED after {request_time:.1f}ms: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/search/batch", response_model=List[List[SearchResult]])
+def search_tenders_batch_endpoint(requests: List[SearchRequest]):
+    """Run several searches in one call: one batched encode, one Elasticsearch _msearch, results in request order"""
+    request_start_time = time.perf_counter()
+    if len(requests) > MAX_BATCH_SEARCHES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SEARCHES} searches per batch")
+    
+    try:
+        return search_service.search_tenders_batch([request.model_dump() for request in requests])
+        
+    except Exception as e:
+        request_time = (time.perf_counter() - request_start_time) * 1000
+        logger.error(f"❌ API BATCH SEARCH FAILED after {request_time:.1f}ms: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/browse", response_model=BrowseResponse)
+def browse_tenders_endpoint(request: BrowseRequest):
+    """List tenders matching filters, closing soonest first, without text scoring; page with search_after"""
+    request_start_time = time.perf_counter()
+    
+    try:
+        filters = request.model_dump(exclude={"limit", "search_after", "collapse_duplicates"})
+        return search_service.browse_tenders(
+            limit=request.limit,
+            search_after=request.search_after,
+            collapse_duplicates=request.collapse_duplicates,
+            **filters
+        )
+        
+    except Exception as e:
+        request_time = (time.perf_counter() - request_start_time) * 1000
+        logger.error(f"❌ API BROWSE FAILED after {request_time:.1f}ms: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/suggest", response_model=List[Suggestion])
+def suggest_endpoint(q: str = Query(..., max_length=100), size: int = Query(8, ge=1, le=20)):
+    """Typeahead completions for a partial query from titles, buyers and categories of open tenders"""
+    return suggest_service.suggest(q, size=size)
+
 @router.post("/sync")
-def sync_all_tenders():
+def sync_all_tenders(background_tasks: BackgroundTasks):
     """Sync all tenders from Supabase to Elasticsearch index"""
     try:
         result = sync_service.sync_all_tenders()
+        if result["status"] == "success":
+            # Serving-model vectors (after a model cut-over), then neighbour lists for
+            # /tenders/{id}/similar and per-user recommendations, catch up after the response is sent
+            background_tasks.add_task(reembed_service.backfill_serving)
+            background_tasks.add_task(similarity_service.refresh)
+            background_tasks.add_task(recommendation_service.refresh)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/sync/{tender_id}")
-def sync_single_tender(tender_id: str):
+def sync_single_tender(tender_id: str, background_tasks: BackgroundTasks):
     """Sync a single tender by ID"""
     try:
         result = sync_service.sync_single_tender(tender_id)
         if result["status"] == "error":
             raise HTTPException(status_code=404, detail=result["error"])
+        background_tasks.add_task(reembed_service.backfill_serving)
+        # Incremental; if a refresh is already running it goes round again for this tender
+        background_tasks.add_task(similarity_service.refresh)
         return result
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/rollover")
+def rollover_tenders():
+    """Move closed/expired tenders to the archive index now instead of waiting for the timer (admin only)"""
+    result = rollover_service.run_once()
+    if result["status"] == "error":
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
 @router.get("/status")
 def get_sync_status():
     """Get current synchronization status"""
@@ -1,9 +1,11 @@
 import os
 from fastapi import APIRouter, HTTPException
-from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any
 from supabase import create_client, Client
 from pydantic import BaseModel
+from services.embedding_models import get_model, EMBEDDING_SOURCE_VERSION
+from services.reembed_service import reembed_service
+from services.profiling_service import ProfiledRoute, timed
 
 # Pydantic models
 class EmbeddingRequest(BaseModel):
@@ -12,16 +14,19 @@ class EmbeddingRequest(BaseModel):
 class EmbeddingResponse(BaseModel):
     embeddings: List[List[float]]
     embedding_inputs: List[str]
+    model_version: str
 
 class EmbeddingQueryRequest(BaseModel):
     q: str
 
 class EmbeddingQueryResponse(BaseModel):
     embedded_query: List[float]
+    model_version: str
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Vectors from these endpoints are stored in Supabase, so they stay on the source version
+model = get_model(EMBEDDING_SOURCE_VERSION)
 
-router = APIRouter(prefix="/embeddings", tags=["embeddings"])
+router = APIRouter(prefix="/embeddings", tags=["embeddings"], route_class=ProfiledRoute)
 
 @router.post("/generate/query", response_model=EmbeddingQueryResponse)
 def generate_embedded_search(request: EmbeddingQueryRequest):
@@ -31,13 +36,14 @@ def generate_embedded_search(request: EmbeddingQueryRequest):
     q = request.q
     if not q:
         raise HTTPException(status_code=400, detail="Query cannot be empty")
-    embedding = model.encode([q])
-    return {"embedded_query": embedding.tolist()[0]}
+    with timed("encode"):
+        embedding = model.encode([q])
+    return {"embedded_query": embedding.tolist()[0], "model_version": EMBEDDING_SOURCE_VERSION}
 
 
 
 @router.post("/generate/data", response_model=EmbeddingResponse)
-async def generate_embedding(data: List[Dict[str, Any]]):
+def generate_embedding(data: List[Dict[str, Any]]):
     """
     Generate embeddings for a list of tender objects
     """
@@ -93,9 +99,24 @@ Classification: {gsin_description}
     
     try:
         print("Encoding texts with sentence transformer...")
-        embeddings = model.encode(texts)
+        with timed("encode"):
+            embeddings = model.encode(texts)
         print(f"Successfully generated {len(embeddings)} embeddings")
-        return {"embeddings": embeddings.tolist(), "embedding_inputs": texts}
+        return {"embeddings": embeddings.tolist(), "embedding_inputs": texts, "model_version": EMBEDDING_SOURCE_VERSION}
     except Exception as e:
         print(f"Error during embedding generation: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
+
+@router.get("/versions")
+def embedding_versions():
+    """Model versions in use and how many tenders have a vector for each; check before cutting over"""
+    try:
+        return reembed_service.status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not read embedding status: {str(e)}")
+
+@router.post("/reembed")
+def reembed_tenders():
+    """Start a throttled re-embedding pass in the background (admin only)"""
+    started = reembed_service.trigger()
+    return {"status": "started" if started else "already running"}
@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+from services.profiling_service import (
+    profiling_service,
+    ProfiledRoute,
+    ProfileSession,
+    PROFILING_MAX_REQUESTS,
+    PROFILING_TOKEN_HEADER,
+    CPROFILE,
+    token_accepted,
+)
+
+def _require_token(token: Optional[str] = Header(None, alias=PROFILING_TOKEN_HEADER)):
+    if not token_accepted(token):
+        raise HTTPException(status_code=403, detail=f"Missing or wrong {PROFILING_TOKEN_HEADER} header")
+
+router = APIRouter(prefix="/profiling", tags=["profiling"], dependencies=[Depends(_require_token)])
+
+class ProfileRequest(BaseModel):
+    # Route template as shown in /docs, e.g. /elasticsearch/search or /tenders/{tender_id}/similar
+    route: str
+    method: Optional[str] = None
+    requests: int = Field(10, ge=1, le=PROFILING_MAX_REQUESTS)
+    # sample: low-overhead stack sampling, folded stacks; cprofile: exact call counts, slower requests
+    mode: Literal["sample", "cprofile"] = "sample"
+    interval_ms: float = Field(5.0, ge=1.0, le=100.0)
+
+class ProfileSessionStatus(BaseModel):
+    id: str
+    route: str
+    method: Optional[str] = None
+    mode: str
+    state: str
+    requested: int
+    captured: int
+    in_flight: int
+    mean_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    created_at: float
+
+def _get_session(session_id: str) -> ProfileSession:
+    session = profiling_service.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Profiling session {session_id} not found")
+    return session
+
+@router.post("/sessions", response_model=ProfileSessionStatus)
+def start_profiling(request: ProfileRequest, http_request: Request):
+    """Profile the next N requests to a route (admin only); fetch the result from /profiling/sessions/{id}/profile"""
+    if profiling_service.disabled_reason:
+        raise HTTPException(status_code=503, detail=f"Profiling is disabled ({profiling_service.disabled_reason})")
+    method = request.method.upper() if request.method else None
+    profilable = [
+        route for route in http_request.app.routes
+        if isinstance(route, ProfiledRoute) and route.profilable and route.path == request.route
+        and (method is None or method in route.methods)
+    ]
+    if not profilable:
+        raise HTTPException(status_code=404, detail=f"No profilable route matches {method or 'any method'} {request.route}")
+    session = profiling_service.start_session(request.route, method, request.requests,
+                                              request.mode, request.interval_ms)
+    return session.status()
+
+@router.get("/sessions", response_model=List[ProfileSessionStatus])
+def list_profiling_sessions():
+    """Recent profiling sessions, newest last (admin only)"""
+    return profiling_service.list_sessions()
+
+@router.get("/sessions/{session_id}", response_model=ProfileSessionStatus)
+def get_profiling_session(session_id: str):
+    """Progress of one profiling session (admin only)"""
+    return _get_session(session_id).status()
+
+@router.get("/sessions/{session_id}/profile")
+def get_profile(session_id: str, format: Optional[Literal["folded", "text", "pstats"]] = Query(None)):
+    """
+    Download what a session captured so far (admin only).
+
+    Sampled sessions return folded stacks (`folded`, for flamegraph.pl,
+    speedscope or inferno). cProfile sessions return a `text` summary by
+    cumulative time, or the raw `pstats` file for snakeviz or flameprof.
+    """
+    session = _get_session(session_id)
+    format = format or ("text" if session.mode == CPROFILE else "folded")
+    if format == "folded":
+        if session.mode == CPROFILE:
+            raise HTTPException(status_code=400, detail="Folded stacks are only recorded by sample sessions")
+        return PlainTextResponse(session.folded())
+    if session.mode != CPROFILE:
+        raise HTTPException(status_code=400, detail=f"'{format}' output is only recorded by cprofile sessions")
+    if format == "text":
+        return PlainTextResponse(session.stats_text())
+    return Response(content=session.pstats_bytes(), media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="{session.id}.prof"'})
+
+@router.delete("/sessions/{session_id}")
+def cancel_profiling_session(session_id: str):
+    """Stop a session from capturing more requests; what it already captured stays downloadable (admin only)"""
+    _get_session(session_id)
+    profiling_service.cancel_session(session_id)
+    return {"status": "cancelled"}
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from typing import List
+from services.recommendation_service import recommendation_service
+from services.profiling_service import ProfiledRoute
+import logging
+
+router = APIRouter(prefix="/recommendations", tags=["recommendations"], route_class=ProfiledRoute)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class Recommendation(BaseModel):
+    id: str
+    score: float
+
+@router.post("/refresh")
+def refresh_recommendations(full: bool = False):
+    """Recompute recommendations now (admin only); `full` rescores every user against every open tender"""
+    try:
+        return recommendation_service.refresh(full=full)
+    except Exception as e:
+        logger.error(f"❌ Recommendations refresh failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}", response_model=List[Recommendation])
+def get_recommendations(user_id: str, limit: int = Query(20, ge=1, le=100)):
+    """Precomputed tenders for a user from their bookmarks and saved searches; refreshed after each sync"""
+    recommendations = recommendation_service.get_recommendations(user_id, limit=limit)
+    if recommendations is None:
+        raise HTTPException(status_code=404, detail=f"No recommendations computed for {user_id}")
+    return recommendations
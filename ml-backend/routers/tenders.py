@@ -1,3 +1,32 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Optional, List
+from services.similarity_service import similarity_service
+from services.profiling_service import ProfiledRoute
+import logging
 
-router = APIRouter(prefix="/embeddings", tags=["embeddings"])
\ No newline at end of file
+router = APIRouter(prefix="/tenders", tags=["tenders"], route_class=ProfiledRoute)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class SimilarTender(BaseModel):
+    id: str
+    similarity: float
+
+@router.get("/{tender_id}/similar", response_model=List[SimilarTender])
+def get_similar_tenders(tender_id: str, limit: Optional[int] = 10):
+    """Precomputed nearest neighbours of a tender; refreshed in the background after each sync"""
+    similar = similarity_service.get_similar(tender_id, limit=limit)
+    if similar is None:
+        raise HTTPException(status_code=404, detail=f"No similar tenders computed for {tender_id}")
+    return similar
+
+@router.post("/similar/refresh")
+def refresh_similar_tenders(full: bool = False):
+    """Recompute neighbour lists now (admin only); `full` ignores what is already stored"""
+    try:
+        return similarity_service.refresh(full=full)
+    except Exception as e:
+        logger.error(f"❌ Similar tenders refresh failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
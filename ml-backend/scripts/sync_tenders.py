@@ -1,37 +1,84 @@
 #!/usr/bin/env python3
 """
 Standalone script to sync tenders from Supabase to Elasticsearch
-Usage: python scripts/sync_tenders.py
+Usage: python scripts/sync_tenders.py [--workers N] [--page-size N] [--checkpoint PATH] [--restart] [--summary PATH]
+
+The tenders table is split across --workers threads by id range. Progress is
+checkpointed after every page, so rerunning after a failure resumes each
+partition where it stopped; pass --restart to ignore the checkpoint.
+
+stdout carries exactly one JSON summary, also when the run fails
+({"status": "error", "error": ...}), for schedulers and CI. Progress and
+the human-readable result go to stderr. Exits 1 unless status is success.
 """
 
+import argparse
+import json
 import sys
 import os
 
 # Add parent directory to path so we can import our services
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.sync_service import sync_service
+from services.sync_runner import SyncRunner, SYNC_WORKERS, SYNC_CHECKPOINT_FILE
+from services.sync_service import SYNC_PAGE_SIZE
+from services.similarity_service import similarity_service
+from services.recommendation_service import recommendation_service
+from services.reembed_service import reembed_service
+
+def _say(message: str):
+    print(message, file=sys.stderr)
 
 def main():
     """Run the tender synchronization"""
-    print("🚀 MapleTenders Elasticsearch Sync")
-    print("=" * 50)
-    
+    parser = argparse.ArgumentParser(description="Sync tenders from Supabase to Elasticsearch")
+    parser.add_argument("--workers", type=int, default=SYNC_WORKERS, help="parallel partitions")
+    parser.add_argument("--page-size", type=int, default=SYNC_PAGE_SIZE, help="rows fetched per Supabase request")
+    parser.add_argument("--checkpoint", default=SYNC_CHECKPOINT_FILE, help="checkpoint file used to resume")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--summary", help="also write the JSON summary to this file")
+    args = parser.parse_args()
+
+    _say("🚀 MapleTenders Elasticsearch Sync")
+    _say("=" * 50)
+
     try:
-        result = sync_service.sync_all_tenders()
-        
-        if result["status"] == "success":
-            print(f"\n✅ Sync completed successfully!")
-            print(f"📊 Total tenders: {result['total_tenders']}")
-            print(f"✅ Successfully indexed: {result['indexed']}")
-            print(f"❌ Failed: {result['failed']}")
+        summary = SyncRunner(workers=args.workers, page_size=args.page_size,
+                             checkpoint_path=args.checkpoint).run(restart=args.restart)
+
+        if summary["status"] != "incomplete":
+            reembedded = reembed_service.backfill_serving()
+            if reembedded and reembedded["status"] == "success":
+                summary["reembedded"] = reembedded["versions"]
+
+            similar = similarity_service.refresh()
+            if similar["status"] == "success":
+                summary["similar_recomputed"] = similar["recomputed"]
+
+            recommended = recommendation_service.refresh()
+            if recommended["status"] == "success":
+                summary["recommendations"] = {key: recommended[key] for key in
+                                              ("users", "rescored_users", "new_tenders")}
+
+        if summary["status"] == "success":
+            _say(f"\n✅ Sync completed: {summary['synced']} tenders in {summary['seconds']}s "
+                 f"({summary['rows_per_second']} rows/s)")
+        elif summary["status"] == "partial":
+            _say(f"\n⚠️ Sync completed with {summary['failed']} failed tenders (see failed_ids)")
         else:
-            print(f"\n💥 Sync failed: {result['error']}")
-            sys.exit(1)
-            
+            _say(f"\n💥 Sync stopped early; rerun to resume from {summary['checkpoint']}")
+
     except Exception as e:
-        print(f"\n💥 Unexpected error: {e}")
+        _say(f"\n💥 Unexpected error: {e}")
+        summary = {"status": "error", "error": str(e), "checkpoint": args.checkpoint}
+
+    # The only stdout output: machine-readable summary for schedulers and CI
+    print(json.dumps(summary, indent=2))
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    if summary["status"] != "success":
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Production entry point: load the models once, then fork uvicorn workers.
+
+Usage: python server.py [--workers N] [--torch-threads N] [--host HOST] [--port PORT] [--no-preload]
+
+The master imports the app, which loads every embedding model, freezes the
+heap and forks. Workers share the model weights copy-on-write instead of
+each loading their own, so adding a worker costs its private heap rather
+than another copy of the weights (benchmarks/measure_worker_memory.py
+measures the difference). --no-preload imports the app in each worker
+instead, which is what running N separate uvicorn processes costs.
+
+Each worker caps torch at --torch-threads intra-op threads so N workers
+don't oversubscribe the cores. Background jobs (rollover, re-embedding,
+recommendations) run in worker 0 only. Crashed workers are restarted;
+SIGTERM or SIGINT stops them all gracefully.
+
+Defaults to one worker. Some state is still per worker: admission
+limits, profiling sessions (a session armed on one worker can't be read
+from another, so profiling is refused with more than one), and the facet
+and typeahead caches, which a sync only clears in the worker that ran it
+and other workers drop after FACET_CACHE_TTL_SECONDS /
+SUGGEST_CACHE_TTL_SECONDS. The fallback vector index is shared: workers
+pick up a rebuilt generation within a few seconds.
+"""
+
+import argparse
+import logging
+import shutil
+import signal
+import socket
+import tempfile
+import glob
+import time
+import gc
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("server")
+
+# More than one trades per-worker caches and profiling for throughput; see the module docstring
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+# Default: split the cores evenly between workers
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "0"))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Workers that die sooner than this after starting are restarted after a pause, not immediately
+WORKER_MIN_UPTIME_SECONDS = 5
+WORKER_RESTART_DELAY_SECONDS = 2
+
+# Tokenizer threads don't survive fork; workers tokenize single-threaded
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    """Listening socket shared by every worker; the kernel spreads connections across them"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _setup_metrics_dir():
+    """
+    prometheus_client multiprocess directory for this server run, so /metrics
+    sums every worker; returns it and whether the server created it.
+
+    A directory named by PROMETHEUS_MULTIPROC_DIR belongs to the operator:
+    only the metric *.db files in it are ever deleted, never the directory.
+    """
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix="ml-backend-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+        return metrics_dir, True
+    os.makedirs(metrics_dir, exist_ok=True)
+    _clear_metrics_dir(metrics_dir)
+    return metrics_dir, False
+
+
+def _clear_metrics_dir(metrics_dir: str):
+    """Remove the previous run's metric files, as the prometheus_client docs recommend"""
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def _limit_torch_threads(threads: int):
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only settable before the first inter-op call; the default is harmless
+        pass
+
+
+def _run_worker(index: int, workers: int, sock: socket.socket, torch_threads: int, log_level: str):
+    """Child process body; never returns"""
+    exit_code = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        _limit_torch_threads(torch_threads)
+
+        import uvicorn
+        import main as app_module
+        # Timers would otherwise run once per worker and race each other
+        app_module.BACKGROUND_JOBS_ENABLED = app_module.BACKGROUND_JOBS_ENABLED and index == 0
+        if workers > 1:
+            # Sessions live in one worker's memory; their requests and downloads would land on any worker
+            from services.profiling_service import profiling_service
+            profiling_service.disabled_reason = profiling_service.disabled_reason or "sessions are per worker and WEB_WORKERS > 1"
+
+        logger.info(f"👷 Worker {index} serving (pid {os.getpid()}, {torch_threads} torch threads)")
+        config = uvicorn.Config(app_module.app, log_level=log_level.lower())
+        uvicorn.Server(config).run(sockets=[sock])
+    except SystemExit as e:
+        # uvicorn exits this way when startup fails
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        logger.error(f"❌ Worker {index} crashed: {e}")
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork ml-backend server")
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS)
+    parser.add_argument("--torch-threads", type=int, default=TORCH_THREADS_PER_WORKER,
+                        help="intra-op torch threads per worker (default: cores / workers)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--no-preload", action="store_true",
+                        help="load the models in every worker instead of once in the master")
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // workers)
+    log_level = os.getenv("LOG_LEVEL", "INFO")
+
+    metrics_dir, owns_metrics_dir = _setup_metrics_dir()
+    sock = _bind(args.host, args.port)
+
+    if not args.no_preload:
+        # Importing the app loads every model the services use. Nothing may run inference or open
+        # connections here: thread pools and sockets created before fork are not safe to share.
+        start = time.perf_counter()
+        import main as app_module  # noqa: F401
+        logger.info(f"📦 Models loaded in master in {time.perf_counter() - start:.1f}s")
+        # Objects that exist now move to a generation the collector never scans, so its
+        # bookkeeping writes don't un-share the pages they live on
+        gc.collect()
+        gc.freeze()
+
+    children = {}
+    started_at = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(index, workers, sock, torch_threads, log_level)
+        children[pid] = index
+        started_at[index] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info(f"🚀 Starting {workers} workers on {args.host}:{args.port} "
+                f"({'models per worker' if args.no_preload else 'shared models'}, {torch_threads} torch threads each)")
+    for index in range(workers):
+        spawn(index)
+
+    from prometheus_client import multiprocess
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        multiprocess.mark_process_dead(pid)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        logger.error(f"💥 Worker {index} (pid {pid}) exited with {code}, restarting")
+        if time.monotonic() - started_at[index] < WORKER_MIN_UPTIME_SECONDS:
+            time.sleep(WORKER_RESTART_DELAY_SECONDS)
+        spawn(index)
+
+    sock.close()
+    if owns_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    else:
+        _clear_metrics_dir(metrics_dir)
+    logger.info("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_SECONDS, ADMISSION_REJECTED_TOTAL, ADMISSION_BATCH_THROTTLED
+from dotenv import load_dotenv
+from collections import deque
+from typing import Optional, Callable, Deque, Tuple
+import asyncio
+import logging
+import json
+import time
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Interactive lane: user-facing searches. Short queue, reject fast rather than pile up.
+INTERACTIVE_MAX_CONCURRENCY = int(os.getenv("INTERACTIVE_MAX_CONCURRENCY", "16"))
+INTERACTIVE_MAX_QUEUE = int(os.getenv("INTERACTIVE_MAX_QUEUE", "32"))
+INTERACTIVE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("INTERACTIVE_QUEUE_TIMEOUT_SECONDS", "1"))
+# Batch lane: embedding generation, syncs, refreshes. Callers can wait, searches can't.
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "2"))
+BATCH_THROTTLED_CONCURRENCY = int(os.getenv("BATCH_THROTTLED_CONCURRENCY", "1"))
+BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "8"))
+BATCH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("BATCH_QUEUE_TIMEOUT_SECONDS", "120"))
+# Batch work is held to BATCH_THROTTLED_CONCURRENCY while recent interactive p95 exceeds this
+SEARCH_LATENCY_SLO_SECONDS = float(os.getenv("SEARCH_LATENCY_SLO_SECONDS", "0.5"))
+SLO_WINDOW_SECONDS = 60
+SLO_WINDOW_SIZE = 500
+SLO_MIN_SAMPLES = 20
+RETRY_AFTER_SECONDS = {"interactive": 1, "batch": 30}
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# (method, path prefix, lane), first match wins; unmatched routes (health, metrics, admin) bypass admission
+LANE_ROUTES = [
+    ("POST", "/elasticsearch/search/batch", BATCH),
+    ("POST", "/elasticsearch/search", INTERACTIVE),
+    ("POST", "/elasticsearch/browse", INTERACTIVE),
+    ("GET", "/elasticsearch/suggest", INTERACTIVE),
+    ("POST", "/elasticsearch/sync", BATCH),
+    ("POST", "/elasticsearch/rollover", BATCH),
+    ("POST", "/embeddings/generate/query", INTERACTIVE),
+    ("POST", "/embeddings/generate/data", BATCH),
+    ("POST", "/tenders/similar/refresh", BATCH),
+    ("GET", "/tenders/", INTERACTIVE),
+    ("POST", "/recommendations/refresh", BATCH),
+    ("GET", "/recommendations/", INTERACTIVE),
+    ("POST", "/alerts/match", BATCH),
+]
+
+
+class Lane:
+    """A concurrency limit with a bounded wait queue; lives on the event loop, so no locks"""
+
+    def __init__(self, name: str, limit: Callable[[], int], max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the server's running loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot, or return why the request is rejected"""
+        if self.waiting == 0 and self.active < self.limit():
+            self.active += 1
+            return None
+        if self.waiting >= self.max_queue:
+            return "queue_full"
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._wait_for_slot(), self.queue_timeout)
+            return None
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+
+    async def _wait_for_slot(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.limit())
+            self.active += 1
+
+    async def release(self):
+        self.active -= 1
+        await self.notify()
+
+    async def notify(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+
+class AdmissionController:
+    """
+    Splits traffic into an interactive lane (searches) and a batch lane
+    (embedding generation, syncs, refreshes), each with its own concurrency
+    limit and bounded queue. Requests that can't get a slot within their
+    lane's queue timeout, or arrive to a full queue, get a 429 straight away.
+
+    Interactive latency is tracked over a short window; while its p95 is
+    over SEARCH_LATENCY_SLO_SECONDS, or searches are already queueing, the
+    batch lane is cut to BATCH_THROTTLED_CONCURRENCY.
+    """
+
+    def __init__(self):
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=SLO_WINDOW_SIZE)
+        self.lanes = {
+            INTERACTIVE: Lane(INTERACTIVE, lambda: INTERACTIVE_MAX_CONCURRENCY,
+                              INTERACTIVE_MAX_QUEUE, INTERACTIVE_QUEUE_TIMEOUT_SECONDS),
+            BATCH: Lane(BATCH, self.batch_limit, BATCH_MAX_QUEUE, BATCH_QUEUE_TIMEOUT_SECONDS),
+        }
+
+    @staticmethod
+    def classify(method: str, path: str) -> Optional[str]:
+        for route_method, prefix, lane in LANE_ROUTES:
+            if method == route_method and path.startswith(prefix):
+                return lane
+        return None
+
+    def interactive_p95(self) -> Optional[float]:
+        cutoff = time.monotonic() - SLO_WINDOW_SECONDS
+        # list() copies in one step; the re-embedding thread reads this while the event loop appends
+        recent = sorted(seconds for finished_at, seconds in list(self._latencies) if finished_at >= cutoff)
+        if len(recent) < SLO_MIN_SAMPLES:
+            return None
+        return recent[int(0.95 * (len(recent) - 1))]
+
+    def slo_at_risk(self) -> bool:
+        if self.lanes[INTERACTIVE].waiting > 0:
+            return True
+        p95 = self.interactive_p95()
+        return p95 is not None and p95 > SEARCH_LATENCY_SLO_SECONDS
+
+    def batch_limit(self) -> int:
+        throttled = self.slo_at_risk()
+        ADMISSION_BATCH_THROTTLED.set(1 if throttled else 0)
+        return min(BATCH_THROTTLED_CONCURRENCY, BATCH_MAX_CONCURRENCY) if throttled else BATCH_MAX_CONCURRENCY
+
+    async def admit(self, lane_name: str) -> Optional[str]:
+        lane = self.lanes[lane_name]
+        queued_at = time.perf_counter()
+        rejection = await lane.acquire()
+        if rejection:
+            ADMISSION_REJECTED_TOTAL.labels(lane=lane_name, reason=rejection).inc()
+            # Debug only: under overload this fires per request; the counter is the signal
+            logger.debug(f"🚦 Rejected {lane_name} request ({rejection}): "
+                         f"{lane.active} running, {lane.waiting} queued")
+            return rejection
+        ADMISSION_QUEUE_SECONDS.labels(lane=lane_name).observe(time.perf_counter() - queued_at)
+        ADMISSION_IN_FLIGHT.labels(lane=lane_name).inc()
+        return None
+
+    async def release(self, lane_name: str, seconds: float):
+        ADMISSION_IN_FLIGHT.labels(lane=lane_name).dec()
+        if lane_name == INTERACTIVE:
+            self._latencies.append((time.monotonic(), seconds))
+        await self.lanes[lane_name].release()
+        # Interactive traffic finishing can lift the batch throttle
+        if lane_name == INTERACTIVE and self.lanes[BATCH].waiting:
+            await self.lanes[BATCH].notify()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware; the slot is held until the response and any background tasks finish"""
+
+    def __init__(self, app, controller: Optional["AdmissionController"] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        lane = self.controller.classify(scope.get("method", ""), scope.get("path", "")) \
+            if ADMISSION_ENABLED and scope["type"] == "http" else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = await self.controller.admit(lane)
+        if rejection:
+            await self._reject(send, lane, rejection)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.controller.release(lane, time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(send, lane: str, reason: str):
+        body = json.dumps({"detail": f"Server busy ({lane} lane {reason.replace('_', ' ')}), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(RETRY_AFTER_SECONDS[lane]).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# Global instance
+admission_controller = AdmissionController()
@@ -0,0 +1,259 @@
+from .search_service import search_service, ALL_TENDERS_INDICES
+from .embedding_models import get_model, model_spec, indexed_versions, EMBEDDING_SOURCE_VERSION
+from .metrics import ALERT_MATCH_SECONDS, ALERT_MATCHES_TOTAL
+from dotenv import load_dotenv
+from typing import Optional, List, Dict, Any
+import numpy as np
+import logging
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SAVED_SEARCHES_INDEX = os.getenv("SAVED_SEARCHES_INDEX", "saved_searches")
+# Tenders per percolate request and saved searches per result page
+PERCOLATE_BATCH_SIZE = int(os.getenv("PERCOLATE_BATCH_SIZE", "200"))
+PERCOLATE_PAGE_SIZE = 1000
+# Cosine cut-off for saved searches that match on meaning instead of keywords
+DEFAULT_MIN_SIMILARITY = float(os.getenv("SAVED_SEARCH_MIN_SIMILARITY", "0.45"))
+
+# Fields that only exist on the stored saved-search documents
+PERCOLATOR_PROPERTIES = {
+    "query": {"type": "percolator"},
+    "saved_search_id": {"type": "keyword"},
+    "user_id": {"type": "keyword"},
+    "query_text": {"type": "text"},
+    "min_similarity": {"type": "float"},
+    # False for semantic searches without filters, which are compared with every tender directly
+    "percolated": {"type": "boolean"},
+    # Kept in _source for the cosine check, never searched
+    "query_embedding": {"type": "object", "enabled": False},
+}
+# Tender fields left out of percolated documents; matching never reads them
+UNPERCOLATED_FIELDS = ["embedding_input", "suggest"] + [model_spec(version)["field"] for version in indexed_versions()]
+
+
+class AlertService:
+    """
+    Reverse search for saved-search alerts.
+
+    Each saved search is stored once as a percolator query (its filters,
+    plus its keywords unless it matches semantically). A batch of new
+    tenders is then percolated in a single request, so the cost of alert
+    matching grows with new tenders instead of with saved searches.
+
+    A semantic search with no filters has no clause to percolate on and
+    would come back for every tender, so it is stored unpercolated and its
+    embedding is compared with the batch in one matrix product instead.
+    """
+
+    def __init__(self):
+        logger.info("🔔 Initializing AlertService")
+        self.es = search_service.es
+
+    def create_saved_searches_index(self):
+        """Create the percolator index; tender fields are mapped so stored queries can reference them"""
+        properties = {
+            field: spec
+            for field, spec in search_service._tenders_index_mapping()["mappings"]["properties"].items()
+            if field not in UNPERCOLATED_FIELDS
+        }
+        properties.update(PERCOLATOR_PROPERTIES)
+        try:
+            result = self.es.indices.create(index=SAVED_SEARCHES_INDEX, body={"mappings": {"properties": properties}}, ignore=400)
+            logger.info(f"✅ Saved searches index ready: {result}")
+        except Exception as e:
+            logger.error(f"❌ Failed to create saved searches index: {e}")
+            raise
+
+    def _build_percolator_query(self, query_text: str, filters: Dict[str, Any], semantic: bool) -> Optional[Dict[str, Any]]:
+        """The stored query: the saved search's filters, plus its keywords for keyword alerts; None if nothing narrows it"""
+        filter_clauses = search_service._build_filters(**filters)
+        if not filter_clauses and (semantic or not query_text):
+            return None
+        percolator_query = {"bool": {"filter": filter_clauses}}
+        if query_text and not semantic:
+            percolator_query["bool"]["must"] = [{
+                "multi_match": {
+                    "query": query_text,
+                    "fields": ["title^3", "description^2", "summary^2"],
+                    "type": "cross_fields",
+                    "operator": "and"
+                }
+            }]
+        return percolator_query
+
+    def register_saved_search(self, saved_search_id: str, user_id: str, query_text: str = "",
+                              filters: Optional[Dict[str, Any]] = None,
+                              embedding: Optional[List[float]] = None,
+                              use_embedding: bool = False,
+                              min_similarity: Optional[float] = None) -> Dict[str, Any]:
+        """Store (or replace) a saved search as a percolator query"""
+        filters = {k: v for k, v in (filters or {}).items() if v}
+        if use_embedding and embedding is None and query_text:
+            # Compared against the tenders' Supabase vectors, so encode in the same (source) space
+            embedding = get_model(EMBEDDING_SOURCE_VERSION).encode(query_text).tolist()
+        semantic = embedding is not None
+        percolator_query = self._build_percolator_query(query_text, filters, semantic)
+        if percolator_query is None and not semantic:
+            # Would alert on every new tender
+            raise ValueError("A saved search needs keywords, filters or an embedding")
+
+        doc = {
+            "saved_search_id": saved_search_id,
+            "user_id": user_id,
+            "query_text": query_text,
+            "query": percolator_query or {"match_none": {}},
+            "percolated": percolator_query is not None,
+            "min_similarity": (min_similarity if min_similarity is not None else DEFAULT_MIN_SIMILARITY) if semantic else None,
+            "query_embedding": embedding,
+        }
+        if not self.es.indices.exists(index=SAVED_SEARCHES_INDEX):
+            self.create_saved_searches_index()
+        self.es.index(index=SAVED_SEARCHES_INDEX, id=saved_search_id, body=doc, refresh="wait_for")
+        logger.info(f"🔔 Registered saved search {saved_search_id} ({'semantic' if semantic else 'keyword'})")
+        return {"status": "success", "saved_search_id": saved_search_id, "semantic": semantic}
+
+    def unregister_saved_search(self, saved_search_id: str) -> Dict[str, Any]:
+        """Remove a saved search so it no longer produces alerts"""
+        try:
+            self.es.delete(index=SAVED_SEARCHES_INDEX, id=saved_search_id, refresh="wait_for")
+            return {"status": "success", "saved_search_id": saved_search_id}
+        except Exception as e:
+            return {"status": "error", "saved_search_id": saved_search_id, "error": str(e)}
+
+    def _percolate_batch(self, tenders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One reverse search for a batch of tenders; yields candidate (saved search, tender) pairs"""
+        documents = []
+        for tender in tenders:
+            doc = search_service._build_tender_doc(dict(tender))
+            for field in UNPERCOLATED_FIELDS:
+                doc.pop(field, None)
+            documents.append(doc)
+
+        candidates = []
+        search_after = None
+        while True:
+            body = {
+                "size": PERCOLATE_PAGE_SIZE,
+                "_source": ["saved_search_id", "user_id", "min_similarity", "query_embedding"],
+                "query": {"percolate": {"field": "query", "documents": documents}},
+                "sort": [{"saved_search_id": "asc"}],
+            }
+            if search_after:
+                body["search_after"] = search_after
+            hits = self.es.search(index=SAVED_SEARCHES_INDEX, body=body)["hits"]["hits"]
+            if not hits:
+                break
+            for hit in hits:
+                # With several documents, each hit lists the slots (batch positions) it matched
+                slots = hit.get("fields", {}).get("_percolator_document_slot", [0])
+                for slot in slots:
+                    candidates.append({"saved_search": hit["_source"], "tender": tenders[slot]})
+            search_after = hits[-1]["sort"]
+        return candidates
+
+    def _unpercolated_searches(self) -> List[Dict[str, Any]]:
+        """Semantic saved searches without filters, which match_tenders compares with tenders directly"""
+        searches = []
+        search_after = None
+        while True:
+            body = {
+                "size": PERCOLATE_PAGE_SIZE,
+                "_source": ["saved_search_id", "user_id", "min_similarity", "query_embedding"],
+                "query": {"term": {"percolated": False}},
+                "sort": [{"saved_search_id": "asc"}],
+            }
+            if search_after:
+                body["search_after"] = search_after
+            hits = self.es.search(index=SAVED_SEARCHES_INDEX, body=body)["hits"]["hits"]
+            if not hits:
+                return searches
+            searches.extend(hit["_source"] for hit in hits)
+            search_after = hits[-1]["sort"]
+
+    def _match_unpercolated(self, tenders: List[Dict[str, Any]], searches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """(saved search, tender) pairs whose cosine similarity reaches the saved search's threshold"""
+        if not searches:
+            return []
+        dims = model_spec(EMBEDDING_SOURCE_VERSION)["dims"]
+        tenders_matrix = np.zeros((len(tenders), dims), dtype=np.float32)
+        for row, tender in enumerate(tenders):
+            embedding = tender.get("embedding")
+            if embedding is not None and len(embedding) == dims:
+                tenders_matrix[row] = embedding
+        searches_matrix = np.asarray([search["query_embedding"] for search in searches], dtype=np.float32)
+        tenders_matrix /= np.maximum(np.linalg.norm(tenders_matrix, axis=1, keepdims=True), 1e-12)
+        searches_matrix /= np.maximum(np.linalg.norm(searches_matrix, axis=1, keepdims=True), 1e-12)
+        thresholds = np.asarray([
+            DEFAULT_MIN_SIMILARITY if search.get("min_similarity") is None else search["min_similarity"]
+            for search in searches
+        ], dtype=np.float32)
+        rows, columns = np.nonzero(tenders_matrix @ searches_matrix.T >= thresholds)
+        return [{"saved_search": searches[column], "tender": tenders[row]} for row, column in zip(rows, columns)]
+
+    def _passes_similarity(self, candidates: List[Dict[str, Any]]) -> List[bool]:
+        """Vectorised cosine check for semantic saved searches; keyword ones always pass"""
+        keep = [True] * len(candidates)
+        semantic = [
+            i for i, c in enumerate(candidates)
+            if c["saved_search"].get("query_embedding") is not None
+        ]
+        if not semantic:
+            return keep
+        tender_vectors = []
+        for i in semantic:
+            embedding = candidates[i]["tender"].get("embedding")
+            tender_vectors.append(embedding if embedding is not None and len(embedding) else np.zeros(model_spec(EMBEDDING_SOURCE_VERSION)["dims"]))
+        tenders_matrix = np.asarray(tender_vectors, dtype=np.float32)
+        searches_matrix = np.asarray([candidates[i]["saved_search"]["query_embedding"] for i in semantic], dtype=np.float32)
+        tenders_matrix /= np.maximum(np.linalg.norm(tenders_matrix, axis=1, keepdims=True), 1e-12)
+        searches_matrix /= np.maximum(np.linalg.norm(searches_matrix, axis=1, keepdims=True), 1e-12)
+        similarity = np.einsum("ij,ij->i", tenders_matrix, searches_matrix)
+        for row, i in enumerate(semantic):
+            threshold = candidates[i]["saved_search"].get("min_similarity")
+            threshold = DEFAULT_MIN_SIMILARITY if threshold is None else threshold
+            keep[i] = bool(similarity[row] >= threshold)
+        return keep
+
+    def match_tenders(self, tenders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Match newly indexed tenders against every saved search; returns (saved search, tender) pairs"""
+        if not tenders:
+            return []
+        try:
+            if not self.es.indices.exists(index=SAVED_SEARCHES_INDEX):
+                return []
+        except Exception as e:
+            logger.error(f"❌ Error checking saved searches index: {e}")
+            return []
+
+        matches = []
+        with ALERT_MATCH_SECONDS.time():
+            unpercolated = self._unpercolated_searches()
+            for start in range(0, len(tenders), PERCOLATE_BATCH_SIZE):
+                batch = tenders[start:start + PERCOLATE_BATCH_SIZE]
+                candidates = self._percolate_batch(batch)
+                kept = [c for c, keep in zip(candidates, self._passes_similarity(candidates)) if keep]
+                for candidate in kept + self._match_unpercolated(batch, unpercolated):
+                    matches.append({
+                        "saved_search_id": candidate["saved_search"]["saved_search_id"],
+                        "user_id": candidate["saved_search"].get("user_id"),
+                        "tender_id": candidate["tender"]["id"],
+                    })
+        ALERT_MATCHES_TOTAL.inc(len(matches))
+        logger.info(f"🔔 Alert matching: {len(tenders)} new tenders -> {len(matches)} saved search matches")
+        return matches
+
+    def match_tender_ids(self, tender_ids: List[str]) -> List[Dict[str, Any]]:
+        """Match tenders that are already indexed, looked up by id"""
+        if not tender_ids:
+            return []
+        # Tenders may sit in either the hot or the archive index
+        body = {"size": len(tender_ids), "query": {"ids": {"values": tender_ids}}}
+        tenders = [hit["_source"] for hit in self.es.search(index=ALL_TENDERS_INDICES, body=body)["hits"]["hits"]]
+        return self.match_tenders(tenders)
+
+# Global instance
+alert_service = AlertService()
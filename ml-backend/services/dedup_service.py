@@ -0,0 +1,210 @@
+from .search_service import search_service
+from dotenv import load_dotenv
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from datetime import datetime
+import numpy as np
+import hashlib
+import logging
+import re
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# MinHash signature = DEDUP_BANDS x DEDUP_ROWS_PER_BAND hashes. With 16 x 4, pairs with
+# Jaccard 0.5 become LSH candidates ~65% of the time and pairs at 0.8 ~99.9%.
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_ROWS_PER_BAND = int(os.getenv("DEDUP_ROWS_PER_BAND", "4"))
+DEDUP_SHINGLE_SIZE = 3
+# A candidate pair is a duplicate only if both the text and the meaning agree
+DEDUP_MIN_JACCARD = float(os.getenv("DEDUP_MIN_JACCARD", "0.4"))
+DEDUP_MIN_COSINE = float(os.getenv("DEDUP_MIN_COSINE", "0.92"))
+# Reposts share a closing date; recurring yearly tenders with the same wording do not
+DEDUP_MAX_CLOSING_DAYS_APART = int(os.getenv("DEDUP_MAX_CLOSING_DAYS_APART", "3"))
+# Only merge postings from different sources (CanadaBuys vs a municipal portal, ...)
+DEDUP_CROSS_SOURCE_ONLY = os.getenv("DEDUP_CROSS_SOURCE_ONLY", "true").lower() == "true"
+# LSH buckets bigger than this are boilerplate ("see attached"), not duplicates
+DEDUP_MAX_BUCKET_SIZE = 50
+# Tender fields the duplicate check reads
+DEDUP_FIELDS = ["id", "source", "title", "description", "published_date", "closing_date", "status", "embedding",
+                "canonical_id"]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser; uint64 arithmetic wraps, which is what we want here"""
+    z = values.copy()
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(0xBF58476D1CE4E5B9)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    return z
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")[:19])
+    except ValueError:
+        return None
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class DedupService:
+    """
+    Cross-source near-duplicate detection at ingest.
+
+    Title + description word shingles are MinHashed and banded into LSH
+    buckets, so only tenders sharing a bucket are ever compared (roughly
+    linear in the number of tenders). A candidate pair is a duplicate when
+    its estimated Jaccard and its embedding cosine both clear their
+    thresholds. Each cluster gets one canonical id, written to the index
+    so search can collapse on it.
+    """
+
+    def __init__(self, bands: int = DEDUP_BANDS, rows_per_band: int = DEDUP_ROWS_PER_BAND, seed: int = 1):
+        self.bands = bands
+        self.rows_per_band = rows_per_band
+        rng = np.random.default_rng(seed)
+        self._seeds = rng.integers(0, 2**63, size=bands * rows_per_band, dtype=np.uint64)
+
+    def _shingles(self, tender: Dict[str, Any]) -> np.ndarray:
+        """Hashed word 3-grams of title + description"""
+        tokens = _TOKEN_RE.findall(f"{tender.get('title') or ''} {tender.get('description') or ''}".lower())
+        if len(tokens) < DEDUP_SHINGLE_SIZE:
+            grams = {" ".join(tokens)} if tokens else set()
+        else:
+            grams = {" ".join(tokens[i:i + DEDUP_SHINGLE_SIZE]) for i in range(len(tokens) - DEDUP_SHINGLE_SIZE + 1)}
+        return np.fromiter(
+            (int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "little") for gram in grams),
+            dtype=np.uint64, count=len(grams),
+        )
+
+    def signature(self, tender: Dict[str, Any]) -> Optional[np.ndarray]:
+        """MinHash signature, or None for tenders with no text"""
+        shingles = self._shingles(tender)
+        if len(shingles) == 0:
+            return None
+        return _mix64(shingles[None, :] ^ self._seeds[:, None]).min(axis=1)
+
+    def _candidate_pairs(self, signatures: List[Optional[np.ndarray]]) -> Iterable[Tuple[int, int]]:
+        seen = set()
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = {}
+            lo, hi = band * self.rows_per_band, (band + 1) * self.rows_per_band
+            for i, sig in enumerate(signatures):
+                if sig is not None:
+                    buckets.setdefault(sig[lo:hi].tobytes(), []).append(i)
+            for members in buckets.values():
+                if len(members) < 2 or len(members) > DEDUP_MAX_BUCKET_SIZE:
+                    continue
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        pair = (members[x], members[y])
+                        if pair not in seen:
+                            seen.add(pair)
+                            yield pair
+
+    def _is_duplicate(self, a: Dict[str, Any], b: Dict[str, Any], sig_a: np.ndarray, sig_b: np.ndarray,
+                      vec_a: Optional[np.ndarray], vec_b: Optional[np.ndarray]) -> bool:
+        if DEDUP_CROSS_SOURCE_ONLY and a.get("source") and a.get("source") == b.get("source"):
+            return False
+        closing_a, closing_b = _parse_date(a.get("closing_date")), _parse_date(b.get("closing_date"))
+        if closing_a and closing_b and abs((closing_a - closing_b).days) > DEDUP_MAX_CLOSING_DAYS_APART:
+            return False
+        if float(np.mean(sig_a == sig_b)) < DEDUP_MIN_JACCARD:
+            return False
+        if vec_a is None or vec_b is None:
+            return True
+        return float(vec_a @ vec_b) >= DEDUP_MIN_COSINE
+
+    @staticmethod
+    def _unit_vector(tender: Dict[str, Any]) -> Optional[np.ndarray]:
+        embedding = tender.get("embedding")
+        if embedding is None or isinstance(embedding, str) or len(embedding) == 0:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    @staticmethod
+    def _canonical(members: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Earliest published open posting wins; id breaks ties so reruns agree.
+
+        Open postings come first because browse and recommendations only show
+        canonical tenders from the hot index: an archived canonical would hide
+        its still-open duplicates.
+        """
+        return min(members, key=lambda t: (search_service._is_archived(t),
+                                           _parse_date(t.get("published_date")) or datetime.max, str(t.get("id"))))
+
+    def assign_canonical_ids(self, tenders: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Cluster near-duplicates and set `canonical_id` on every tender in place"""
+        signatures = [self.signature(t) for t in tenders]
+        vectors = [self._unit_vector(t) for t in tenders]
+        clusters = _UnionFind(len(tenders))
+        candidates = 0
+        for i, j in self._candidate_pairs(signatures):
+            candidates += 1
+            if self._is_duplicate(tenders[i], tenders[j], signatures[i], signatures[j], vectors[i], vectors[j]):
+                clusters.union(i, j)
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(tenders)):
+            groups.setdefault(clusters.find(i), []).append(i)
+        duplicate_clusters = 0
+        for members in groups.values():
+            canonical_id = self._canonical([tenders[i] for i in members])["id"]
+            for i in members:
+                tenders[i]["canonical_id"] = canonical_id
+            duplicate_clusters += len(members) > 1
+
+        duplicates = len(tenders) - len(groups)
+        logger.info(f"🧬 Dedup: {len(tenders)} tenders, {candidates} LSH candidate pairs, "
+                    f"{duplicate_clusters} duplicate clusters ({duplicates} duplicates)")
+        return {"tenders": len(tenders), "candidate_pairs": candidates,
+                "duplicate_clusters": duplicate_clusters, "duplicates": duplicates}
+
+    def find_canonical_id(self, tender: Dict[str, Any], neighbours: List[Dict[str, Any]]) -> str:
+        """Canonical id for one incoming tender, given its nearest indexed neighbours"""
+        signature = self.signature(tender)
+        vector = self._unit_vector(tender)
+        if signature is None:
+            return tender["id"]
+        matches = [tender]
+        for other in neighbours:
+            if str(other.get("id")) == str(tender.get("id")):
+                continue
+            other_signature = self.signature(other)
+            if other_signature is not None and self._is_duplicate(tender, other, signature, other_signature,
+                                                                  vector, self._unit_vector(other)):
+                matches.append(other)
+        if len(matches) == 1:
+            return tender["id"]
+        # Join the existing cluster rather than starting a competing one
+        existing = [m.get("canonical_id") for m in matches[1:] if m.get("canonical_id")]
+        return existing[0] if existing else self._canonical(matches)["id"]
+
+# Global instance
+dedup_service = DedupService()
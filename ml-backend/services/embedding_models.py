@@ -0,0 +1,65 @@
+from sentence_transformers import SentenceTransformer
+from dotenv import load_dotenv
+from typing import Dict, Any, List
+import threading
+import logging
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Registered encoders by version tag. `field` is the dense_vector field holding that
+# version's vectors in the tenders indices; the original model keeps `embedding`.
+EMBEDDING_MODELS: Dict[str, Dict[str, Any]] = {
+    "minilm-l6-v1": {"name": "all-MiniLM-L6-v2", "dims": 384, "field": "embedding"},
+}
+DEFAULT_EMBEDDING_VERSION = "minilm-l6-v1"
+
+# Version of the vectors the scrapers store in Supabase (/embeddings/generate/*)
+EMBEDDING_SOURCE_VERSION = os.getenv("EMBEDDING_SOURCE_VERSION", DEFAULT_EMBEDDING_VERSION)
+# Version Elasticsearch queries are encoded with; flip to the migrated version to cut over
+EMBEDDING_MODEL_VERSION = os.getenv("EMBEDDING_MODEL_VERSION", EMBEDDING_SOURCE_VERSION)
+# Version being backfilled ahead of a cut-over; unset when no upgrade is in progress
+EMBEDDING_MODEL_NEXT = os.getenv("EMBEDDING_MODEL_NEXT") or None
+
+_models: Dict[str, SentenceTransformer] = {}
+_models_lock = threading.Lock()
+
+
+def model_spec(version: str) -> Dict[str, Any]:
+    if version not in EMBEDDING_MODELS:
+        raise ValueError(f"Unknown embedding model version '{version}' (known: {', '.join(EMBEDDING_MODELS)})")
+    return EMBEDDING_MODELS[version]
+
+
+def get_model(version: str) -> SentenceTransformer:
+    """Load each encoder once per process, however many services use it"""
+    model = _models.get(version)
+    if model is None:
+        with _models_lock:
+            model = _models.get(version)
+            if model is None:
+                name = model_spec(version)["name"]
+                logger.info(f"📊 Loading SentenceTransformer model: {name} ({version})")
+                model = SentenceTransformer(name)
+                _models[version] = model
+                logger.info("✅ SentenceTransformer model loaded successfully")
+    return model
+
+
+def indexed_versions() -> List[str]:
+    """Versions with a vector field in the tenders indices: source, serving and next"""
+    versions = [EMBEDDING_SOURCE_VERSION, EMBEDDING_MODEL_VERSION, EMBEDDING_MODEL_NEXT]
+    return [v for i, v in enumerate(versions) if v and v not in versions[:i]]
+
+
+def backfilled_versions() -> List[str]:
+    """Versions that only ml-backend can produce, so re-embedding has to fill them in"""
+    return [v for v in indexed_versions() if v != EMBEDDING_SOURCE_VERSION]
+
+
+# Fail at startup, not on the first query, if the configuration names an unknown model
+for _version in indexed_versions():
+    model_spec(_version)
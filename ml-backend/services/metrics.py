@@ -0,0 +1,155 @@
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import multiprocess
+from dotenv import load_dotenv
+import logging
+import random
+import os
+
+load_dotenv()
+
+# Fraction of search requests that get the full per-request log trail at INFO.
+# DEBUG level always logs every request; 0 keeps production logging quiet.
+SEARCH_LOG_SAMPLE_RATE = float(os.getenv("SEARCH_LOG_SAMPLE_RATE", "0"))
+
+# Buckets tuned for an in-process encode (~5-50ms) up to a slow ES round trip
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+SEARCH_ENCODE_SECONDS = Histogram(
+    "search_encode_seconds",
+    "Time spent encoding the search query with the embedding model",
+    buckets=LATENCY_BUCKETS,
+)
+SEARCH_ES_QUERY_SECONDS = Histogram(
+    "search_es_query_seconds",
+    "Time spent waiting on the Elasticsearch search call",
+    buckets=LATENCY_BUCKETS,
+)
+SEARCH_RESULT_PROCESSING_SECONDS = Histogram(
+    "search_result_processing_seconds",
+    "Time spent turning Elasticsearch hits into search results",
+    buckets=LATENCY_BUCKETS,
+)
+SEARCH_LATENCY_SECONDS = Histogram(
+    "search_latency_seconds",
+    "End-to-end search_tenders latency",
+    buckets=LATENCY_BUCKETS,
+)
+SEARCH_ERRORS_TOTAL = Counter(
+    "search_errors_total",
+    "Search failures by stage",
+    ["stage"],
+)
+SEARCH_VECTOR_INDEX_TOTAL = Counter(
+    "search_vector_index_total",
+    "Searches answered by the in-process vector index, by reason",
+    ["reason"],
+)
+
+SYNC_TENDERS_TOTAL = Counter(
+    "sync_tenders_total",
+    "Tenders processed by sync, by outcome",
+    ["outcome"],
+)
+SYNC_DURATION_SECONDS = Histogram(
+    "sync_duration_seconds",
+    "Wall time of a full Supabase to Elasticsearch sync",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+SYNC_ERRORS_TOTAL = Counter(
+    "sync_errors_total",
+    "Sync runs that aborted with an error",
+)
+
+ALERT_MATCH_SECONDS = Histogram(
+    "alert_match_seconds",
+    "Time spent percolating a set of new tenders against saved searches",
+    buckets=LATENCY_BUCKETS,
+)
+ALERT_MATCHES_TOTAL = Counter(
+    "alert_matches_total",
+    "Saved search to tender matches produced by percolation",
+)
+
+SIMILAR_TENDERS_REFRESH_SECONDS = Histogram(
+    "similar_tenders_refresh_seconds",
+    "Wall time of a similar-tenders neighbour refresh",
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600),
+)
+SIMILAR_TENDERS_RECOMPUTED_TOTAL = Counter(
+    "similar_tenders_recomputed_total",
+    "Neighbour lists recomputed by similar-tenders refreshes",
+)
+
+RECOMMENDATIONS_REFRESH_SECONDS = Histogram(
+    "recommendations_refresh_seconds",
+    "Wall time of a recommendations refresh",
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600),
+)
+RECOMMENDATIONS_SCORED_PAIRS_TOTAL = Counter(
+    "recommendations_scored_pairs_total",
+    "User profile x tender pairs scored by recommendations refreshes",
+)
+
+SUGGEST_LATENCY_SECONDS = Histogram(
+    "suggest_latency_seconds",
+    "End-to-end typeahead suggestion latency",
+    buckets=LATENCY_BUCKETS,
+)
+SUGGEST_CACHE_TOTAL = Counter(
+    "suggest_cache_total",
+    "Typeahead prefix cache lookups by result (hit, miss)",
+    ["result"],
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests currently holding a slot in an admission lane",
+    ["lane"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "admission_queue_seconds",
+    "Time a request waited for a lane slot before running",
+    ["lane"],
+    buckets=LATENCY_BUCKETS + (10.0, 30.0, 60.0),
+)
+ADMISSION_REJECTED_TOTAL = Counter(
+    "admission_rejected_total",
+    "Requests answered with 429 by admission control",
+    ["lane", "reason"],
+)
+ADMISSION_BATCH_THROTTLED = Gauge(
+    "admission_batch_throttled",
+    "1 while batch work is held to its reduced limit because search latency is over SLO",
+    multiprocess_mode="livemax",
+)
+
+EMBEDDING_BACKFILL_TOTAL = Counter(
+    "embedding_backfill_total",
+    "Tenders processed by background re-embedding, by model version and outcome",
+    ["version", "outcome"],
+)
+EMBEDDING_BACKFILL_SECONDS = Histogram(
+    "embedding_backfill_batch_seconds",
+    "Time to encode and store one re-embedding batch",
+    ["version"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def should_log_request(logger: logging.Logger) -> bool:
+    """Decide whether this request gets the verbose per-stage log trail"""
+    if logger.isEnabledFor(logging.DEBUG):
+        return True
+    return SEARCH_LOG_SAMPLE_RATE > 0 and random.random() < SEARCH_LOG_SAMPLE_RATE
+
+
+def render_metrics() -> bytes:
+    """Render all registered metrics in the Prometheus text format"""
+    # Under server.py every worker writes its samples to PROMETHEUS_MULTIPROC_DIR; merge them all
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
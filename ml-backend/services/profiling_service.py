@@ -0,0 +1,357 @@
+from fastapi.routing import APIRoute
+from dotenv import load_dotenv
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Callable, List, Dict, Any, Tuple
+import functools
+import cProfile
+import hmac
+import asyncio
+import pstats
+import threading
+import marshal
+import logging
+import time
+import uuid
+import sys
+import io
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Off by default: sessions expose stack dumps and Server-Timing exposes internals
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# When set, /profiling and x-debug-timing requests must send it in the x-profiling-token header
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_TOKEN_HEADER = "x-profiling-token"
+# Upper bound on requests one session may capture, and on sessions kept for download
+PROFILING_MAX_REQUESTS = int(os.getenv("PROFILING_MAX_REQUESTS", "100"))
+PROFILING_MAX_SESSIONS = 10
+# Armed sessions stop capturing after this long even if the route saw too few requests
+PROFILING_SESSION_TTL_SECONDS = int(os.getenv("PROFILING_SESSION_TTL_SECONDS", "900"))
+# Requests sending this header get a Server-Timing header with per-stage durations
+DEBUG_TIMING_HEADER = b"x-debug-timing"
+
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+
+# Per-request stage durations; only set while a request asked for Server-Timing.
+# Starlette copies the context into the threadpool, so sync endpoints append to the same list.
+_stage_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("stage_timings", default=None)
+
+
+def token_accepted(token: Optional[str]) -> bool:
+    """Whether a request may use profiling: always without PROFILING_TOKEN, otherwise only with it"""
+    if not PROFILING_TOKEN:
+        return True
+    return token is not None and hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+
+
+@contextmanager
+def timed(stage: str, histogram=None):
+    """Time a block into `histogram` (if given) and into the request's Server-Timing breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if histogram is not None:
+            histogram.observe(elapsed)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a timer and counts folded stacks"""
+
+    def __init__(self, thread_id: int, interval_seconds: float, root_code):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        # Stacks start at the endpoint; threadpool plumbing above it is left out, and samples
+        # taken outside it (profiler setup and teardown) are dropped
+        self.root_code = root_code
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = self._fold(frame) if frame is not None else None
+            if stack:
+                self.samples[stack] += 1
+
+    def _fold(self, frame) -> Optional[str]:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            if code is self.root_code:
+                return ";".join(reversed(names))
+            frame = frame.f_back
+        return None
+
+
+class ProfileSession:
+    """Profiles the next `requests` calls to one route and accumulates the result"""
+
+    def __init__(self, route: str, method: Optional[str], requests: int, mode: str, interval_ms: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.route = route
+        self.method = method.upper() if method else None
+        self.requests = requests
+        self.mode = mode
+        self.interval_seconds = interval_ms / 1000
+        self.created_at = time.time()
+        self.cancelled = False
+        self.remaining = requests
+        self.in_flight = 0
+        self.durations: List[float] = []
+        self.samples: Counter = Counter()
+        self.stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    @property
+    def expired(self) -> bool:
+        return time.time() - self.created_at > PROFILING_SESSION_TTL_SECONDS
+
+    @property
+    def state(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        if self.remaining == 0 and self.in_flight == 0:
+            return "complete"
+        if self.expired and self.in_flight == 0:
+            return "expired"
+        return "running" if self.durations or self.in_flight else "armed"
+
+    def matches(self, route: str, methods: Optional[set]) -> bool:
+        return self.route == route and (self.method is None or methods is None or self.method in methods)
+
+    def claim(self) -> bool:
+        with self._lock:
+            if self.cancelled or self.remaining == 0 or self.expired:
+                return False
+            self.remaining -= 1
+            self.in_flight += 1
+            return True
+
+    @contextmanager
+    def capture(self, root_code):
+        """Profile the enclosed call to the endpoint whose code object is `root_code` on the current thread"""
+        profile = sampler = None
+        if self.mode == CPROFILE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time per process; this request goes unprofiled
+                profile = None
+        else:
+            sampler = _StackSampler(threading.get_ident(), self.interval_seconds, root_code)
+            sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            samples = sampler.stop() if sampler is not None else None
+            with self._lock:
+                self.in_flight -= 1
+                self.durations.append(elapsed)
+                if samples:
+                    self.samples.update(samples)
+                if profile is not None:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profile)
+                    else:
+                        self.stats.add(profile)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            durations = sorted(self.durations)
+        return {
+            "id": self.id,
+            "route": self.route,
+            "method": self.method,
+            "mode": self.mode,
+            "state": self.state,
+            "requested": self.requests,
+            "captured": len(durations),
+            "in_flight": self.in_flight,
+            "mean_ms": round(1000 * sum(durations) / len(durations), 2) if durations else None,
+            "max_ms": round(1000 * durations[-1], 2) if durations else None,
+            "created_at": self.created_at,
+        }
+
+    def folded(self) -> str:
+        """Collapsed stacks, one `frame;frame;frame count` line each (flamegraph.pl, speedscope, inferno)"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def stats_text(self, limit: int = 50) -> str:
+        if self.stats is None:
+            return ""
+        stream = io.StringIO()
+        with self._lock:
+            self.stats.stream = stream
+            self.stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def pstats_bytes(self) -> bytes:
+        """Same bytes as Stats.dump_stats, loadable by pstats, snakeviz or flameprof"""
+        if self.stats is None:
+            return b""
+        with self._lock:
+            return marshal.dumps(self.stats.stats)
+
+
+class ProfilingService:
+    """
+    On-demand profiling of live requests.
+
+    An admin arms a session for a route; the next N requests to it run under
+    either a stack sampler (low overhead, folded stacks for flame graphs) or
+    cProfile (exact call counts, higher overhead), and the merged result is
+    kept for download. Routes opt in by using ProfiledRoute.
+    """
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, ProfileSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Why new sessions are refused, or None; server.py sets it when sessions would be split across workers
+        self.disabled_reason: Optional[str] = None if PROFILING_ENABLED else "PROFILING_ENABLED=false"
+
+    def start_session(self, route: str, method: Optional[str] = None, requests: int = 10,
+                      mode: str = SAMPLE, interval_ms: float = 5.0) -> ProfileSession:
+        session = ProfileSession(route, method, min(requests, PROFILING_MAX_REQUESTS), mode, interval_ms)
+        with self._lock:
+            self._sessions[session.id] = session
+            # Drop the oldest finished sessions once over the cap; live ones are never evicted
+            for old_id in list(self._sessions):
+                if len(self._sessions) <= PROFILING_MAX_SESSIONS:
+                    break
+                if self._sessions[old_id].state not in ("armed", "running"):
+                    del self._sessions[old_id]
+        logger.info(f"🔬 Profiling next {session.requests} requests to {route} ({mode}, session {session.id})")
+        return session
+
+    def get_session(self, session_id: str) -> Optional[ProfileSession]:
+        return self._sessions.get(session_id)
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [session.status() for session in sessions]
+
+    def cancel_session(self, session_id: str) -> bool:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        session.cancelled = True
+        return True
+
+    def claim(self, route: str, methods: Optional[set]) -> Optional[ProfileSession]:
+        # Unlocked emptiness check keeps the unprofiled path to a dict lookup
+        if not self._sessions:
+            return None
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            if session.matches(route, methods) and session.claim():
+                return session
+        return None
+
+
+def _profiled(endpoint: Callable, route: str, methods: Optional[set]) -> Callable:
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = profiling_service.claim(route, methods)
+        if session is None:
+            return endpoint(*args, **kwargs)
+        with session.capture(endpoint.__code__):
+            return endpoint(*args, **kwargs)
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose sync endpoint can be profiled on demand.
+
+    Only sync endpoints are wrapped: they run on their own threadpool
+    thread, so the profile holds just that request. Async endpoints share
+    the event loop thread with every other request and are left alone.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # include_router re-creates routes from the already wrapped endpoint
+        if getattr(endpoint, "__profiled__", False):
+            endpoint = endpoint.__wrapped__
+        self.profilable = PROFILING_ENABLED and not asyncio.iscoroutinefunction(endpoint)
+        if self.profilable:
+            methods = {m.upper() for m in kwargs["methods"]} if kwargs.get("methods") else None
+            endpoint = _profiled(endpoint, path, methods)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware; adds a Server-Timing header with per-stage durations when the request sends x-debug-timing: 1"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILING_ENABLED or scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _stage_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = self._header(timings, time.perf_counter() - start)
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _stage_timings.reset(token)
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        if headers.get(DEBUG_TIMING_HEADER, b"").lower() not in (b"1", b"true"):
+            return False
+        token = headers.get(PROFILING_TOKEN_HEADER.encode())
+        return token_accepted(token.decode("latin-1") if token is not None else None)
+
+    @staticmethod
+    def _header(timings: List[Tuple[str, float]], total: float) -> bytes:
+        # Stages repeated within a request (e.g. several ES calls) are summed, first-seen order kept
+        durations: Dict[str, float] = {}
+        for stage, seconds in list(timings):
+            durations[stage] = durations.get(stage, 0.0) + seconds
+        durations["total"] = total
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in durations.items()).encode()
+
+# Global instance
+profiling_service = ProfilingService()
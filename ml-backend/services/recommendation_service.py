@@ -0,0 +1,368 @@
+from .search_service import search_service, TENDERS_INDEX, ALL_TENDERS_INDICES
+from .sync_service import sync_service, SYNC_PAGE_SIZE
+from .similarity_service import embedding_hash
+from .embedding_models import model_spec
+from .metrics import RECOMMENDATIONS_REFRESH_SECONDS, RECOMMENDATIONS_SCORED_PAIRS_TOTAL
+from dotenv import load_dotenv
+from collections import defaultdict
+from typing import Optional, List, Dict, Any, Tuple, Set
+import numpy as np
+import threading
+import logging
+import time
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_INDEX = os.getenv("RECOMMENDATIONS_INDEX", "tender_recommendations")
+# Stored per user; more than a page so lists stay full as recommended tenders close between full refreshes
+RECOMMENDATIONS_K = int(os.getenv("RECOMMENDATIONS_K", "50"))
+# Tile shape of the profile x tender matmul; peak memory is about user_block x (tender_block + k) float32
+RECOMMENDATIONS_USER_BLOCK_SIZE = int(os.getenv("RECOMMENDATIONS_USER_BLOCK_SIZE", "4096"))
+RECOMMENDATIONS_TENDER_BLOCK_SIZE = int(os.getenv("RECOMMENDATIONS_TENDER_BLOCK_SIZE", "2048"))
+# Relative pull of each bookmarked tender and each saved search on a user's profile
+RECOMMENDATIONS_BOOKMARK_WEIGHT = float(os.getenv("RECOMMENDATIONS_BOOKMARK_WEIGHT", "1.0"))
+RECOMMENDATIONS_SAVED_SEARCH_WEIGHT = float(os.getenv("RECOMMENDATIONS_SAVED_SEARCH_WEIGHT", "1.0"))
+# How often the incremental refresh runs besides after syncs; 0 disables the timer
+RECOMMENDATIONS_INTERVAL_SECONDS = int(os.getenv("RECOMMENDATIONS_INTERVAL_SECONDS", "86400"))
+RECOMMENDATIONS_BULK_SIZE = 500
+# Bookmarked tender ids per vector lookup
+VECTOR_LOOKUP_BATCH_SIZE = 1000
+
+
+def top_k_scores(profiles: np.ndarray, tenders: np.ndarray, k: int,
+                 excluded: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                 user_block: int = RECOMMENDATIONS_USER_BLOCK_SIZE,
+                 tender_block: int = RECOMMENDATIONS_TENDER_BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k tenders for every profile, one profile-block x tender-block tile at a time.
+
+    Both matrices must be L2-normalised, so scores are cosine similarities.
+    `excluded` is a pair of (profile row, tender row) arrays that are never
+    recommended, e.g. a user's own bookmarks. Returns (indices, scores)
+    shaped (profiles, min(k, tenders)), best first; slots left unfilled by
+    exclusions score -inf.
+    """
+    n_users, n_tenders = len(profiles), len(tenders)
+    k = min(k, n_tenders)
+    indices = np.full((n_users, k), -1, dtype=np.int64)
+    scores = np.full((n_users, k), -np.inf, dtype=np.float32)
+    if k == 0 or n_users == 0:
+        return indices, scores
+    excluded_users, excluded_tenders = excluded if excluded is not None else (np.zeros(0, np.int64), np.zeros(0, np.int64))
+
+    for u0 in range(0, n_users, user_block):
+        block_profiles = profiles[u0:u0 + user_block]
+        in_block = (excluded_users >= u0) & (excluded_users < u0 + len(block_profiles))
+        block_excluded_users, block_excluded_tenders = excluded_users[in_block] - u0, excluded_tenders[in_block]
+        best_indices = indices[u0:u0 + len(block_profiles)]
+        best_scores = scores[u0:u0 + len(block_profiles)]
+        for t0 in range(0, n_tenders, tender_block):
+            tile = block_profiles @ tenders[t0:t0 + tender_block].T
+            in_tile = (block_excluded_tenders >= t0) & (block_excluded_tenders < t0 + tile.shape[1])
+            tile[block_excluded_users[in_tile], block_excluded_tenders[in_tile] - t0] = -np.inf
+            # Running top-k: the best so far compete with this tile's columns
+            candidate_scores = np.concatenate([best_scores, tile], axis=1)
+            candidate_indices = np.concatenate(
+                [best_indices, np.broadcast_to(np.arange(t0, t0 + tile.shape[1]), tile.shape)], axis=1)
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(candidate_scores, top, axis=1)
+            best_indices = np.take_along_axis(candidate_indices, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        scores[u0:u0 + len(block_profiles)] = np.take_along_axis(best_scores, order, axis=1)
+        indices[u0:u0 + len(block_profiles)] = np.take_along_axis(best_indices, order, axis=1)
+    return indices, scores
+
+
+def _normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class RecommendationService:
+    """
+    Precomputed "recommended for you" lists.
+
+    A user's profile is the normalised, weighted sum of their bookmarked
+    tenders' embeddings and their saved searches' query embeddings. A
+    refresh scores profiles against open tenders with a tiled matrix
+    multiply and stores each user's top-k in a side index keyed by user id,
+    so serving is one document read. Users whose profile is unchanged are
+    only scored against tenders created since their last refresh, merged
+    into their stored list; new or changed profiles are scored against
+    every open tender. Cost follows new tenders x users, not requests.
+    """
+
+    def __init__(self, k: int = RECOMMENDATIONS_K, interval_seconds: int = RECOMMENDATIONS_INTERVAL_SECONDS):
+        logger.info("🎯 Initializing RecommendationService")
+        self.k = k
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def es(self):
+        return search_service.es
+
+    def create_recommendations_index(self):
+        mapping = {
+            "mappings": {
+                "properties": {
+                    "id": {"type": "keyword"},
+                    "profile_hash": {"type": "keyword"},
+                    "model_version": {"type": "keyword"},
+                    # Served as-is on lookup, never searched
+                    "tenders": {"type": "keyword", "index": False},
+                    "scores": {"type": "float", "index": False},
+                    # created_at of the newest open tender this list has been scored against
+                    "scored_through": {"type": "date"},
+                    "bookmarks": {"type": "integer"},
+                    "saved_searches": {"type": "integer"},
+                    "computed_at": {"type": "date"},
+                }
+            }
+        }
+        self.es.indices.create(index=RECOMMENDATIONS_INDEX, body=mapping, ignore=400)
+
+    def get_recommendations(self, user_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Stored recommendations for one user, or None when none have been computed"""
+        try:
+            doc = self.es.get(index=RECOMMENDATIONS_INDEX, id=user_id)["_source"]
+        except Exception as e:
+            logger.debug(f"🔎 No recommendations stored for {user_id}: {e}")
+            return None
+        pairs = list(zip(doc.get("tenders", []), doc.get("scores", [])))
+        return [{"id": tender_id, "score": score} for tender_id, score in pairs[:limit or len(pairs)]]
+
+    # Profiles
+
+    def _fetch_rows(self, table: str, columns: str) -> List[Dict[str, Any]]:
+        """Every row of a Supabase table, paged by id so no single response is truncated"""
+        rows = []
+        while True:
+            query = sync_service.supabase.table(table).select(columns).order('id').limit(SYNC_PAGE_SIZE)
+            if rows:
+                query = query.gt('id', rows[-1]['id'])
+            page = query.execute().data
+            rows.extend(page)
+            if len(page) < SYNC_PAGE_SIZE:
+                return rows
+
+    def _tender_vectors(self, tender_ids: List[str]) -> Dict[str, np.ndarray]:
+        """Serving-model embeddings of the given tenders, hot or archived"""
+        field = search_service.vector_field
+        vectors = {}
+        for start in range(0, len(tender_ids), VECTOR_LOOKUP_BATCH_SIZE):
+            batch = tender_ids[start:start + VECTOR_LOOKUP_BATCH_SIZE]
+            body = {"size": len(batch), "_source": ["id", field], "query": {"ids": {"values": batch}}}
+            for hit in self.es.search(index=ALL_TENDERS_INDICES, body=body)["hits"]["hits"]:
+                embedding = hit["_source"].get(field)
+                if embedding:
+                    vectors[hit["_source"]["id"]] = np.asarray(embedding, dtype=np.float32)
+        return vectors
+
+    def _build_profiles(self) -> Tuple[List[str], np.ndarray, Dict[str, Set[str]], Dict[str, Dict[str, int]]]:
+        """(user ids, L2-normalised profile matrix, bookmarked tender ids per user, signal counts per user)"""
+        bookmarks = defaultdict(set)
+        for row in self._fetch_rows("bookmarks", "id,user_id,tender_notice_id"):
+            if row.get("user_id") and row.get("tender_notice_id"):
+                bookmarks[row["user_id"]].add(row["tender_notice_id"])
+        searches = defaultdict(list)
+        for row in self._fetch_rows("saved_searches", "id,user_id,query"):
+            if row.get("user_id") and (row.get("query") or "").strip():
+                searches[row["user_id"]].append(row["query"].strip())
+
+        tender_vectors = self._tender_vectors(sorted(set().union(*bookmarks.values())) if bookmarks else [])
+        queries = sorted({query for user_queries in searches.values() for query in user_queries})
+        query_vectors = dict(zip(queries, search_service.model.encode(queries, batch_size=64))) if queries else {}
+
+        dims = model_spec(search_service.model_version)["dims"]
+        # Each signal counts once whatever its vector's norm
+        unit = lambda vectors: _normalise_rows(np.asarray(vectors, dtype=np.float32)).sum(axis=0)
+        user_ids, rows, counts = [], [], {}
+        for user_id in sorted(set(bookmarks) | set(searches)):
+            liked = [tender_vectors[tender_id] for tender_id in bookmarks.get(user_id, ()) if tender_id in tender_vectors]
+            searched = [query_vectors[query] for query in searches.get(user_id, ())]
+            if not liked and not searched:
+                continue
+            profile = np.zeros(dims, dtype=np.float32)
+            if liked:
+                profile += RECOMMENDATIONS_BOOKMARK_WEIGHT * unit(liked)
+            if searched:
+                profile += RECOMMENDATIONS_SAVED_SEARCH_WEIGHT * unit(searched)
+            user_ids.append(user_id)
+            rows.append(profile)
+            counts[user_id] = {"bookmarks": len(liked), "saved_searches": len(searched)}
+        matrix = _normalise_rows(np.asarray(rows, dtype=np.float32).reshape(len(rows), dims))
+        return user_ids, matrix, bookmarks, counts
+
+    # Tenders
+
+    def _open_tenders(self, created_after: Optional[str] = None,
+                      with_vectors: bool = True) -> Tuple[List[str], np.ndarray, Optional[str]]:
+        """Open canonical tenders (optionally only those created after a timestamp), their vectors and newest created_at"""
+        field = search_service.vector_field
+        # Duplicates of a canonical tender are never recommended alongside it
+        filters = [{"bool": {"must_not": [{"term": {"is_canonical": False}}]}}]
+        if created_after:
+            filters.append({"range": {"created_at": {"gt": created_after}}})
+        ids, vectors, newest = [], [], None
+        fields = ["id", "created_at"] + ([field] if with_vectors else [])
+        for source in search_service.scan_tenders(fields=fields, index=TENDERS_INDEX, query={"bool": {"filter": filters}}):
+            created_at = source.get("created_at")
+            if created_at and (newest is None or created_at > newest):
+                newest = created_at
+            if with_vectors:
+                if not source.get(field):
+                    continue
+                vectors.append(source[field])
+            ids.append(str(source["id"]))
+        matrix = _normalise_rows(np.asarray(vectors, dtype=np.float32)) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return ids, matrix, newest
+
+    def _load_stored(self) -> Dict[str, Dict[str, Any]]:
+        if not self.es.indices.exists(index=RECOMMENDATIONS_INDEX):
+            self.create_recommendations_index()
+            return {}
+        return {
+            doc["id"]: doc
+            for doc in search_service.scan_tenders(fields=["id", "profile_hash", "model_version", "tenders", "scores",
+                                                           "scored_through"], index=RECOMMENDATIONS_INDEX)
+        }
+
+    def _score(self, user_rows: List[int], profiles: np.ndarray, user_ids: List[str], bookmarks: Dict[str, Set[str]],
+               tender_ids: List[str], tenders: np.ndarray) -> Dict[str, List[Tuple[str, float]]]:
+        """Top-k (tender id, score) per user for the given profile rows against the given tenders"""
+        if not user_rows or not tender_ids:
+            return {user_ids[row]: [] for row in user_rows}
+        position = {tender_id: i for i, tender_id in enumerate(tender_ids)}
+        excluded = [(i, position[tender_id]) for i, row in enumerate(user_rows)
+                    for tender_id in bookmarks.get(user_ids[row], ()) if tender_id in position]
+        excluded_pairs = tuple(np.asarray(column, dtype=np.int64) for column in zip(*excluded)) if excluded else None
+        indices, scores = top_k_scores(profiles[user_rows], tenders, self.k, excluded=excluded_pairs)
+        RECOMMENDATIONS_SCORED_PAIRS_TOTAL.inc(len(user_rows) * len(tender_ids))
+        return {
+            user_ids[row]: [(tender_ids[j], float(score)) for j, score in zip(indices[i], scores[i]) if np.isfinite(score)]
+            for i, row in enumerate(user_rows)
+        }
+
+    # Refresh
+
+    def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """Score new tenders against every profile, and every open tender against new or changed profiles (all if `full`)"""
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("⏭️ Recommendation refresh already running, skipping")
+            return {"status": "skipped", "reason": "already running"}
+        try:
+            with RECOMMENDATIONS_REFRESH_SECONDS.time():
+                return self._refresh(full)
+        except Exception as e:
+            logger.error(f"❌ Recommendation refresh failed: {e}")
+            return {"status": "error", "error": str(e)}
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self, full: bool) -> Dict[str, Any]:
+        start = time.perf_counter()
+        user_ids, profiles, bookmarks, counts = self._build_profiles()
+        stored = self._load_stored()
+        hashes = [embedding_hash(profile) for profile in profiles]
+        model_version = search_service.model_version
+
+        # Ids only: enough to drop tenders that closed from stored lists, and to move the watermark
+        open_ids, _, newest = self._open_tenders(with_vectors=False)
+        open_set = set(open_ids)
+
+        rescored, incremental = [], []
+        for row, user_id in enumerate(user_ids):
+            doc = stored.get(user_id)
+            if full or doc is None or doc.get("profile_hash") != hashes[row] or doc.get("model_version") != model_version \
+                    or not doc.get("scored_through"):
+                rescored.append(row)
+            else:
+                incremental.append(row)
+
+        lists = {}
+        new_tenders = 0
+        if rescored:
+            tender_ids, tenders, _ = self._open_tenders()
+            lists.update(self._score(rescored, profiles, user_ids, bookmarks, tender_ids, tenders))
+        if incremental:
+            since = min(stored[user_ids[row]]["scored_through"] for row in incremental)
+            tender_ids, tenders, _ = self._open_tenders(created_after=since)
+            new_tenders = len(tender_ids)
+            fresh = self._score(incremental, profiles, user_ids, bookmarks, tender_ids, tenders)
+            for row in incremental:
+                user_id = user_ids[row]
+                doc = stored[user_id]
+                merged = {tender_id: score for tender_id, score in zip(doc.get("tenders") or [], doc.get("scores") or [])
+                          if tender_id in open_set}
+                merged.update(fresh[user_id])
+                lists[user_id] = sorted(merged.items(), key=lambda pair: -pair[1])[:self.k]
+
+        computed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        actions = []
+        for row, user_id in enumerate(user_ids):
+            actions.append([
+                {"index": {"_index": RECOMMENDATIONS_INDEX, "_id": user_id}},
+                {
+                    "id": user_id,
+                    "profile_hash": hashes[row],
+                    "model_version": model_version,
+                    "tenders": [tender_id for tender_id, _ in lists[user_id]],
+                    "scores": [round(score, 5) for _, score in lists[user_id]],
+                    "scored_through": newest,
+                    "computed_at": computed_at,
+                    **counts[user_id],
+                },
+            ])
+        removed = set(stored) - set(user_ids)
+        for user_id in removed:
+            actions.append([{"delete": {"_index": RECOMMENDATIONS_INDEX, "_id": user_id}}])
+
+        failed = 0
+        for offset in range(0, len(actions), RECOMMENDATIONS_BULK_SIZE):
+            operations = [line for action in actions[offset:offset + RECOMMENDATIONS_BULK_SIZE] for line in action]
+            response = self.es.bulk(operations=operations)
+            if response.get("errors"):
+                failed += sum(1 for item in response["items"] if next(iter(item.values())).get("error"))
+        if failed:
+            logger.error(f"❌ Failed to store {failed} recommendation lists")
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"🎯 Recommendations refreshed for {len(user_ids)} users: {len(rescored)} rescored against "
+                    f"{len(open_ids)} open tenders, {len(incremental)} against {new_tenders} new, in {elapsed:.1f}s")
+        return {
+            "status": "success",
+            "users": len(user_ids),
+            "rescored_users": len(rescored),
+            "incremental_users": len(incremental),
+            "open_tenders": len(open_ids),
+            "new_tenders": new_tenders,
+            "removed": len(removed),
+            "failed": failed,
+            "seconds": round(elapsed, 3),
+        }
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.refresh()
+
+    def start(self):
+        if self.interval_seconds <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        logger.info(f"🎯 Starting recommendation refresh every {self.interval_seconds}s")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="recommendations", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+# Global instance
+recommendation_service = RecommendationService()
@@ -0,0 +1,202 @@
+from .search_service import search_service, ALL_TENDERS_INDICES
+from .embedding_models import (
+    get_model,
+    model_spec,
+    indexed_versions,
+    backfilled_versions,
+    EMBEDDING_SOURCE_VERSION,
+    EMBEDDING_MODEL_VERSION,
+    EMBEDDING_MODEL_NEXT,
+)
+from .admission_service import admission_controller
+from .metrics import EMBEDDING_BACKFILL_TOTAL, EMBEDDING_BACKFILL_SECONDS
+from dotenv import load_dotenv
+from typing import Optional, List, Dict, Any
+import threading
+import logging
+import time
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Tenders encoded per batch, and the pause between batches that leaves CPU for searches
+EMBEDDING_BACKFILL_BATCH_SIZE = int(os.getenv("EMBEDDING_BACKFILL_BATCH_SIZE", "64"))
+EMBEDDING_BACKFILL_PAUSE_SECONDS = float(os.getenv("EMBEDDING_BACKFILL_PAUSE_SECONDS", "0.5"))
+# Extra wait, repeated, while admission control reports search latency over SLO
+EMBEDDING_BACKFILL_BACKOFF_SECONDS = 5.0
+# How often the timer looks for tenders missing a vector; 0 disables the timer
+EMBEDDING_BACKFILL_INTERVAL_SECONDS = int(os.getenv("EMBEDDING_BACKFILL_INTERVAL_SECONDS", "600"))
+
+
+class ReembedService:
+    """
+    Background re-embedding for model upgrades.
+
+    Tenders missing a vector for a backfilled version (the next model ahead
+    of cut-over, or the serving model after it when Supabase still holds the
+    old one) are re-encoded from their stored `embedding_input` in small
+    batches, paced by a fixed pause and held back while searches are over
+    their latency SLO. Writes are conditional on the document's seq_no, so
+    a sync that replaces a document mid-batch wins and the tender is simply
+    picked up on the next pass.
+    """
+
+    def __init__(self, interval_seconds: int = EMBEDDING_BACKFILL_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    @property
+    def es(self):
+        return search_service.es
+
+    def status(self) -> Dict[str, Any]:
+        """Per-version coverage across hot and archived tenders, and whether cut-over is safe"""
+        total = self.es.count(index=ALL_TENDERS_INDICES, body={"query": {"exists": {"field": "embedding_input"}}})["count"]
+        versions = {}
+        for version in indexed_versions():
+            embedded = self.es.count(index=ALL_TENDERS_INDICES,
+                                     body={"query": {"term": {"embedding_versions": version}}})["count"]
+            versions[version] = {"model": model_spec(version)["name"], "embedded": embedded,
+                                 "missing": max(total - embedded, 0)}
+        return {
+            "source_version": EMBEDDING_SOURCE_VERSION,
+            "serving_version": EMBEDDING_MODEL_VERSION,
+            "next_version": EMBEDDING_MODEL_NEXT,
+            "tenders": total,
+            "versions": versions,
+            "running": self._run_lock.locked(),
+            "ready_for_cutover": bool(EMBEDDING_MODEL_NEXT) and versions[EMBEDDING_MODEL_NEXT]["missing"] == 0,
+            "last_result": self.last_result,
+        }
+
+    def run_once(self, versions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Backfill every tender missing a vector for the given (default: all backfilled) versions"""
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("⏭️ Re-embedding already running, skipping")
+            return {"status": "skipped", "reason": "already running"}
+        try:
+            start = time.perf_counter()
+            result = {"status": "success", "versions": {}}
+            for version in versions or backfilled_versions():
+                result["versions"][version] = self._backfill(version)
+                if "error" in result["versions"][version]:
+                    result["status"] = "error"
+                if self._stop.is_set():
+                    result["status"] = "stopped"
+                    break
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            self.last_result = result
+            return result
+        except Exception as e:
+            logger.error(f"❌ Re-embedding failed: {e}")
+            self.last_result = {"status": "error", "error": str(e)}
+            return self.last_result
+        finally:
+            self._run_lock.release()
+
+    def backfill_serving(self) -> Optional[Dict[str, Any]]:
+        """After a sync: give new tenders a serving-model vector when Supabase only has the source model's"""
+        if EMBEDDING_MODEL_VERSION not in backfilled_versions():
+            return None
+        return self.run_once([EMBEDDING_MODEL_VERSION])
+
+    def _throttle(self):
+        self._stop.wait(EMBEDDING_BACKFILL_PAUSE_SECONDS)
+        while admission_controller.slo_at_risk() and not self._stop.is_set():
+            logger.debug("🐢 Search latency over SLO, re-embedding backing off")
+            self._stop.wait(EMBEDDING_BACKFILL_BACKOFF_SECONDS)
+
+    def _backfill(self, version: str) -> Dict[str, Any]:
+        field = model_spec(version)["field"]
+        counts = {"embedded": 0, "conflicts": 0, "failed": 0}
+        try:
+            # Map the version's dense_vector field first; the timer may run before any sync
+            # has, and a dynamically mapped float array could never be mapped as a vector again
+            search_service.create_tenders_index()
+        except Exception as e:
+            logger.error(f"❌ Not backfilling {version}: could not map {field}: {e}")
+            return {**counts, "error": str(e)}
+        model = get_model(version)
+        search_after = None
+        while not self._stop.is_set():
+            body = {
+                "size": EMBEDDING_BACKFILL_BATCH_SIZE,
+                "_source": ["id", "embedding_input", "embedding_versions"],
+                "seq_no_primary_term": True,
+                "query": {
+                    "bool": {
+                        "filter": [{"exists": {"field": "embedding_input"}}],
+                        "must_not": [{"term": {"embedding_versions": version}}]
+                    }
+                },
+                "sort": [{"id": "asc"}]
+            }
+            if search_after:
+                body["search_after"] = search_after
+            hits = self.es.search(index=ALL_TENDERS_INDICES, body=body)["hits"]["hits"]
+            if not hits:
+                break
+            search_after = hits[-1]["sort"]
+
+            with EMBEDDING_BACKFILL_SECONDS.labels(version=version).time():
+                vectors = model.encode([hit["_source"]["embedding_input"] for hit in hits],
+                                       batch_size=EMBEDDING_BACKFILL_BATCH_SIZE).tolist()
+                operations = []
+                for hit, vector in zip(hits, vectors):
+                    operations.append({"update": {"_index": hit["_index"], "_id": hit["_id"],
+                                                  "if_seq_no": hit["_seq_no"], "if_primary_term": hit["_primary_term"]}})
+                    operations.append({"doc": {field: vector,
+                                               "embedding_versions": (hit["_source"].get("embedding_versions") or []) + [version]}})
+                response = self.es.bulk(operations=operations)
+
+            batch = {"embedded": 0, "conflicts": 0, "failed": 0}
+            for item in response.get("items", []):
+                action = item.get("update", {})
+                if action.get("status") == 409:
+                    batch["conflicts"] += 1
+                elif action.get("error"):
+                    batch["failed"] += 1
+                    logger.error(f"❌ Failed to store {version} vector for tender {action.get('_id')}: {action['error']}")
+                else:
+                    batch["embedded"] += 1
+            for outcome, count in batch.items():
+                counts[outcome] += count
+                EMBEDDING_BACKFILL_TOTAL.labels(version=version, outcome=outcome).inc(count)
+            self._throttle()
+
+        logger.info(f"🔁 Re-embedded {counts['embedded']} tenders with {version} "
+                    f"({counts['conflicts']} changed mid-batch, {counts['failed']} failed)")
+        return counts
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            if backfilled_versions():
+                self.run_once()
+
+    def start(self):
+        if self.interval_seconds <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        logger.info(f"🔁 Starting re-embedding backfill every {self.interval_seconds}s "
+                    f"(serving {EMBEDDING_MODEL_VERSION}, next {EMBEDDING_MODEL_NEXT or 'none'})")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="embedding-backfill", daemon=True)
+        self._thread.start()
+
+    def trigger(self) -> bool:
+        """Start a backfill pass now without waiting for it; False when one is already running"""
+        if self._run_lock.locked():
+            return False
+        threading.Thread(target=self.run_once, name="embedding-backfill-once", daemon=True).start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+# Global instance
+reembed_service = ReembedService()
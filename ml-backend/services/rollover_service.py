@@ -0,0 +1,60 @@
+from .search_service import search_service
+from .suggest_service import suggest_service
+from .sync_service import sync_service
+from dotenv import load_dotenv
+from typing import Optional, Dict, Any
+import threading
+import logging
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How often tenders are moved between the hot and archive indices; 0 disables the timer
+ROLLOVER_INTERVAL_SECONDS = int(os.getenv("ROLLOVER_INTERVAL_SECONDS", "3600"))
+
+
+class RolloverService:
+    """Runs SearchService.rollover_tenders on a timer in a background thread"""
+
+    def __init__(self, interval_seconds: int = ROLLOVER_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    def run_once(self) -> Dict[str, Any]:
+        """One rollover pass; concurrent calls wait rather than moving the same documents twice"""
+        with self._run_lock:
+            try:
+                self.last_result = search_service.rollover_tenders()
+                if self.last_result["archived"] or self.last_result["restored"]:
+                    # Open duplicates of a tender whose canonical was just archived take over from it
+                    self.last_result["canonical"] = sync_service.reassign_orphaned_clusters()
+                # Closed tenders leave the hot index, so their completions must go too
+                suggest_service.invalidate_cache()
+            except Exception as e:
+                logger.error(f"❌ Rollover failed: {e}")
+                self.last_result = {"status": "error", "error": str(e)}
+            return self.last_result
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+
+    def start(self):
+        if self.interval_seconds <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        logger.info(f"🗄️ Starting tender rollover every {self.interval_seconds}s")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="tender-rollover", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+# Global instance
+rollover_service = RolloverService()
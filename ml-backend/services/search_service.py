@@ -1,47 +1,183 @@
 from elasticsearch import Elasticsearch
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+from .metrics import (
+    SEARCH_ENCODE_SECONDS,
+    SEARCH_ES_QUERY_SECONDS,
+    SEARCH_RESULT_PROCESSING_SECONDS,
+    SEARCH_LATENCY_SECONDS,
+    SEARCH_ERRORS_TOTAL,
+    SEARCH_VECTOR_INDEX_TOTAL,
+    should_log_request,
+)
+from .profiling_service import timed
+from .vector_index import VectorIndex, CATEGORICAL_FIELDS, DATE_FIELDS
+from .embedding_models import (
+    get_model,
+    model_spec,
+    indexed_versions,
+    backfilled_versions,
+    EMBEDDING_SOURCE_VERSION,
+    EMBEDDING_MODEL_VERSION,
+)
+from datetime import datetime, timezone
+import hashlib
 import logging
 import json
-from datetime import datetime
+import time
 import os
 
 load_dotenv()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# One node, or a comma-separated list of nodes the client spreads requests over
 elasticsearch_url = os.getenv("ELASTICSEARCH_URL")
+# Discover the rest of the cluster from the listed nodes, at the first request (after server.py
+# forks), again at most once per interval and when a node fails. Leave off when nodes publish
+# addresses this process can't reach (Docker networks, load balancers, Elastic Cloud).
+ELASTICSEARCH_SNIFF = os.getenv("ELASTICSEARCH_SNIFF", "false").lower() == "true"
+ELASTICSEARCH_SNIFF_INTERVAL_SECONDS = float(os.getenv("ELASTICSEARCH_SNIFF_INTERVAL_SECONDS", "60"))
+# Retries go to another node; timeouts are retried too since a slow node is usually a busy one
+ELASTICSEARCH_MAX_RETRIES = int(os.getenv("ELASTICSEARCH_MAX_RETRIES", "3"))
+ELASTICSEARCH_REQUEST_TIMEOUT_SECONDS = float(os.getenv("ELASTICSEARCH_REQUEST_TIMEOUT_SECONDS", "10"))
+# Hot/cold layout: open tenders live in TENDERS_INDEX, closed or expired ones in the archive
+TENDERS_INDEX = os.getenv("TENDERS_INDEX", "tenders")
+TENDERS_ARCHIVE_INDEX = os.getenv("TENDERS_ARCHIVE_INDEX", f"{TENDERS_INDEX}_archive")
+ALL_TENDERS_INDICES = f"{TENDERS_INDEX},{TENDERS_ARCHIVE_INDEX}"
+# Compared case-insensitively; sources disagree on "Closed" vs "closed"
+CLOSED_STATUSES = [s.strip().lower() for s in os.getenv("CLOSED_TENDER_STATUSES", "closed,awarded,cancelled,expired").split(",")]
+ROLLOVER_BATCH_SIZE = 1000
+# Cluster layout of the tender indices. Shard counts are fixed when an index is created; replicas
+# and the refresh interval are also applied to existing indices by create_tenders_index.
+# Replicas default to 1 like Elasticsearch itself; a single node needs 0 to report green.
+TENDERS_NUMBER_OF_SHARDS = int(os.getenv("TENDERS_NUMBER_OF_SHARDS", "1"))
+TENDERS_ARCHIVE_NUMBER_OF_SHARDS = int(os.getenv("TENDERS_ARCHIVE_NUMBER_OF_SHARDS", str(TENDERS_NUMBER_OF_SHARDS)))
+TENDERS_NUMBER_OF_REPLICAS = int(os.getenv("TENDERS_NUMBER_OF_REPLICAS", "1"))
+TENDERS_REFRESH_INTERVAL = os.getenv("TENDERS_REFRESH_INTERVAL", "1s")
+# Searches with the same text and filters go to the same shard copies, so repeats find warm
+# node caches instead of being spread across replicas by adaptive replica selection
+SEARCH_PREFERENCE_ROUTING = os.getenv("SEARCH_PREFERENCE_ROUTING", "true").lower() == "true"
+# Index sort shared by browse queries: matching it lets Elasticsearch stop after `limit` hits
+BROWSE_SORT = [
+    {"closing_date": {"order": "asc", "missing": "_last"}},
+    {"id": {"order": "asc"}}
+]
+# Optional in-process vector index: unset VECTOR_INDEX_DIR disables it
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR")
+VECTOR_INDEX_PRIMARY = os.getenv("VECTOR_INDEX_PRIMARY", "false").lower() == "true"
+
+# Facets returned alongside search hits
+FACET_FIELDS = ["delivery_location", "category_primary", "procurement_method", "status"]
+FACET_SIZE = 50
+CLOSING_DATE_BUCKETS = [
+    {"key": "closed", "to": "now/d"},
+    {"key": "next_7_days", "from": "now/d", "to": "now+7d/d"},
+    {"key": "next_30_days", "from": "now+7d/d", "to": "now+30d/d"},
+    {"key": "later", "from": "now+30d/d"},
+]
+# Date buckets are relative to now, so cached facets also expire on a timer
+FACET_CACHE_TTL_SECONDS = int(os.getenv("FACET_CACHE_TTL_SECONDS", "900"))
+
+# Highlighted fields -> match explanation label; only the highlighted terms are used
+EXPLANATION_FIELDS = {
+    "title": "title",
+    "description": "description",
+    "summary": "summary",
+    "contracting_entity_name": "entity",
+}
+HIGHLIGHT_PRE_TAG = "<em>"
+HIGHLIGHT_POST_TAG = "</em>"
+# Terms listed per reason, e.g. "title match (road, repair)"
+EXPLANATION_MAX_TERMS = 3
+
+def create_es_client(url: Optional[str] = None) -> Elasticsearch:
+    """Client for ELASTICSEARCH_URL (or `url`), either of which may list several comma-separated nodes"""
+    hosts = [host.strip() for host in (url or elasticsearch_url or "").split(",") if host.strip()]
+    return Elasticsearch(
+        hosts,
+        sniff_before_requests=ELASTICSEARCH_SNIFF,
+        sniff_on_node_failure=ELASTICSEARCH_SNIFF,
+        min_delay_between_sniffing=ELASTICSEARCH_SNIFF_INTERVAL_SECONDS,
+        max_retries=ELASTICSEARCH_MAX_RETRIES,
+        retry_on_timeout=True,
+        request_timeout=ELASTICSEARCH_REQUEST_TIMEOUT_SECONDS,
+    )
+
 class SearchService:
     def __init__(self):
         logger.info("🚀 Initializing SearchService")
         
-        # Load embedding model
-        logger.info("📊 Loading SentenceTransformer model: all-MiniLM-L6-v2")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        logger.info("✅ SentenceTransformer model loaded successfully")
+        # Load the embedding model queries are encoded with, and the vector field it searches
+        self.model_version = EMBEDDING_MODEL_VERSION
+        self.model = get_model(self.model_version)
+        self.vector_field = model_spec(self.model_version)["field"]
         
         # Connect to Elasticsearch
         logger.info(f"🔗 Connecting to Elasticsearch at {elasticsearch_url}")
-        self.es = Elasticsearch([elasticsearch_url])
+        self.es = create_es_client()
+        self.preference_routing = SEARCH_PREFERENCE_ROUTING
         logger.info("✅ Elasticsearch connection established")
+        
+        # Unfiltered facet counts, reset on every sync: (cached_at, facets)
+        self._facet_cache = None
+        
+        # Degraded-mode search when Elasticsearch is unavailable
+        self.vector_index = VectorIndex(VECTOR_INDEX_DIR, dims=model_spec(self.model_version)["dims"]) if VECTOR_INDEX_DIR else None
+        if self.vector_index is not None:
+            try:
+                self.vector_index.load()
+            except Exception as e:
+                logger.error(f"❌ Failed to load vector index from {VECTOR_INDEX_DIR}: {e}")
     
     def get_all_tenders(self):
         """Get all tenders from Elasticsearch"""
-        response = self.es.search(index="tenders", body={"query": {"match_all": {}}}, size=10000)
+        response = self.es.search(index=ALL_TENDERS_INDICES, body={"query": {"match_all": {}}}, size=10000)
         for hit in response['hits']['hits']:
-            if '_source' in hit and 'embedding' in hit['_source']:
-                del hit['_source']['embedding']
+            if '_source' in hit and 'embedding_input' in hit['_source']:
+                for version in indexed_versions():
+                    hit['_source'].pop(model_spec(version)["field"], None)
                 del hit['_source']['embedding_input']
                 del hit['_source']['summary']
         return response['hits']['hits']
     
-    def create_tenders_index(self):
-        """Create the search index matching actual database schema"""
-        logger.info("🏗️ Creating tenders index with database schema mapping")
-        mapping = {
+    def scan_tenders(self, fields: Optional[List[str]] = None, batch_size: int = 1000,
+                     index: Optional[str] = None, query: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream every indexed tender's _source, hot and archived (or a side index keyed by id), paging with search_after on id"""
+        for hit in self.scan_hits(fields=fields, batch_size=batch_size, index=index, query=query):
+            yield hit["_source"]
+    
+    def scan_hits(self, fields: Optional[List[str]] = None, batch_size: int = 1000,
+                  index: Optional[str] = None, query: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Like scan_tenders, but yields whole hits so callers know which index each document is in"""
+        search_after = None
+        while True:
+            body = {"size": batch_size, "query": query or {"match_all": {}}, "sort": [{"id": "asc"}]}
+            if fields:
+                body["_source"] = fields
+            if search_after:
+                body["search_after"] = search_after
+            hits = self.es.search(index=index or ALL_TENDERS_INDICES, body=body)["hits"]["hits"]
+            if not hits:
+                return
+            yield from hits
+            search_after = hits[-1]["sort"]
+    
+    def _tenders_index_mapping(self) -> Dict[str, Any]:
+        """Index settings and mappings matching actual database schema"""
+        return {
+            # Segments are stored in browse order; only applies when an index is created
+            "settings": {
+                "index": {
+                    "sort.field": ["closing_date", "id"],
+                    "sort.order": ["asc", "asc"],
+                    "sort.missing": ["_last", "_last"],
+                    "number_of_shards": TENDERS_NUMBER_OF_SHARDS,
+                    **self._dynamic_index_settings(),
+                }
+            },
             "mappings": {
                 "properties": {
                     # Core identifiers
@@ -49,6 +185,9 @@ class SearchService:
                     "source": {"type": "keyword"},
                     "source_reference": {"type": "keyword"},
                     "source_url": {"type": "keyword"},
+                    # Shared by cross-source near-duplicates; search collapses on it
+                    "canonical_id": {"type": "keyword"},
+                    "is_canonical": {"type": "boolean"},
                     
                     # Main content fields - matching database schema
                     "title": {"type": "text", "analyzer": "english"},
@@ -95,28 +234,50 @@ class SearchService:
                     "plan_takers_count": {"type": "integer"},
                     "submissions_count": {"type": "integer"},
                     
-                    # AI-generated embedding
-                    "embedding": {
-                        "type": "dense_vector",
-                        "dims": 384
+                    # AI-generated embeddings: one dense_vector field per model version in use
+                    **{
+                        model_spec(version)["field"]: {"type": "dense_vector", "dims": model_spec(version)["dims"]}
+                        for version in indexed_versions()
                     },
-                    "embedding_input": {"type": "text"}
+                    # Versions whose vector field is filled on this document
+                    "embedding_versions": {"type": "keyword"},
+                    "embedding_input": {"type": "text"},
+                    
+                    # Typeahead over titles, entity names and categories
+                    "suggest": {"type": "completion"}
                 }
             }
         }
+
+    def _dynamic_index_settings(self) -> Dict[str, Any]:
+        """Settings that can change on a live index"""
+        return {"number_of_replicas": TENDERS_NUMBER_OF_REPLICAS, "refresh_interval": TENDERS_REFRESH_INTERVAL}
+
+    def create_tenders_index(self):
+        """Create the hot and archive search indices matching actual database schema"""
+        logger.info("🏗️ Creating tenders index with database schema mapping")
+        mapping = self._tenders_index_mapping()
         
         try:
-            result = self.es.indices.create(index="tenders", body=mapping, ignore=400)
-            logger.info(f"✅ Tenders index created successfully: {result}")
+            for index_name, shards in ((TENDERS_INDEX, TENDERS_NUMBER_OF_SHARDS),
+                                       (TENDERS_ARCHIVE_INDEX, TENDERS_ARCHIVE_NUMBER_OF_SHARDS)):
+                body = {**mapping, "settings": {"index": {**mapping["settings"]["index"], "number_of_shards": shards}}}
+                result = self.es.indices.create(index=index_name, body=body, ignore=400)
+                if result.get("status") == 400:
+                    # Index already exists: add any fields introduced since it was created, and apply
+                    # the current replica count and refresh interval. Index sort settings and shard
+                    # counts can't be changed later; wipe and resync (or _split/_shrink) for those.
+                    self.es.indices.put_mapping(index=index_name, body=mapping["mappings"])
+                    self.es.indices.put_settings(index=index_name, body={"index": self._dynamic_index_settings()})
+                logger.info(f"✅ Tenders index {index_name} created successfully: {result}")
             logger.info("📋 Index mapping includes database schema fields: title, description, summary, closing_date, status, etc.")
         except Exception as e:
             logger.error(f"❌ Failed to create tenders index: {e}")
             raise
 
-    def index_tender(self, tender_data: Dict[str, Any]):
-        """Add one tender to search index using new schema"""
+    def _build_tender_doc(self, tender_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the index document for one tender from its database row"""
         tender_id = tender_data.get("id", "unknown")
-        logger.info(f"📝 Indexing tender: {tender_id}")
         
         # Sanitize empty string date fields
         date_fields = [
@@ -131,8 +292,13 @@ class SearchService:
             if tender_data.get(field) == "":
                 tender_data[field] = None
 
-        # Use precomputed embedding directly
+        # Use precomputed embedding directly; Supabase vectors come from EMBEDDING_SOURCE_VERSION
         embedding = tender_data.get("embedding")
+        source_spec = model_spec(EMBEDDING_SOURCE_VERSION)
+        if embedding and len(embedding) != source_spec["dims"]:
+            logger.warning(f"⚠️ Dropping {len(embedding)}-dim embedding for tender {tender_id}; "
+                           f"{EMBEDDING_SOURCE_VERSION} expects {source_spec['dims']}")
+            embedding = None
         if embedding:
             logger.debug(f"🔢 Using precomputed embedding for tender {tender_id} (length: {len(embedding) if isinstance(embedding, list) else 'unknown'})")
         else:
@@ -148,6 +314,8 @@ class SearchService:
             "source": tender_data.get("source"),
             "source_reference": tender_data.get("source_reference"),
             "source_url": tender_data.get("source_url"),
+            "canonical_id": tender_data.get("canonical_id") or tender_data.get("id"),
+            "is_canonical": (tender_data.get("canonical_id") or tender_data.get("id")) == tender_data.get("id"),
             
             # Main content - matching database schema
             "title": tender_data.get("title", ""),
@@ -195,19 +363,233 @@ class SearchService:
             "submissions_count": tender_data.get("submissions_count"),
             
             # Embedding
-            "embedding": embedding,
-            "embedding_input": tender_data.get("embedding_input")
+            source_spec["field"]: embedding,
+            "embedding_versions": [EMBEDDING_SOURCE_VERSION] if embedding else [],
+            "embedding_input": tender_data.get("embedding_input"),
+            
+            # Typeahead inputs, titles ranked above entities above categories
+            "suggest": self._build_suggest_inputs(tender_data)
+        }
+        return doc
+
+    def _build_suggest_inputs(self, tender_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        inputs = []
+        for field, weight in (("title", 3), ("contracting_entity_name", 2), ("category_primary", 1)):
+            value = (tender_data.get(field) or "").strip()
+            if value:
+                inputs.append({"input": [value], "weight": weight})
+        return inputs
+
+    def _is_archived(self, tender_data: Dict[str, Any]) -> bool:
+        """Closed by status, or past its closing date"""
+        if str(tender_data.get("status") or "").lower() in CLOSED_STATUSES:
+            return True
+        closing = tender_data.get("closing_date")
+        if not closing:
+            return False
+        try:
+            closing_at = datetime.fromisoformat(str(closing).replace("Z", "+00:00"))
+        except ValueError:
+            return False
+        if closing_at.tzinfo is None:
+            closing_at = closing_at.replace(tzinfo=timezone.utc)
+        return closing_at < datetime.now(timezone.utc)
+
+    def _target_indices(self, tender_data: Dict[str, Any]) -> Tuple[str, str]:
+        """(index the tender belongs in, index it must be removed from)"""
+        if self._is_archived(tender_data):
+            return TENDERS_ARCHIVE_INDEX, TENDERS_INDEX
+        return TENDERS_INDEX, TENDERS_ARCHIVE_INDEX
+
+    def _closed_status_values(self) -> List[str]:
+        """Case variants of CLOSED_STATUSES for exact keyword matching"""
+        return sorted({variant for status in CLOSED_STATUSES for variant in (status, status.capitalize(), status.upper())})
+
+    def _archived_query(self) -> Dict[str, Any]:
+        """Documents that belong in the archive index"""
+        return {
+            "bool": {
+                "should": [
+                    {"terms": {"status": self._closed_status_values()}},
+                    {"range": {"closing_date": {"lt": "now"}}}
+                ],
+                "minimum_should_match": 1
+            }
         }
+
+    def _search_indices(self, filter_kwargs: Dict[str, Any]) -> str:
+        """Hot index by default; both when the search explicitly asks for closed statuses"""
+        statuses = filter_kwargs.get("status") or []
+        if any(str(status).lower() in CLOSED_STATUSES for status in statuses):
+            return ALL_TENDERS_INDICES
+        return TENDERS_INDEX
+
+    def index_tender(self, tender_data: Dict[str, Any]):
+        """Add one tender to search index using new schema"""
+        tender_id = tender_data.get("id", "unknown")
+        logger.debug(f"📝 Indexing tender: {tender_id}")
+        doc = self._build_tender_doc(tender_data)
+        self._carry_over_embeddings([doc])
+        target_index, other_index = self._target_indices(tender_data)
         
         try:
-            result = self.es.index(index="tenders", id=tender_data["id"], body=doc)
-            logger.info(f"✅ Successfully indexed tender {tender_id}")
+            result = self.es.index(index=target_index, id=tender_data["id"], body=doc)
+            # A tender that changed state must not linger in the other index
+            self.es.delete(index=other_index, id=tender_data["id"], ignore=404)
+            logger.debug(f"✅ Successfully indexed tender {tender_id}")
             logger.debug(f"🔍 Elasticsearch response: {result}")
         except Exception as e:
             logger.error(f"❌ Failed to index tender {tender_id}: {e}")
             logger.error(f"📄 Tender data that failed: {json.dumps({k: v for k, v in tender_data.items()}, default=str, indent=2)}")
             raise
 
+    def bulk_index_tenders(self, tenders: List[Dict[str, Any]], refresh: bool = False) -> Dict[str, Any]:
+        """Index a batch of tenders with a single bulk request"""
+        operations = []
+        docs = [self._build_tender_doc(tender_data) for tender_data in tenders]
+        self._carry_over_embeddings(docs)
+        for tender_data, doc in zip(tenders, docs):
+            target_index, other_index = self._target_indices(tender_data)
+            operations.append({"index": {"_index": target_index, "_id": tender_data["id"]}})
+            operations.append(doc)
+            # Missing documents just report not_found; this keeps a tender in exactly one index
+            operations.append({"delete": {"_index": other_index, "_id": tender_data["id"]}})
+        if not operations:
+            return {"indexed": 0, "failed": 0, "failed_ids": [], "created_ids": []}
+        
+        response = self.es.bulk(operations=operations, refresh=refresh)
+        failed_ids = []
+        created_ids = []
+        for item in response.get("items", []):
+            action = item.get("index", {})
+            if action.get("error"):
+                failed_ids.append(action.get("_id"))
+                logger.error(f"❌ Failed to bulk index tender {action.get('_id')}: {action['error']}")
+            elif action.get("result") == "created" and action.get("_index") == TENDERS_INDEX:
+                created_ids.append(action.get("_id"))
+        return {
+            "indexed": len(tenders) - len(failed_ids),
+            "failed": len(failed_ids),
+            "failed_ids": failed_ids,
+            # Open tenders that were not in the hot index before this bulk
+            "created_ids": created_ids
+        }
+
+    def _carry_over_embeddings(self, docs: List[Dict[str, Any]]):
+        """
+        Keep re-embedded vectors across a re-sync. Syncs replace whole documents
+        and Supabase only has source-version vectors, so vectors for other
+        versions are copied from the indexed document when its embedding input
+        is unchanged; anything else is left for the re-embedding backfill.
+        """
+        versions = backfilled_versions()
+        if not versions or not docs:
+            return
+        fields = [model_spec(version)["field"] for version in versions]
+        try:
+            response = self.es.mget(body={"docs": [
+                {"_index": index, "_id": doc["id"], "_source": ["embedding_input", "embedding_versions"] + fields}
+                for doc in docs for index in (TENDERS_INDEX, TENDERS_ARCHIVE_INDEX)
+            ]})
+        except Exception as e:
+            logger.error(f"❌ Could not fetch re-embedded vectors to carry over: {e}")
+            return
+        existing = {hit["_id"]: hit["_source"] for hit in response["docs"] if hit.get("found")}
+        for doc in docs:
+            previous = existing.get(str(doc["id"]))
+            if not previous or previous.get("embedding_input") != doc.get("embedding_input"):
+                continue
+            for version, field in zip(versions, fields):
+                if version in (previous.get("embedding_versions") or []) and previous.get(field):
+                    doc[field] = previous[field]
+                    doc["embedding_versions"].append(version)
+
+    def rollover_tenders(self) -> Dict[str, Any]:
+        """
+        Move tenders that closed or expired to the archive, and reopened ones back to the hot index.
+
+        Syncs write the same documents concurrently, so both steps are
+        conditional. The copy is a `create`: a document already in the target
+        came from a sync (which writes the right index and deletes from the
+        other) or from an earlier run, and is never overwritten by this older
+        snapshot. The source delete carries the seq_no the search returned; if
+        a sync rewrote the tender since, the delete conflicts, the copy just
+        made is withdrawn (again only if unchanged) and the tender is left for
+        the next run.
+        """
+        start = time.perf_counter()
+        moves = [
+            ("archived", TENDERS_INDEX, TENDERS_ARCHIVE_INDEX, self._archived_query()),
+            ("restored", TENDERS_ARCHIVE_INDEX, TENDERS_INDEX, {"bool": {"must_not": [self._archived_query()]}}),
+        ]
+        result = {"status": "success", "failed": 0, "conflicts": 0}
+        for label, source_index, target_index, query in moves:
+            moved = 0
+            search_after = None
+            while True:
+                body = {"size": ROLLOVER_BATCH_SIZE, "query": query, "sort": [{"id": "asc"}], "seq_no_primary_term": True}
+                if search_after:
+                    body["search_after"] = search_after
+                hits = self.es.search(index=source_index, body=body)["hits"]["hits"]
+                if not hits:
+                    break
+                search_after = hits[-1]["sort"]
+                operations = []
+                for hit in hits:
+                    operations.append({"create": {"_index": target_index, "_id": hit["_id"]}})
+                    operations.append(hit["_source"])
+                response = self.es.bulk(operations=operations)
+                # Delete from the source only what the target now holds; failures stay put for the next run.
+                # Copies made here are remembered by seq_no so a conflicting delete can withdraw them.
+                copies = {}
+                errors = []
+                for item in response["items"]:
+                    action = item["create"]
+                    if not action.get("error"):
+                        copies[action["_id"]] = (action["_seq_no"], action["_primary_term"])
+                    elif action.get("status") == 409:
+                        copies[action["_id"]] = None
+                    else:
+                        errors.append(action["error"])
+                if errors:
+                    logger.error(f"❌ Rollover: {len(errors)} tenders not copied {source_index} -> "
+                                 f"{target_index}, left in place: {errors[0]}")
+                    result["failed"] += len(errors)
+                if not copies:
+                    continue
+                response = self.es.bulk(operations=[
+                    {"delete": {"_index": source_index, "_id": hit["_id"],
+                                "if_seq_no": hit["_seq_no"], "if_primary_term": hit["_primary_term"]}}
+                    for hit in hits if hit["_id"] in copies
+                ])
+                withdraw = []
+                for item in response["items"]:
+                    action = item["delete"]
+                    if not action.get("error"):
+                        moved += 1
+                    elif action.get("status") == 409:
+                        # Re-indexed by a sync since the search: that version stays, the copy goes
+                        result["conflicts"] += 1
+                        if copies[action["_id"]] is not None:
+                            seq_no, primary_term = copies[action["_id"]]
+                            withdraw.append({"delete": {"_index": target_index, "_id": action["_id"],
+                                                        "if_seq_no": seq_no, "if_primary_term": primary_term}})
+                    else:
+                        # Left in both indices; the next run matches it again and retries the delete
+                        logger.error(f"❌ Rollover: tender {action['_id']} copied to {target_index} "
+                                     f"but not deleted from {source_index}: {action['error']}")
+                        result["failed"] += 1
+                if withdraw:
+                    self.es.bulk(operations=withdraw)
+            result[label] = moved
+        
+        if result["archived"] or result["restored"]:
+            self.invalidate_facet_cache()
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"🗄️ Rollover: {result['archived']} archived, {result['restored']} restored, "
+                    f"{result['conflicts']} changed mid-move in {result['seconds']}s")
+        return result
+
     def _generate_embedding(self, tender_data: Dict[str, Any]) -> List[float]:
         """Generate embedding from tender content using flat database schema"""
         # Combine multiple fields for rich embedding
@@ -223,64 +605,123 @@ class SearchService:
         text_content = " ".join(content_parts)
         return self.model.encode(text_content).tolist()
 
-    def search_tenders(self, query: str, regions: Optional[List[str]] = None, 
-                      procurement_method: Optional[str] = None,
-                      procurement_category: Optional[List[str]] = None,
-                      notice_type: Optional[List[str]] = None,
-                      status: Optional[List[str]] = None,
-                      contracting_entity_name: Optional[List[str]] = None,
-                      closing_date_after: Optional[str] = None,
-                      closing_date_before: Optional[str] = None,
-                      publication_date_after: Optional[str] = None,
-                      publication_date_before: Optional[str] = None,
-                      limit: Optional[int] = 100) -> List[Dict[str, Any]]:
-        """Search tenders with natural language and advanced filters"""
-        search_start_time = datetime.now()
-        logger.info(f"🔍 SEARCH REQUEST RECEIVED")
-        logger.info(f"📝 Query: '{query}'")
-        logger.info(f"📊 Filters: regions={regions}, proc_method={procurement_method}, proc_category={procurement_category}")
-        logger.info(f"📊 More filters: notice_type={notice_type}, status={status}, entity={contracting_entity_name}")
-        logger.info(f"📅 Date filters: closing_after={closing_date_after}, closing_before={closing_date_before}")
-        logger.info(f"📅 Pub date filters: pub_after={publication_date_after}, pub_before={publication_date_before}")
-        logger.info(f"🔢 Limit: {limit}")
+    def _build_filter_map(self, regions: Optional[List[str]] = None,
+                          procurement_method: Optional[str] = None,
+                          procurement_category: Optional[List[str]] = None,
+                          notice_type: Optional[List[str]] = None,
+                          status: Optional[List[str]] = None,
+                          contracting_entity_name: Optional[List[str]] = None,
+                          closing_date_after: Optional[str] = None,
+                          closing_date_before: Optional[str] = None,
+                          publication_date_after: Optional[str] = None,
+                          publication_date_before: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Translate search filters into Elasticsearch filter clauses keyed by index field"""
+        filters = {}
         
-        # Check if index exists
-        try:
-            if not self.es.indices.exists(index="tenders"):
-                logger.warning("⚠️ Tenders index does not exist, creating it...")
-                self.create_tenders_index()
-                logger.info("📋 Index created but no data synced yet - returning empty results")
-                return []  # Return empty results until data is synced
-            else:
-                logger.info("✅ Tenders index exists")
-        except Exception as e:
-            logger.error(f"❌ Error checking index existence: {e}")
-            return []
+        # Regional filtering using database schema
+        if regions:
+            filters["delivery_location"] = {"terms": {"delivery_location": regions}}
         
-        # Generate embedding for the search query
-        try:
-            logger.info("🧠 Generating AI embedding for search query...")
-            embedding_start = datetime.now()
-            query_embedding = self.model.encode(query).tolist()
-            embedding_time = (datetime.now() - embedding_start).total_seconds() * 1000
-            logger.info(f"✅ Generated embedding: {len(query_embedding)} dimensions in {embedding_time:.1f}ms")
-        except Exception as e:
-            logger.error(f"❌ Error generating embedding: {e}")
-            return []
+        # Procurement method filtering
+        if procurement_method:
+            filters["procurement_method"] = {"term": {"procurement_method": procurement_method}}
+        
+        # Procurement category filtering using database schema
+        if procurement_category:
+            filters["category_primary"] = {"terms": {"category_primary": procurement_category}}
+        
+        # Notice type filtering using database schema
+        if notice_type:
+            filters["procurement_type"] = {"terms": {"procurement_type": notice_type}}
+        
+        # Tender status filtering using database schema
+        if status:
+            filters["status"] = {"terms": {"status": status}}
+        
+        # Contracting entity filtering using actual schema
+        if contracting_entity_name:
+            filters["contracting_entity_name"] = {"terms": {"contracting_entity_name": contracting_entity_name}}
+        
+        # Closing date filtering using database schema
+        if closing_date_after or closing_date_before:
+            date_range = {}
+            if closing_date_after:
+                date_range["gte"] = closing_date_after
+            if closing_date_before:
+                date_range["lte"] = closing_date_before
+            filters["closing_date"] = {
+                "range": {
+                    "closing_date": date_range
+                }
+            }
+        
+        # Publication date filtering
+        if publication_date_after or publication_date_before:
+            date_range = {}
+            if publication_date_after:
+                date_range["gte"] = publication_date_after
+            if publication_date_before:
+                date_range["lte"] = publication_date_before
+            filters["published_date"] = {
+                "range": {
+                    "published_date": date_range
+                }
+            }
+        
+        return filters
+
+    def _build_filters(self, **filter_kwargs) -> List[Dict[str, Any]]:
+        """Translate search filters into a list of Elasticsearch filter clauses"""
+        return list(self._build_filter_map(**filter_kwargs).values())
+
+    def _build_facet_aggs(self, facet_filters: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """One filtered aggregation per facet; each ignores its own selection so the sidebar can multi-select"""
+        aggs = {}
+        for field in FACET_FIELDS + ["closing_date"]:
+            others = [clause for name, clause in facet_filters.items() if name != field]
+            if field == "closing_date":
+                values = {"date_range": {"field": "closing_date", "ranges": CLOSING_DATE_BUCKETS}}
+            else:
+                values = {"terms": {"field": field, "size": FACET_SIZE}}
+            aggs[field] = {"filter": {"bool": {"filter": others}}, "aggs": {"values": values}}
+        return aggs
+
+    def _parse_facets(self, aggregations: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+        return {
+            field: {bucket["key"]: bucket["doc_count"] for bucket in agg["values"]["buckets"]}
+            for field, agg in aggregations.items()
+        }
+
+    def _cached_facets(self) -> Optional[Dict[str, Dict[str, int]]]:
+        if self._facet_cache is None:
+            return None
+        cached_at, facets = self._facet_cache
+        if time.monotonic() - cached_at > FACET_CACHE_TTL_SECONDS:
+            return None
+        return facets
+
+    def invalidate_facet_cache(self):
+        """Drop cached unfiltered facets; called whenever a sync changes the index"""
+        self._facet_cache = None
+
+    def _build_search_body(self, query: str, query_embedding: List[float], limit: int,
+                           filter_kwargs: Dict[str, Any], facets: bool = False,
+                           collapse: bool = False) -> Dict[str, Any]:
+        """Hybrid vector + text query, optionally with facet aggregations in the same request"""
         # Build search query with enhanced field targeting - only return minimal fields
-        logger.info("🏗️ Building Elasticsearch query...")
         search_body = {
             "size": limit,
-            "_source": ["id", "title", "description"],  # Minimal fields for match explanation
+            "_source": ["id"],  # Match explanations come from highlights, not stored text
             "query": {
                 "bool": {
                     "should": [
                         # Vector similarity search (primary)
                         {
                             "script_score": {
-                                "query": {"match_all": {}},
+                                # Mid-migration some documents may not have this version's vector yet
+                                "query": {"exists": {"field": self.vector_field}},
                                 "script": {
-                                    "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
+                                    "source": f"cosineSimilarity(params.query_vector, '{self.vector_field}') + 1.0",
                                     "params": {"query_vector": query_embedding}
                                 },
                                 "boost": 0.6
@@ -296,12 +737,20 @@ class SearchService:
                                         "summary^2"
                                 ],
                                 "type": "best_fields",
-                                "boost": 0.4
+                                "boost": 0.4,
+                                "_name": "text"
                             }
                         }
                     ]
                 }
             },
+            # Matched terms per field; fragments stay small since only the tagged terms are read
+            "highlight": {
+                "highlight_query": {"multi_match": {"query": query, "fields": list(EXPLANATION_FIELDS)}},
+                "fields": {field: {"fragment_size": 60, "number_of_fragments": 1} for field in EXPLANATION_FIELDS},
+                "pre_tags": [HIGHLIGHT_PRE_TAG],
+                "post_tags": [HIGHLIGHT_POST_TAG]
+            },
             "sort": [
                 {"_score": {"order": "desc"}},
                 {"closing_date": {"order": "asc", "missing": "_last"}}
@@ -309,141 +758,397 @@ class SearchService:
         }
         
         # Add filters
-        logger.info("🔧 Building search filters...")
-        filters = []
-        applied_filters = []
-        
-        # Regional filtering using database schema
-        if regions:
-            filters.append({"terms": {"delivery_location": regions}})
-            applied_filters.append(f"regions: {regions}")
+        filter_map = self._build_filter_map(**filter_kwargs)
+        if facets:
+            # Facet-field filters narrow the hits via post_filter so the aggregations still see other values
+            facet_filters = {name: filter_map.pop(name) for name in FACET_FIELDS + ["closing_date"] if name in filter_map}
+            if facet_filters:
+                search_body["post_filter"] = {"bool": {"filter": list(facet_filters.values())}}
+            search_body["aggs"] = self._build_facet_aggs(facet_filters)
         
-        # Procurement method filtering
-        if procurement_method:
-            filters.append({"term": {"procurement_method": procurement_method}})
-            applied_filters.append(f"procurement_method: {procurement_method}")
+        if filter_map:
+            search_body["query"]["bool"]["filter"] = list(filter_map.values())
+        if collapse:
+            # One hit per duplicate cluster: the best-scoring posting represents it
+            search_body["collapse"] = {"field": "canonical_id"}
+        return search_body
+
+    def _build_browse_body(self, limit: int, filter_kwargs: Dict[str, Any],
+                           search_after: Optional[List[Any]] = None, collapse: bool = True) -> Dict[str, Any]:
+        """Filter-only query in index sort order, with nothing to score or count"""
+        filters = self._build_filters(**filter_kwargs)
+        if collapse:
+            # A cheap term filter instead of collapse, which would disable early termination
+            filters.append({"bool": {"must_not": [{"term": {"is_canonical": False}}]}})
+        body = {
+            "size": limit,
+            "_source": ["id", "closing_date"],
+            "query": {"bool": {"filter": filters}},
+            "sort": BROWSE_SORT,
+            "track_total_hits": False
+        }
+        if search_after:
+            body["search_after"] = search_after
+        return body
+
+    def _preference(self, query: Optional[str], filter_kwargs: Dict[str, Any]) -> Optional[str]:
+        """Stable shard-copy routing key for a search, or None to let Elasticsearch pick copies"""
+        if not self.preference_routing:
+            return None
+        key = json.dumps([(query or "").strip().lower(), filter_kwargs], sort_keys=True, default=str)
+        # Custom preference strings must not start with "_"
+        return "q" + hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def browse_tenders(self, limit: int = 20, search_after: Optional[List[Any]] = None,
+                       collapse_duplicates: bool = True, **filter_kwargs) -> Dict[str, Any]:
+        """
+        Filter-only listing, closing soonest first, with no text or vector scoring.
+
+        The sort matches the index sort and total hits are not tracked, so
+        Elasticsearch can stop each shard after `limit` matches. Page with the
+        returned `next_search_after` instead of growing `limit`.
+        """
+        search_start = time.perf_counter()
+        body = self._build_browse_body(limit, filter_kwargs, search_after, collapse_duplicates)
         
-        # Procurement category filtering using database schema
-        if procurement_category:
-            filters.append({"terms": {"category_primary": procurement_category}})
-            applied_filters.append(f"category_primary: {procurement_category}")
+        try:
+            with timed("es_query", SEARCH_ES_QUERY_SECONDS):
+                response = self.es.search(index=self._search_indices(filter_kwargs), body=body,
+                                          preference=self._preference(None, filter_kwargs))
+        except Exception as e:
+            SEARCH_ERRORS_TOTAL.labels(stage="es_query").inc()
+            logger.error(f"❌ Elasticsearch browse error: {e}")
+            return {"results": [], "next_search_after": None}
         
-        # Notice type filtering using database schema
-        if notice_type:
-            filters.append({"terms": {"procurement_type": notice_type}})
-            applied_filters.append(f"procurement_type: {notice_type}")
+        hits = response["hits"]["hits"]
+        results = [{"id": hit["_source"]["id"], "closing_date": hit["_source"].get("closing_date")} for hit in hits]
+        SEARCH_LATENCY_SECONDS.observe(time.perf_counter() - search_start)
+        return {
+            "results": results,
+            # Only a full page can have a next page
+            "next_search_after": hits[-1]["sort"] if len(hits) == limit else None
+        }
+
+    def search_tenders(self, query: str, regions: Optional[List[str]] = None, 
+                      procurement_method: Optional[str] = None,
+                      procurement_category: Optional[List[str]] = None,
+                      notice_type: Optional[List[str]] = None,
+                      status: Optional[List[str]] = None,
+                      contracting_entity_name: Optional[List[str]] = None,
+                      closing_date_after: Optional[str] = None,
+                      closing_date_before: Optional[str] = None,
+                      publication_date_after: Optional[str] = None,
+                      publication_date_before: Optional[str] = None,
+                      limit: Optional[int] = 100,
+                      collapse_duplicates: bool = True) -> List[Dict[str, Any]]:
+        """Search tenders with natural language and advanced filters"""
+        filter_kwargs = dict(
+            regions=regions,
+            procurement_method=procurement_method,
+            procurement_category=procurement_category,
+            notice_type=notice_type,
+            status=status,
+            contracting_entity_name=contracting_entity_name,
+            closing_date_after=closing_date_after,
+            closing_date_before=closing_date_before,
+            publication_date_after=publication_date_after,
+            publication_date_before=publication_date_before
+        )
+        results, _ = self._run_search(query, filter_kwargs, limit, collapse=collapse_duplicates)
+        return results
+
+    def search_tenders_with_facets(self, query: str, limit: Optional[int] = 100,
+                                   collapse_duplicates: bool = True, **filter_kwargs) -> Dict[str, Any]:
+        """Search tenders and return facet counts from the same Elasticsearch request"""
+        results, facets = self._run_search(query, filter_kwargs, limit, facets=True, collapse=collapse_duplicates)
+        return {"results": results, "facets": facets or {}}
+
+    def _run_search(self, query: str, filter_kwargs: Dict[str, Any], limit: int,
+                    facets: bool = False, collapse: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Dict[str, int]]]]:
+        """Shared search path; returns (results, facets) where facets is None unless requested"""
+        search_start = time.perf_counter()
+        verbose = should_log_request(logger)
+        if verbose:
+            logger.info(f"🔍 SEARCH REQUEST: query='{query}', limit={limit}, facets={facets}")
+            logger.info(f"📊 Filters: {filter_kwargs}")
         
-        # Tender status filtering using database schema
-        if status:
-            filters.append({"terms": {"status": status}})
-            applied_filters.append(f"status: {status}")
-        else:
-            # Only show open tenders by default if no status specified
-            applied_filters.append("status: Open (default)")
+        # No text to score: list by closing date instead of encoding an empty query
+        if not (query or "").strip() and not facets:
+            browse = self.browse_tenders(limit=limit, collapse_duplicates=collapse, **filter_kwargs)
+            return [
+                {"id": result["id"], "search_score": 0.0, "match_explanation": "closing soonest"}
+                for result in browse["results"]
+            ], None
         
-        # Contracting entity filtering using actual schema
-        if contracting_entity_name:
-            filters.append({"terms": {"contracting_entity_name": contracting_entity_name}})
-            applied_filters.append(f"contracting_entity_name: {contracting_entity_name}")
+        # Generate embedding for the search query
+        try:
+            with timed("encode", SEARCH_ENCODE_SECONDS):
+                query_embedding = self.model.encode(query).tolist()
+        except Exception as e:
+            SEARCH_ERRORS_TOTAL.labels(stage="encode").inc()
+            logger.error(f"❌ Error generating embedding: {e}")
+            return [], None
         
-        # Closing date filtering using database schema
-        if closing_date_after or closing_date_before:
-            date_range = {}
-            if closing_date_after:
-                date_range["gte"] = closing_date_after
-            if closing_date_before:
-                date_range["lte"] = closing_date_before
-            filters.append({
-                "range": {
-                    "closing_date": date_range
-                }
-            })
-            applied_filters.append(f"closing_date: {date_range}")
+        # Small deployments can answer entirely from the in-process index
+        if VECTOR_INDEX_PRIMARY and self._vector_index_ready():
+            return self._search_vector_index(query_embedding, limit, filter_kwargs, search_start, reason="primary"), None
         
-        # Publication date filtering
-        if publication_date_after or publication_date_before:
-            date_range = {}
-            if publication_date_after:
-                date_range["gte"] = publication_date_after
-            if publication_date_before:
-                date_range["lte"] = publication_date_before
-            filters.append({
-                "range": {
-                    "publication_date": date_range
-                }
-            })
-            applied_filters.append(f"publication_date: {date_range}")
+        # Check if index exists
+        try:
+            if not self.es.indices.exists(index=TENDERS_INDEX):
+                logger.warning("⚠️ Tenders index does not exist, creating it...")
+                self.create_tenders_index()
+                logger.info("📋 Index created but no data synced yet - returning empty results")
+                return [], None  # Return empty results until data is synced
+        except Exception as e:
+            SEARCH_ERRORS_TOTAL.labels(stage="index_check").inc()
+            logger.error(f"❌ Error checking index existence: {e}")
+            if self._vector_index_ready():
+                return self._search_vector_index(query_embedding, limit, filter_kwargs, search_start, reason="es_unavailable"), None
+            return [], None
         
-        if filters:
-            search_body["query"]["bool"]["filter"] = filters
-            logger.info(f"🔧 Applied {len(filters)} filters: {', '.join(applied_filters)}")
-        else:
-            logger.info("🔧 No filters applied")
+        # Unfiltered facets don't depend on the query text, so they are served from cache between syncs
+        unfiltered = not any(filter_kwargs.values())
+        cached_facets = self._cached_facets() if facets and unfiltered else None
+        search_body = self._build_search_body(query, query_embedding, limit, filter_kwargs,
+                                              facets=facets and cached_facets is None, collapse=collapse)
         
         # Execute search
         try:
-            logger.info("🚀 Executing Elasticsearch search...")
-            logger.debug(f"📋 Search body: {json.dumps(search_body, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"📋 Search body: {json.dumps(search_body, indent=2)}")
             
-            search_exec_start = datetime.now()
-            response = self.es.search(index="tenders", body=search_body)
-            search_exec_time = (datetime.now() - search_exec_start).total_seconds() * 1000
-            
-            total_hits = response.get('hits', {}).get('total', {})
-            if isinstance(total_hits, dict):
-                hit_count = total_hits.get('value', 0)
-                hit_relation = total_hits.get('relation', 'eq')
-                logger.info(f"✅ Search completed: {hit_count} hits ({hit_relation}) in {search_exec_time:.1f}ms")
-            else:
-                hit_count = total_hits
-                logger.info(f"✅ Search completed: {hit_count} hits in {search_exec_time:.1f}ms")
+            with timed("es_query", SEARCH_ES_QUERY_SECONDS):
+                response = self.es.search(index=self._search_indices(filter_kwargs), body=search_body,
+                                          preference=self._preference(query, filter_kwargs))
                 
         except Exception as e:
+            SEARCH_ERRORS_TOTAL.labels(stage="es_query").inc()
             logger.error(f"❌ Elasticsearch search error: {e}")
             logger.error(f"📋 Failed search body: {json.dumps(search_body, indent=2)}")
+            if self._vector_index_ready():
+                return self._search_vector_index(query_embedding, limit, filter_kwargs, search_start, reason="es_error"), None
             # Return empty results instead of crashing
+            return [], None
+        
+        with timed("process", SEARCH_RESULT_PROCESSING_SECONDS):
+            results = self._format_hits(response['hits']['hits'], query)
+            
+            facet_counts = cached_facets
+            if facets and cached_facets is None and 'aggregations' in response:
+                facet_counts = self._parse_facets(response['aggregations'])
+                if unfiltered:
+                    self._facet_cache = (time.monotonic(), facet_counts)
+        
+        search_end = time.perf_counter()
+        SEARCH_LATENCY_SECONDS.observe(search_end - search_start)
+        
+        if verbose:
+            total_hits = response.get('hits', {}).get('total', {})
+            hit_count = total_hits.get('value', 0) if isinstance(total_hits, dict) else total_hits
+            top = f", top: {results[0]['id']} ({results[0]['search_score']:.3f})" if results else ""
+            logger.info(f"🎉 SEARCH COMPLETED: {len(results)}/{hit_count} hits, "
+                        f"{(search_end - search_start) * 1000:.1f}ms total{top}")
+            
+        return results, facet_counts
+
+    def search_tenders_batch(self, searches: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches with one batched encode and one _msearch round trip.
+
+        Each search is a dict with `query`, optional `limit` and `collapse_duplicates`,
+        and the same filter keys as search_tenders. Results come back in request order; a search that
+        fails on its own returns an empty list without failing the batch.
+        """
+        if not searches:
             return []
+        search_start = time.perf_counter()
+        queries = [search["query"] for search in searches]
+        # Same default as search_tenders; an explicit 0 stays 0
+        limits = [100 if search.get("limit") is None else max(0, int(search["limit"])) for search in searches]
+        collapses = [search.get("collapse_duplicates", True) for search in searches]
+        filter_kwargs_list = [
+            {key: value for key, value in search.items() if key not in ("query", "limit", "collapse_duplicates")}
+            for search in searches
+        ]
+        # Like _run_search, queries with no text are browsed by closing date, never encoded
+        texts = [i for i, query in enumerate(queries) if (query or "").strip()]
         
-        # Format results with minimal data - only ID and search metadata
-        logger.info("🔄 Processing search results...")
+        query_embeddings: List[Optional[List[float]]] = [None] * len(searches)
+        if texts:
+            try:
+                with timed("encode", SEARCH_ENCODE_SECONDS):
+                    vectors = self.model.encode([queries[i] for i in texts], batch_size=min(len(texts), 64)).tolist()
+            except Exception as e:
+                SEARCH_ERRORS_TOTAL.labels(stage="encode").inc()
+                logger.error(f"❌ Error generating batch embeddings: {e}")
+                return [[] for _ in searches]
+            for i, vector in zip(texts, vectors):
+                query_embeddings[i] = vector
+        
+        batch_results: List[List[Dict[str, Any]]] = [[] for _ in searches]
+        
+        def from_vector_index(indices: List[int], reason: str):
+            if not indices or not self._vector_index_ready():
+                return
+            for i in indices:
+                batch_results[i] = self._search_vector_index(query_embeddings[i], limits[i], filter_kwargs_list[i],
+                                                             search_start, reason=reason)
+        
+        # Text searches the in-process index answers stay out of the _msearch; browses always go to Elasticsearch
+        if VECTOR_INDEX_PRIMARY and self._vector_index_ready():
+            from_vector_index(texts, "primary")
+            pending = [i for i, query in enumerate(queries) if not (query or "").strip()]
+        else:
+            pending = list(range(len(searches)))
+        if not pending:
+            return batch_results
+        
+        # One header/body pair per search, all in a single request
+        msearch_body = []
+        for i in pending:
+            query, limit, filter_kwargs, collapse = queries[i], limits[i], filter_kwargs_list[i], collapses[i]
+            header = {"index": self._search_indices(filter_kwargs)}
+            preference = self._preference(query, filter_kwargs)
+            if preference:
+                header["preference"] = preference
+            msearch_body.append(header)
+            if query_embeddings[i] is not None:
+                msearch_body.append(self._build_search_body(query, query_embeddings[i], limit, filter_kwargs, collapse=collapse))
+            else:
+                msearch_body.append(self._build_browse_body(limit, filter_kwargs, collapse=collapse))
+        
+        try:
+            with timed("es_query", SEARCH_ES_QUERY_SECONDS):
+                response = self.es.msearch(body=msearch_body)
+        except Exception as e:
+            SEARCH_ERRORS_TOTAL.labels(stage="es_query").inc()
+            logger.error(f"❌ Elasticsearch msearch error ({len(pending)} searches): {e}")
+            from_vector_index([i for i in pending if query_embeddings[i] is not None], "es_error")
+            return batch_results
+        
+        with timed("process", SEARCH_RESULT_PROCESSING_SECONDS):
+            for i, item in zip(pending, response.get("responses", [])):
+                query = queries[i]
+                if "error" in item:
+                    SEARCH_ERRORS_TOTAL.labels(stage="es_query").inc()
+                    logger.error(f"❌ Batch search {i} ('{query}') failed: {item['error']}")
+                    continue
+                if query_embeddings[i] is not None:
+                    batch_results[i] = self._format_hits(item["hits"]["hits"], query)
+                else:
+                    batch_results[i] = [
+                        {"id": hit["_source"]["id"], "search_score": 0.0, "match_explanation": "closing soonest"}
+                        for hit in item["hits"]["hits"]
+                    ]
+        
+        search_end = time.perf_counter()
+        SEARCH_LATENCY_SECONDS.observe(search_end - search_start)
+        if should_log_request(logger):
+            logger.info(f"🎉 BATCH SEARCH COMPLETED: {len(searches)} searches in {(search_end - search_start) * 1000:.1f}ms")
+        return batch_results
+
+    def _format_hits(self, hits: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+        """Format results with minimal data - only ID and search metadata"""
         results = []
-        for i, hit in enumerate(response['hits']['hits']):
+        for i, hit in enumerate(hits):
             try:
-                result = {
+                results.append({
                     'id': hit['_source']['id'],
                     'search_score': hit['_score'],
                     'match_explanation': self._get_match_explanation(hit, query)
-                }
-                results.append(result)
-                logger.debug(f"📊 Result {i+1}: ID={result['id']}, Score={result['search_score']:.3f}, Reason={result['match_explanation']}")
+                })
             except Exception as e:
+                SEARCH_ERRORS_TOTAL.labels(stage="result_processing").inc()
                 logger.error(f"❌ Error processing search hit {i+1}: {e}")
                 logger.error(f"📄 Hit data: {hit}")
                 continue
-        
-        total_search_time = (datetime.now() - search_start_time).total_seconds() * 1000
-        logger.info(f"🎉 SEARCH COMPLETED: {len(results)} results returned in {total_search_time:.1f}ms total")
-        
-        if results:
-            logger.info(f"🏆 Top result: {results[0]['id']} (score: {results[0]['search_score']:.3f})")
-        else:
-            logger.warning("⚠️ No results found for this search query")
-            
         return results
 
+    def nearest_tenders(self, embedding: List[float], size: int = 10,
+                        fields: Optional[List[str]] = None,
+                        version: str = EMBEDDING_SOURCE_VERSION) -> List[Dict[str, Any]]:
+        """Closest indexed tenders by cosine similarity, as _source dicts with that version's vector as `embedding`"""
+        vector_field = model_spec(version)["field"]
+        body = {
+            "size": size,
+            "query": {
+                "script_score": {
+                    "query": {"exists": {"field": vector_field}},
+                    "script": {
+                        "source": f"cosineSimilarity(params.query_vector, '{vector_field}') + 1.0",
+                        "params": {"query_vector": embedding}
+                    }
+                }
+            }
+        }
+        if fields:
+            body["_source"] = [vector_field if field == "embedding" else field for field in fields]
+        sources = [hit["_source"] for hit in self.es.search(index=ALL_TENDERS_INDICES, body=body)["hits"]["hits"]]
+        if vector_field != "embedding":
+            for source in sources:
+                source["embedding"] = source.pop(vector_field, None)
+        return sources
+
+    def _vector_index_ready(self) -> bool:
+        if self.vector_index is None:
+            return False
+        try:
+            # Syncs in other workers or in scripts/sync_tenders.py write new generations
+            self.vector_index.reload_if_changed()
+        except Exception as e:
+            logger.error(f"❌ Failed to reload vector index from {VECTOR_INDEX_DIR}: {e}")
+        return self.vector_index.loaded
+
+    def _search_vector_index(self, query_embedding: List[float], limit: int, filter_kwargs: Dict[str, Any],
+                             search_start: float, reason: str) -> List[Dict[str, Any]]:
+        """Answer a search from the in-process vector index (cosine only, no text scoring)"""
+        SEARCH_VECTOR_INDEX_TOTAL.labels(reason=reason).inc()
+        try:
+            # Mirror the hot/cold split: archived tenders only when closed statuses are requested
+            hot_only = self._search_indices(filter_kwargs) == TENDERS_INDEX
+            with timed("vector_index"):
+                hits = self.vector_index.search(query_embedding, limit=limit,
+                                                exclude_closed_statuses=CLOSED_STATUSES if hot_only else None,
+                                                **filter_kwargs)
+        except Exception as e:
+            SEARCH_ERRORS_TOTAL.labels(stage="vector_index").inc()
+            logger.error(f"❌ Vector index search error: {e}")
+            return []
+        SEARCH_LATENCY_SECONDS.observe(time.perf_counter() - search_start)
+        # Same scale as the script_score clause so callers can compare scores
+        return [
+            {"id": tender_id, "search_score": similarity + 1.0, "match_explanation": "semantic similarity"}
+            for tender_id, similarity in hits
+        ]
+
+    def refresh_vector_index(self, tenders: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """Rebuild the in-process vector index from synced rows (or the index itself); no-op when it is disabled"""
+        if self.vector_index is None:
+            return None
+        if tenders is None or self.model_version != EMBEDDING_SOURCE_VERSION:
+            # Synced rows carry source-version vectors; queries need the serving version's, which only ES has
+            fields = ["id", self.vector_field] + CATEGORICAL_FIELDS + DATE_FIELDS
+            tenders = [dict(source, embedding=source.get(self.vector_field)) for source in self.scan_tenders(fields=fields)]
+        return self.vector_index.build(tenders)
+
     def _get_match_explanation(self, hit: Dict, query: str) -> str:
-        """Generate a brief explanation of why this tender matched"""
+        """Explain a hit from its highlight fragments and named query clauses"""
         explanation_parts = []
+        highlight = hit.get('highlight') or {}
+        for field, label in EXPLANATION_FIELDS.items():
+            terms = []
+            for fragment in highlight.get(field, []):
+                for piece in fragment.split(HIGHLIGHT_PRE_TAG)[1:]:
+                    term = piece.split(HIGHLIGHT_POST_TAG, 1)[0].lower()
+                    if term not in terms:
+                        terms.append(term)
+            if terms:
+                explanation_parts.append(f"{label} match ({', '.join(terms[:EXPLANATION_MAX_TERMS])})")
         
-        # Check title match
-        title = hit['_source'].get('title') or ''
-        if query.lower() in title.lower():
-            explanation_parts.append("title match")
-            
-        # Check description match
-        description = hit['_source'].get('description') or ''
-        if query.lower() in description.lower():
-            explanation_parts.append("description match")
+        # Text clause matched on a field we don't highlight
+        if not explanation_parts and "text" in hit.get('matched_queries', []):
+            explanation_parts.append("keyword match")
             
         # Default to semantic similarity
         if not explanation_parts:
@@ -451,13 +1156,13 @@ class SearchService:
             
         return ", ".join(explanation_parts)
 
-    def health_check(self) -> Dict[str, str]:
+    def health_check(self) -> Dict[str, Any]:
         """Check Elasticsearch health"""
         logger.info("🏥 Checking Elasticsearch health...")
         try:
             health = self.es.cluster.health()
-            logger.info(f"✅ Elasticsearch health: {health['status']}")
-            return {"elasticsearch": health["status"], "status": "healthy"}
+            logger.info(f"✅ Elasticsearch health: {health['status']} ({health.get('number_of_nodes')} nodes)")
+            return {"elasticsearch": health["status"], "nodes": health.get("number_of_nodes"), "status": "healthy"}
         except Exception as e:
             logger.error(f"❌ Elasticsearch health check failed: {e}")
             return {"elasticsearch": "red", "status": "unhealthy", "error": str(e)}
@@ -466,19 +1171,20 @@ class SearchService:
         """Completely wipe the Elasticsearch database by deleting the tenders index"""
         logger.warning("🚨 CRITICAL OPERATION: Wiping Elasticsearch database!")
         try:
-            # Check if index exists first
-            if self.es.indices.exists(index="tenders"):
-                logger.info("🗑️ Tenders index exists, deleting...")
-                delete_response = self.es.indices.delete(index="tenders")
-                logger.info(f"✅ Tenders index deleted successfully: {delete_response}")
+            # Check if either index exists first
+            existing = [name for name in (TENDERS_INDEX, TENDERS_ARCHIVE_INDEX) if self.es.indices.exists(index=name)]
+            if existing:
+                logger.info(f"🗑️ Tenders indices exist ({', '.join(existing)}), deleting...")
+                delete_response = self.es.indices.delete(index=",".join(existing))
+                logger.info(f"✅ Tenders indices deleted successfully: {delete_response}")
                 
                 # Verify deletion
-                if not self.es.indices.exists(index="tenders"):
-                    logger.info("✅ Verified: Tenders index no longer exists")
+                if not any(self.es.indices.exists(index=name) for name in existing):
+                    logger.info("✅ Verified: Tenders indices no longer exist")
                     return {
                         "status": "success",
                         "message": "Elasticsearch database wiped successfully",
-                        "deleted_index": "tenders",
+                        "deleted_index": ",".join(existing),
                         "acknowledged": delete_response.get("acknowledged", False)
                     }
                 else:
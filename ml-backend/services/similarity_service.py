@@ -0,0 +1,257 @@
+from .search_service import search_service, ALL_TENDERS_INDICES
+from .embedding_models import model_spec
+from .metrics import SIMILAR_TENDERS_REFRESH_SECONDS, SIMILAR_TENDERS_RECOMPUTED_TOTAL
+from dotenv import load_dotenv
+from typing import Optional, List, Dict, Any, Tuple
+import numpy as np
+import threading
+import hashlib
+import logging
+import time
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SIMILAR_TENDERS_INDEX = os.getenv("SIMILAR_TENDERS_INDEX", "similar_tenders")
+SIMILAR_TENDERS_K = int(os.getenv("SIMILAR_TENDERS_K", "10"))
+# Query rows per matmul block; peak memory is about block_size x tenders float32
+SIMILAR_TENDERS_BLOCK_SIZE = int(os.getenv("SIMILAR_TENDERS_BLOCK_SIZE", "1024"))
+SIMILAR_TENDERS_BULK_SIZE = 1000
+
+
+def embedding_hash(vector: np.ndarray) -> str:
+    """Fingerprint of a stored embedding, used to spot rows whose neighbours may have changed"""
+    return hashlib.blake2b(np.ascontiguousarray(vector, dtype=np.float32).tobytes(), digest_size=8).hexdigest()
+
+
+def top_k_neighbours(matrix: np.ndarray, k: int, rows: Optional[np.ndarray] = None,
+                     block_size: int = SIMILAR_TENDERS_BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k cosine neighbours of `rows` (default: every row) among all rows.
+
+    `matrix` must be L2-normalised. Rows are processed in blocks so only a
+    block_size x N similarity matrix is ever held in memory. Returns
+    (indices, scores), both shaped (len(rows), k'), best first, where
+    k' = min(k, N - 1) and a row is never its own neighbour.
+    """
+    n = len(matrix)
+    rows = np.arange(n) if rows is None else np.asarray(rows, dtype=np.int64)
+    k = min(k, n - 1)
+    if k <= 0 or len(rows) == 0:
+        return np.zeros((len(rows), 0), dtype=np.int64), np.zeros((len(rows), 0), dtype=np.float32)
+
+    indices = np.empty((len(rows), k), dtype=np.int64)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        similarity = matrix[block] @ matrix.T
+        similarity[np.arange(len(block)), block] = -np.inf
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+
+def rows_reached_by(matrix: np.ndarray, changed: np.ndarray, thresholds: np.ndarray,
+                    block_size: int = SIMILAR_TENDERS_BLOCK_SIZE) -> np.ndarray:
+    """Rows for which some changed row now scores above their current k-th neighbour"""
+    reached = np.zeros(len(matrix), dtype=bool)
+    for start in range(0, len(changed), block_size):
+        block = changed[start:start + block_size]
+        similarity = matrix[block] @ matrix.T
+        similarity[np.arange(len(block)), block] = -np.inf
+        reached |= (similarity > thresholds).any(axis=0)
+    return reached
+
+
+class SimilarityService:
+    """
+    Precomputed "similar tenders" lists.
+
+    After a sync, every tender's top-k nearest neighbours (cosine over the
+    stored embeddings) are written to a side index keyed by tender id, so a
+    detail page reads one small document instead of running a vector query.
+    Each stored list carries a fingerprint of the tender's embedding; a
+    refresh only recomputes changed tenders plus the rows those changes can
+    reach, and leaves every other list alone.
+    """
+
+    def __init__(self, k: int = SIMILAR_TENDERS_K):
+        logger.info("🧭 Initializing SimilarityService")
+        self.k = k
+        self._refresh_lock = threading.Lock()
+        # Refresh requests that arrived while one was running; the running one goes round again for them
+        self._pending_lock = threading.Lock()
+        self._pending = False
+        self._pending_full = False
+
+    @property
+    def es(self):
+        return search_service.es
+
+    def create_similar_tenders_index(self):
+        mapping = {
+            "mappings": {
+                "properties": {
+                    "id": {"type": "keyword"},
+                    "embedding_hash": {"type": "keyword"},
+                    # Served as-is on lookup, never searched
+                    "neighbours": {"type": "keyword", "index": False},
+                    "scores": {"type": "float", "index": False},
+                    "computed_at": {"type": "date"},
+                }
+            }
+        }
+        self.es.indices.create(index=SIMILAR_TENDERS_INDEX, body=mapping, ignore=400)
+
+    def get_similar(self, tender_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Stored neighbours for one tender, or None when it has none yet"""
+        try:
+            doc = self.es.get(index=SIMILAR_TENDERS_INDEX, id=tender_id)["_source"]
+        except Exception as e:
+            logger.debug(f"🔎 No similar tenders stored for {tender_id}: {e}")
+            return None
+        pairs = list(zip(doc.get("neighbours", []), doc.get("scores", [])))
+        return [{"id": neighbour_id, "similarity": score} for neighbour_id, score in pairs[:limit or len(pairs)]]
+
+    def _load_embeddings(self) -> Tuple[List[str], np.ndarray]:
+        """Every indexed tender's id and L2-normalised embedding"""
+        # Neighbours in the space searches use, so "similar" agrees with search after a model cut-over
+        field = search_service.vector_field
+        dims = model_spec(search_service.model_version)["dims"]
+        # Filled in place: a list of per-tender vectors would take several times the matrix at peak
+        count = self.es.count(index=ALL_TENDERS_INDICES, ignore_unavailable=True)["count"]
+        matrix = np.empty((count, dims), dtype=np.float32)
+        ids = []
+        for source in search_service.scan_tenders(fields=["id", field]):
+            embedding = source.get(field)
+            if embedding is None or len(embedding) != dims:
+                continue
+            if len(ids) == len(matrix):
+                # Tenders indexed since the count
+                matrix = np.resize(matrix, (max(2 * len(matrix), 1024), dims))
+            matrix[len(ids)] = embedding
+            ids.append(str(source["id"]))
+        matrix = matrix[:len(ids)]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return ids, matrix
+
+    def _load_stored(self) -> Dict[str, Dict[str, Any]]:
+        if not self.es.indices.exists(index=SIMILAR_TENDERS_INDEX):
+            self.create_similar_tenders_index()
+            return {}
+        return {
+            doc["id"]: doc
+            for doc in search_service.scan_tenders(fields=["id", "embedding_hash", "neighbours", "scores"],
+                                                   index=SIMILAR_TENDERS_INDEX)
+        }
+
+    def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Recompute neighbour lists affected by changes since the last refresh (all of them if `full`).
+
+        A call made while another refresh runs is queued rather than dropped:
+        the running refresh goes round once more when it finishes, so a tender
+        synced mid-refresh still gets its neighbours.
+        """
+        with self._pending_lock:
+            self._pending = True
+            self._pending_full = self._pending_full or full
+        result = {"status": "queued", "reason": "a running refresh will pick up these changes"}
+        while self._pending and self._refresh_lock.acquire(blocking=False):
+            try:
+                with self._pending_lock:
+                    if not self._pending:
+                        break
+                    full, self._pending, self._pending_full = self._pending_full, False, False
+                with SIMILAR_TENDERS_REFRESH_SECONDS.time():
+                    result = self._refresh(full)
+            finally:
+                self._refresh_lock.release()
+        if result["status"] == "queued":
+            logger.info("⏭️ Similar tenders refresh already running, queued another pass")
+        return result
+
+    def _refresh(self, full: bool) -> Dict[str, Any]:
+        start = time.perf_counter()
+        ids, matrix = self._load_embeddings()
+        stored = self._load_stored()
+        position = {tender_id: row for row, tender_id in enumerate(ids)}
+        hashes = [embedding_hash(vector) for vector in matrix]
+
+        removed = set(stored) - set(position)
+        changed = np.asarray(
+            [row for row, tender_id in enumerate(ids) if stored.get(tender_id, {}).get("embedding_hash") != hashes[row]],
+            dtype=np.int64,
+        )
+
+        if full or len(changed) == len(ids):
+            affected = np.arange(len(ids))
+        else:
+            # A list goes stale if it names a changed/removed tender, or a changed tender now beats its k-th entry
+            stale_ids = removed | {ids[row] for row in changed}
+            affected_mask = np.zeros(len(ids), dtype=bool)
+            affected_mask[changed] = True
+            thresholds = np.full(len(ids), -np.inf, dtype=np.float32)
+            for tender_id, doc in stored.items():
+                row = position.get(tender_id)
+                if row is None:
+                    continue
+                neighbours = doc.get("neighbours") or []
+                if stale_ids.intersection(neighbours):
+                    affected_mask[row] = True
+                elif len(neighbours) >= min(self.k, len(ids) - 1) and doc.get("scores"):
+                    thresholds[row] = doc["scores"][-1]
+            if len(changed):
+                affected_mask |= rows_reached_by(matrix, changed, thresholds)
+            affected = np.flatnonzero(affected_mask)
+
+        indices, scores = top_k_neighbours(matrix, self.k, rows=affected)
+        computed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        actions = []
+        for i, row in enumerate(affected):
+            actions.append([
+                {"index": {"_index": SIMILAR_TENDERS_INDEX, "_id": ids[row]}},
+                {
+                    "id": ids[row],
+                    "embedding_hash": hashes[row],
+                    "neighbours": [ids[j] for j in indices[i]],
+                    "scores": [round(float(score), 5) for score in scores[i]],
+                    "computed_at": computed_at,
+                },
+            ])
+        for tender_id in removed:
+            actions.append([{"delete": {"_index": SIMILAR_TENDERS_INDEX, "_id": tender_id}}])
+
+        failed = 0
+        for offset in range(0, len(actions), SIMILAR_TENDERS_BULK_SIZE):
+            operations = [line for action in actions[offset:offset + SIMILAR_TENDERS_BULK_SIZE] for line in action]
+            response = self.es.bulk(operations=operations)
+            if response.get("errors"):
+                failed += sum(1 for item in response["items"] if next(iter(item.values())).get("error"))
+        if failed:
+            logger.error(f"❌ Failed to store {failed} similar tender lists")
+        SIMILAR_TENDERS_RECOMPUTED_TOTAL.inc(len(affected))
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"🧭 Similar tenders refreshed: {len(affected)}/{len(ids)} lists recomputed "
+                    f"({len(changed)} changed, {len(removed)} removed) in {elapsed:.1f}s")
+        return {
+            "status": "success",
+            "tenders": len(ids),
+            "changed": int(len(changed)),
+            "removed": len(removed),
+            "recomputed": int(len(affected)),
+            "failed": failed,
+            "seconds": round(elapsed, 3),
+        }
+
+# Global instance
+similarity_service = SimilarityService()
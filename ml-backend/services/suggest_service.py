@@ -0,0 +1,100 @@
+from .search_service import search_service, TENDERS_INDEX
+from .metrics import SUGGEST_LATENCY_SECONDS, SUGGEST_CACHE_TOTAL
+from .profiling_service import timed
+from dotenv import load_dotenv
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+import threading
+import logging
+import time
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SUGGEST_CACHE_SIZE = int(os.getenv("SUGGEST_CACHE_SIZE", "10000"))
+SUGGEST_CACHE_TTL_SECONDS = int(os.getenv("SUGGEST_CACHE_TTL_SECONDS", "300"))
+SUGGEST_MAX_SIZE = 20
+
+
+class SuggestService:
+    """
+    Typeahead suggestions from the completion field on the hot tenders index.
+
+    Answers are kept in a small LRU keyed by normalised prefix, so repeated
+    keystrokes across users are served without a round trip. Nothing here
+    touches the embedding model.
+    """
+
+    def __init__(self, cache_size: int = SUGGEST_CACHE_SIZE, ttl_seconds: int = SUGGEST_CACHE_TTL_SECONDS):
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        # prefix -> (cached_at, fetched size, options)
+        self._cache: "OrderedDict[str, Tuple[float, int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate_cache(self):
+        """Drop cached suggestions; called whenever a sync changes the index"""
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, prefix: str, size: int) -> Optional[List[Dict[str, Any]]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(prefix)
+            if entry and now - entry[0] < self.ttl_seconds and entry[1] >= size:
+                self._cache.move_to_end(prefix)
+                SUGGEST_CACHE_TOTAL.labels(result="hit").inc()
+                return entry[2][:size]
+        SUGGEST_CACHE_TOTAL.labels(result="miss").inc()
+        return None
+
+    def _store(self, prefix: str, size: int, options: List[Dict[str, Any]]):
+        with self._lock:
+            self._cache[prefix] = (time.monotonic(), size, options)
+            self._cache.move_to_end(prefix)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def suggest(self, prefix: str, size: int = 8) -> List[Dict[str, Any]]:
+        """Completions for what the user has typed so far"""
+        start = time.perf_counter()
+        normalised = " ".join(prefix.lower().split())
+        size = max(1, min(size, SUGGEST_MAX_SIZE))
+        if not normalised:
+            return []
+
+        options = self._cached(normalised, size)
+        if options is None:
+            body = {
+                "_source": False,
+                "suggest": {
+                    "tenders": {
+                        "prefix": normalised,
+                        "completion": {"field": "suggest", "size": size, "skip_duplicates": True}
+                    }
+                }
+            }
+            try:
+                with timed("suggest_es"):
+                    response = self.es.search(index=TENDERS_INDEX, body=body)
+            except Exception as e:
+                logger.error(f"❌ Suggest query failed for '{normalised}': {e}")
+                return []
+            options = [
+                {"text": option["text"], "score": option.get("_score", 0.0)}
+                for option in response.get("suggest", {}).get("tenders", [{}])[0].get("options", [])
+            ]
+            self._store(normalised, size, options)
+
+        SUGGEST_LATENCY_SECONDS.observe(time.perf_counter() - start)
+        return options
+
+    @property
+    def es(self):
+        return search_service.es
+
+# Global instance
+suggest_service = SuggestService()
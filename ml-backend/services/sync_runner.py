@@ -0,0 +1,221 @@
+from .sync_service import sync_service, SYNC_BATCH_SIZE, SYNC_PAGE_SIZE
+from .search_service import search_service
+from .dedup_service import dedup_service
+from .metrics import SYNC_DURATION_SECONDS, SYNC_ERRORS_TOTAL
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+import threading
+import logging
+import json
+import time
+import os
+
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", "4"))
+SYNC_CHECKPOINT_FILE = os.getenv("SYNC_CHECKPOINT_FILE", ".sync_checkpoint.json")
+SYNC_PROGRESS_INTERVAL_SECONDS = 10
+# Attempts per page before a partition gives up (it resumes from its checkpoint next run)
+SYNC_PAGE_ATTEMPTS = 3
+SYNC_RETRY_BACKOFF_SECONDS = 2.0
+CHECKPOINT_VERSION = 1
+# Failed ids kept per partition in the checkpoint and summary; the counts are always exact
+MAX_FAILED_IDS = 1000
+
+
+class SyncRunner:
+    """
+    Partitioned, resumable full sync.
+
+    The tenders table is split into contiguous id ranges with equal row
+    counts, one per worker thread. Each worker pages through its range in id
+    order and records the last id it indexed in a local checkpoint file after
+    every page, so a crashed run resumes where each partition stopped instead
+    of starting over. Duplicates are clustered per page while indexing and
+    once across the whole index at the end.
+    """
+
+    def __init__(self, workers: int = SYNC_WORKERS, page_size: int = SYNC_PAGE_SIZE,
+                 checkpoint_path: str = SYNC_CHECKPOINT_FILE):
+        self.workers = max(1, workers)
+        self.page_size = page_size
+        self.checkpoint_path = checkpoint_path
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {}
+        self._synced_this_run = 0
+
+    # Checkpoints
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return None
+        if state.get("version") != CHECKPOINT_VERSION:
+            logger.warning(f"⚠️ Ignoring checkpoint written by an incompatible runner version")
+            return None
+        return state
+
+    def _save_checkpoint(self):
+        """Write-then-rename so a crash mid-write never leaves a torn checkpoint; caller holds the lock"""
+        self._state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _plan(self) -> Dict[str, Any]:
+        """Split the id space into self.workers ranges with roughly equal row counts"""
+        ids = sync_service.fetch_tender_ids(page_size=self.page_size)
+        partitions = []
+        count = min(self.workers, max(len(ids), 1))
+        for i in range(count):
+            start, end = len(ids) * i // count, len(ids) * (i + 1) // count
+            partitions.append({
+                "index": i,
+                # The outer bounds stay open so rows inserted mid-run are still covered
+                "first_id": ids[start] if i > 0 else None,
+                "last_id": ids[end - 1] if i < count - 1 and end > start else None,
+                "rows": end - start,
+                "cursor": None,
+                "synced": 0,
+                "failed": 0,
+                "failed_ids": [],
+                "done": False,
+                "error": None,
+            })
+        return {
+            "version": CHECKPOINT_VERSION,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "total_rows": len(ids),
+            "partitions": partitions,
+        }
+
+    # Workers
+
+    def _fetch_page(self, partition: Dict[str, Any]) -> List[Dict[str, Any]]:
+        for attempt in range(1, SYNC_PAGE_ATTEMPTS + 1):
+            try:
+                return sync_service.fetch_tenders_page(partition["cursor"], partition["first_id"],
+                                                       partition["last_id"], page_size=self.page_size)
+            except Exception as e:
+                if attempt == SYNC_PAGE_ATTEMPTS:
+                    raise
+                logger.warning(f"⚠️ Partition {partition['index']}: page fetch failed ({e}), retry {attempt}")
+                time.sleep(SYNC_RETRY_BACKOFF_SECONDS * attempt)
+
+    def _run_partition(self, partition: Dict[str, Any]):
+        try:
+            while True:
+                rows = self._fetch_page(partition)
+                if not rows:
+                    break
+                prepared, failed_ids = sync_service.prepare_tenders(rows)
+                dedup_service.assign_canonical_ids(prepared)
+                indexed = 0
+                for start in range(0, len(prepared), SYNC_BATCH_SIZE):
+                    result = sync_service.index_batch(prepared[start:start + SYNC_BATCH_SIZE])
+                    indexed += result["indexed"]
+                    failed_ids.extend(result["failed_ids"])
+                with self._lock:
+                    partition["cursor"] = rows[-1]["id"]
+                    partition["synced"] += indexed
+                    partition["failed"] += len(failed_ids)
+                    partition["failed_ids"] = (partition["failed_ids"] + failed_ids)[:MAX_FAILED_IDS]
+                    self._synced_this_run += len(rows)
+                    self._save_checkpoint()
+                if len(rows) < self.page_size:
+                    break
+            with self._lock:
+                partition["done"] = True
+                partition["error"] = None
+                self._save_checkpoint()
+        except Exception as e:
+            logger.error(f"❌ Partition {partition['index']} stopped at id {partition['cursor']}: {e}")
+            with self._lock:
+                partition["error"] = str(e)
+                self._save_checkpoint()
+
+    def _report_progress(self, stop: threading.Event, remaining_rows: int, start: float):
+        while not stop.wait(SYNC_PROGRESS_INTERVAL_SECONDS):
+            with self._lock:
+                synced = self._synced_this_run
+                active = sum(1 for p in self._state["partitions"] if not p["done"] and not p["error"])
+            elapsed = time.perf_counter() - start
+            rate = synced / elapsed if elapsed else 0.0
+            eta = (remaining_rows - synced) / rate if rate else float("inf")
+            logger.info(f"📈 Sync progress: {synced}/{remaining_rows} rows, {rate:.0f} rows/s, "
+                        f"ETA {eta:.0f}s, {active} partitions running")
+
+    # Entry point
+
+    def run(self, restart: bool = False) -> Dict[str, Any]:
+        """Sync everything, resuming from the checkpoint unless `restart`; returns a JSON-serialisable summary"""
+        run_start = time.perf_counter()
+        search_service.create_tenders_index()
+
+        state = None if restart else self._load_checkpoint()
+        resumed = state is not None and not all(p["done"] for p in state["partitions"])
+        self._state = state if resumed else self._plan()
+        with self._lock:
+            self._save_checkpoint()
+        pending = [p for p in self._state["partitions"] if not p["done"]]
+        # Rows left is approximate on resume: partitions only record how many they have synced
+        remaining_rows = max(sum(p["rows"] - p["synced"] - p["failed"] for p in pending), 0)
+        logger.info(f"🚀 Partitioned sync {'resumed' if resumed else 'started'}: {len(pending)} partitions, "
+                    f"~{remaining_rows} rows, {self.workers} workers")
+
+        stop_progress = threading.Event()
+        reporter = threading.Thread(target=self._report_progress, args=(stop_progress, remaining_rows, run_start),
+                                    name="sync-progress", daemon=True)
+        reporter.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sync-partition") as pool:
+                list(pool.map(self._run_partition, pending))
+        finally:
+            stop_progress.set()
+
+        partitions = self._state["partitions"]
+        complete = all(p["done"] for p in partitions)
+        dedup = None
+        if complete:
+            try:
+                dedup = sync_service.reassign_canonical_ids()
+            except Exception as e:
+                logger.error(f"❌ Canonical id pass failed: {e}")
+                dedup = {"error": str(e)}
+            sync_service.finish_sync()
+
+        elapsed = time.perf_counter() - run_start
+        SYNC_DURATION_SECONDS.observe(elapsed)
+        if not complete:
+            SYNC_ERRORS_TOTAL.inc()
+        failed = sum(p["failed"] for p in partitions)
+        summary = {
+            "status": "success" if complete and not failed else ("partial" if complete else "incomplete"),
+            "resumed": resumed,
+            "total_rows": self._state["total_rows"],
+            "synced": sum(p["synced"] for p in partitions),
+            "failed": failed,
+            "rows_per_second": round(self._synced_this_run / elapsed, 1) if elapsed else None,
+            "seconds": round(elapsed, 3),
+            "duplicates": dedup,
+            "checkpoint": self.checkpoint_path,
+            "partitions": [
+                {key: p[key] for key in ("index", "first_id", "last_id", "cursor", "synced", "failed", "done", "error")}
+                for p in partitions
+            ],
+            "failed_ids": [tender_id for p in partitions for tender_id in p["failed_ids"]],
+        }
+        logger.info(f"🎉 Partitioned sync {summary['status']}: {summary['synced']} synced, {failed} failed "
+                    f"in {summary['seconds']}s")
+        return summary
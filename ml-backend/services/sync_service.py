@@ -1,8 +1,14 @@
 import os
 from supabase import create_client, Client
-from .search_service import search_service
+from .search_service import search_service, ALL_TENDERS_INDICES, TENDERS_INDEX
+from .alert_service import alert_service
+from .dedup_service import dedup_service, DEDUP_FIELDS
+from .suggest_service import suggest_service
+from .embedding_models import model_spec, EMBEDDING_SOURCE_VERSION
+from .metrics import SYNC_TENDERS_TOTAL, SYNC_DURATION_SECONDS, SYNC_ERRORS_TOTAL
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import numpy as np
 import logging
 from datetime import datetime
 import json
@@ -11,6 +17,11 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Tenders per bulk request; each batch's new tenders are percolated together
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "500"))
+# Rows per Supabase request when paging through the tenders table by id
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+
 class SyncService:
     def __init__(self):
         logger.info("🔄 Initializing SyncService")
@@ -56,27 +67,28 @@ class SyncService:
                 }
             
             indexed_count = 0
-            failed_count = 0
-            failed_tenders = []
+            alert_matches = []
+            prepared, failed_tenders = self.prepare_tenders(tenders)
+            failed_count = len(failed_tenders)
+            
+            # Cluster cross-source near-duplicates so every posting is indexed with its canonical_id
+            dedup_result = dedup_service.assign_canonical_ids(prepared)
             
-            # Index each tender
+            # Index in bulk batches, then reverse-search each batch's new tenders against saved searches
             logger.info("🔄 Starting to index tenders...")
-            for i, tender in enumerate(tenders):
-                try:
-                    tender["embedding"] = json.loads(tender["embedding"])
-                    search_service.index_tender(tender)
-                    indexed_count += 1
-                    
-                    if (i + 1) % 10 == 0:
-                        logger.info(f"✅ Progress: {i+1}/{len(tenders)} indexed")
-                        
-                except Exception as e:
-                    failed_count += 1
-                    tender_id = tender.get('id', 'unknown')
-                    failed_tenders.append(tender_id)
-                    logger.error(f"❌ Error indexing tender {tender_id}: {e}")
-                    
+            for start in range(0, len(prepared), SYNC_BATCH_SIZE):
+                result = self.index_batch(prepared[start:start + SYNC_BATCH_SIZE])
+                indexed_count += result["indexed"]
+                failed_count += result["failed"]
+                failed_tenders.extend(result["failed_ids"])
+                alert_matches.extend(result["alert_matches"])
+                logger.info(f"✅ Progress: {min(start + SYNC_BATCH_SIZE, len(prepared))}/{len(prepared)} processed")
+            
+            # Refresh the in-process fallback index from the rows we already hold
+            self.finish_sync(tenders)
+            
             sync_time = (datetime.now() - sync_start_time).total_seconds()
+            SYNC_DURATION_SECONDS.observe(sync_time)
             logger.info(f"🎉 SYNC COMPLETED in {sync_time:.1f}s")
             logger.info(f"📊 Results: {indexed_count} successful, {failed_count} failed")
             
@@ -88,11 +100,14 @@ class SyncService:
                 "total_tenders": len(tenders),
                 "indexed": indexed_count,
                 "failed": failed_count,
+                "alert_matches": alert_matches,
+                "duplicates": dedup_result["duplicates"],
                 "sync_time_seconds": sync_time
             }
             
         except Exception as e:
             sync_time = (datetime.now() - sync_start_time).total_seconds()
+            SYNC_ERRORS_TOTAL.inc()
             logger.error(f"💥 SYNC FAILED after {sync_time:.1f}s: {e}")
             return {
                 "status": "error",
@@ -100,6 +115,168 @@ class SyncService:
                 "sync_time_seconds": sync_time
             }
 
+    def prepare_tenders(self, tenders: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Parse Supabase rows for indexing; returns (prepared rows, ids that could not be parsed)"""
+        prepared = []
+        failed_ids = []
+        for tender in tenders:
+            try:
+                if isinstance(tender.get("embedding"), str):
+                    tender["embedding"] = json.loads(tender["embedding"])
+                prepared.append(tender)
+            except Exception as e:
+                SYNC_TENDERS_TOTAL.labels(outcome="failed").inc()
+                failed_ids.append(tender.get('id', 'unknown'))
+                logger.error(f"❌ Error preparing tender {tender.get('id', 'unknown')}: {e}")
+        return prepared, failed_ids
+
+    def index_batch(self, batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Bulk index one batch of prepared tenders and percolate the newly created ones"""
+        try:
+            result = search_service.bulk_index_tenders(batch)
+        except Exception as e:
+            SYNC_TENDERS_TOTAL.labels(outcome="failed").inc(len(batch))
+            logger.error(f"❌ Error bulk indexing batch of {len(batch)}: {e}")
+            ids = [t.get('id', 'unknown') for t in batch]
+            return {"indexed": 0, "failed": len(batch), "failed_ids": ids, "alert_matches": []}
+        
+        SYNC_TENDERS_TOTAL.labels(outcome="indexed").inc(result["indexed"])
+        SYNC_TENDERS_TOTAL.labels(outcome="failed").inc(result["failed"])
+        
+        alert_matches = []
+        created = set(result["created_ids"])
+        if created:
+            try:
+                alert_matches = alert_service.match_tenders([t for t in batch if t["id"] in created])
+            except Exception as e:
+                logger.error(f"❌ Failed to match saved searches for batch: {e}")
+        return {
+            "indexed": result["indexed"],
+            "failed": result["failed"],
+            "failed_ids": result["failed_ids"],
+            "alert_matches": alert_matches
+        }
+
+    def finish_sync(self, tenders: Optional[List[Dict[str, Any]]] = None):
+        """Drop caches and rebuild the fallback vector index (from the index itself when rows aren't held)"""
+        search_service.invalidate_facet_cache()
+        suggest_service.invalidate_cache()
+        try:
+            vector_index_result = search_service.refresh_vector_index(tenders)
+            if vector_index_result:
+                logger.info(f"🧮 Vector index refreshed: {vector_index_result['tenders']} tenders")
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh vector index: {e}")
+
+    def fetch_tender_ids(self, page_size: int = SYNC_PAGE_SIZE) -> List[str]:
+        """Every tender id in database order, paged by id so no single response is truncated"""
+        ids = []
+        while True:
+            query = self.supabase.table('tenders').select('id').order('id').limit(page_size)
+            if ids:
+                query = query.gt('id', ids[-1])
+            page = [row['id'] for row in query.execute().data]
+            ids.extend(page)
+            if len(page) < page_size:
+                return ids
+
+    def fetch_tenders_page(self, after: Optional[str], first_id: Optional[str], last_id: Optional[str],
+                           page_size: int = SYNC_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """Next page of full rows in [first_id, last_id] after `after`, in id order; open bounds when None"""
+        query = self.supabase.table('tenders').select('*').order('id').limit(page_size)
+        if after is not None:
+            query = query.gt('id', after)
+        elif first_id is not None:
+            query = query.gte('id', first_id)
+        if last_id is not None:
+            query = query.lte('id', last_id)
+        return query.execute().data
+
+    def reassign_canonical_ids(self) -> Dict[str, Any]:
+        """
+        Re-cluster duplicates across the whole index and fix documents whose
+        canonical id changed. Partitioned syncs only dedup within a page, so
+        they finish with this pass.
+        """
+        source_field = model_spec(EMBEDDING_SOURCE_VERSION)["field"]
+        fields = [source_field if field == "embedding" else field for field in DEDUP_FIELDS]
+        tenders = []
+        locations = {}
+        for hit in search_service.scan_hits(fields=fields):
+            tender = hit["_source"]
+            embedding = tender.pop(source_field, None)
+            # float32 arrays instead of Python lists keep a full-corpus pass in memory
+            tender["embedding"] = np.asarray(embedding, dtype=np.float32) if embedding else None
+            tender["indexed_canonical_id"] = tender.get("canonical_id")
+            tender.pop("canonical_id", None)
+            tenders.append(tender)
+            locations[tender["id"]] = hit["_index"]
+        
+        dedup_result = dedup_service.assign_canonical_ids(tenders)
+        changed = [t for t in tenders if t["canonical_id"] != t["indexed_canonical_id"]]
+        for start in range(0, len(changed), SYNC_BATCH_SIZE):
+            operations = []
+            for tender in changed[start:start + SYNC_BATCH_SIZE]:
+                operations.append({"update": {"_index": locations[tender["id"]], "_id": tender["id"]}})
+                operations.append({"doc": {"canonical_id": tender["canonical_id"],
+                                           "is_canonical": tender["canonical_id"] == tender["id"]}})
+            response = search_service.es.bulk(operations=operations)
+            if response.get("errors"):
+                failed = [item for item in response["items"] if next(iter(item.values())).get("error")]
+                logger.error(f"❌ Failed to update canonical ids for {len(failed)} tenders")
+        logger.info(f"🧬 Canonical ids re-assigned: {len(changed)} changed")
+        return {"tenders": len(tenders), "changed": len(changed), "duplicates": dedup_result["duplicates"]}
+
+    def reassign_orphaned_clusters(self) -> Dict[str, Any]:
+        """
+        Pick a new canonical for duplicate clusters whose canonical left the
+        hot index (closed, expired or deleted), so their still-open postings
+        show in browse and recommendations again. Runs after each rollover.
+        """
+        canonical_ids = {
+            source["canonical_id"]
+            for source in search_service.scan_tenders(fields=["id", "canonical_id"], index=TENDERS_INDEX,
+                                                      query={"term": {"is_canonical": False}})
+            if source.get("canonical_id")
+        }
+        orphaned = []
+        candidates = sorted(canonical_ids)
+        for start in range(0, len(candidates), SYNC_BATCH_SIZE):
+            chunk = candidates[start:start + SYNC_BATCH_SIZE]
+            query = {"bool": {"filter": [{"ids": {"values": chunk}}, {"term": {"is_canonical": True}}]}}
+            present = {source["id"] for source in search_service.scan_tenders(fields=["id"], index=TENDERS_INDEX, query=query)}
+            orphaned.extend(canonical_id for canonical_id in chunk if canonical_id not in present)
+
+        changed = 0
+        fields = ["id", "status", "closing_date", "published_date", "canonical_id"]
+        for start in range(0, len(orphaned), SYNC_BATCH_SIZE):
+            clusters: Dict[str, List[Dict[str, Any]]] = {}
+            locations = {}
+            for hit in search_service.scan_hits(fields=fields,
+                                                query={"terms": {"canonical_id": orphaned[start:start + SYNC_BATCH_SIZE]}}):
+                clusters.setdefault(hit["_source"]["canonical_id"], []).append(hit["_source"])
+                locations[hit["_source"]["id"]] = hit["_index"]
+            operations = []
+            for canonical_id, members in clusters.items():
+                new_canonical_id = dedup_service._canonical(members)["id"]
+                if new_canonical_id == canonical_id:
+                    # Every posting in the cluster is archived; nothing open to promote
+                    continue
+                for member in members:
+                    operations.append({"update": {"_index": locations[member["id"]], "_id": member["id"]}})
+                    operations.append({"doc": {"canonical_id": new_canonical_id,
+                                               "is_canonical": member["id"] == new_canonical_id}})
+            if not operations:
+                continue
+            response = search_service.es.bulk(operations=operations)
+            failed = [item for item in response["items"] if next(iter(item.values())).get("error")]
+            if failed:
+                logger.error(f"❌ Failed to update canonical ids for {len(failed)} tenders")
+            changed += len(response["items"]) - len(failed)
+        if orphaned:
+            logger.info(f"🧬 {len(orphaned)} duplicate clusters lost their canonical to the archive, {changed} tenders updated")
+        return {"orphaned_clusters": len(orphaned), "changed": changed}
+
     def sync_single_tender(self, tender_id: str) -> Dict[str, Any]:
         """Sync a single tender by ID"""
         
@@ -114,9 +291,19 @@ class SyncService:
                 }
             
             tender = response.data[0]
+            if isinstance(tender.get("embedding"), str):
+                tender["embedding"] = json.loads(tender["embedding"])
+            
+            # Join an existing duplicate cluster if a near-identical posting is already indexed
+            if tender.get("embedding"):
+                neighbours = search_service.nearest_tenders(tender["embedding"], size=10, fields=DEDUP_FIELDS)
+                tender["canonical_id"] = dedup_service.find_canonical_id(tender, neighbours)
             
             # Index the tender
             search_service.index_tender(tender)
+            SYNC_TENDERS_TOTAL.labels(outcome="indexed").inc()
+            search_service.invalidate_facet_cache()
+            suggest_service.invalidate_cache()
             
             return {
                 "status": "success",
@@ -125,6 +312,7 @@ class SyncService:
             }
             
         except Exception as e:
+            SYNC_TENDERS_TOTAL.labels(outcome="failed").inc()
             return {
                 "status": "error",
                 "tender_id": tender_id,
@@ -140,7 +328,7 @@ class SyncService:
             supabase_count = supabase_response.count
             
             # Get tender count from Elasticsearch
-            es_response = search_service.es.count(index="tenders")
+            es_response = search_service.es.count(index=ALL_TENDERS_INDICES)
             es_count = es_response['count']
             
             return {
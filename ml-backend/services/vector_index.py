@@ -0,0 +1,244 @@
+import numpy as np
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+import logging
+import shutil
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Keyword fields kept as integer codes so filters become vectorized masks
+CATEGORICAL_FIELDS = [
+    "delivery_location",
+    "category_primary",
+    "procurement_method",
+    "procurement_type",
+    "status",
+    "contracting_entity_name",
+]
+DATE_FIELDS = ["closing_date", "published_date"]
+# How often readers look for a generation written by another process (a sync script, another worker)
+RELOAD_CHECK_SECONDS = 5.0
+
+
+def _to_datetime64(value: Any) -> np.datetime64:
+    if not value:
+        return np.datetime64("NaT", "s")
+    try:
+        # Drop timezone suffixes; closing dates are compared at second resolution
+        text = str(value).replace("Z", "")
+        if "+" in text[10:]:
+            text = text[:10] + text[10:].split("+")[0]
+        return np.datetime64(text, "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+
+class _Snapshot:
+    """One immutable generation of the index: embeddings plus metadata columns"""
+
+    def __init__(self, embeddings: np.ndarray, ids: np.ndarray, codes: Dict[str, np.ndarray],
+                 vocab: Dict[str, np.ndarray], dates: Dict[str, np.ndarray], path: Optional[str]):
+        self.embeddings = embeddings
+        self.ids = ids
+        self.codes = codes
+        self.vocab = vocab
+        self.dates = dates
+        self.path = path
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class VectorIndex:
+    """
+    In-process vector index over all tender embeddings.
+
+    Embeddings live in a memory-mapped float32 .npy file (L2-normalised so a
+    matmul gives cosine similarity) next to a compact metadata .npz holding
+    ids, integer-coded keyword fields and datetime64 dates. Each rebuild
+    writes a new generation directory and flips a CURRENT pointer, so
+    readers never see a half-written index.
+    """
+
+    def __init__(self, directory: str, dims: int = 384):
+        self.directory = directory
+        self.dims = dims
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None and len(self._snapshot) > 0
+
+    def __len__(self):
+        return len(self._snapshot) if self._snapshot is not None else 0
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._snapshot.ids if self._snapshot is not None else np.array([], dtype=str)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        if self._snapshot is None:
+            return np.zeros((0, self.dims), dtype=np.float32)
+        return self._snapshot.embeddings
+
+    def load(self) -> bool:
+        """Memory-map the current generation from disk, if there is one"""
+        pointer = os.path.join(self.directory, "CURRENT")
+        if not os.path.exists(pointer):
+            return False
+        with open(pointer) as f:
+            generation = os.path.join(self.directory, f.read().strip())
+        embeddings = np.load(os.path.join(generation, "embeddings.npy"), mmap_mode="r")
+        with np.load(os.path.join(generation, "metadata.npz"), allow_pickle=False) as meta:
+            ids = meta["ids"]
+            codes = {field: meta[f"code_{field}"] for field in CATEGORICAL_FIELDS}
+            vocab = {field: meta[f"vocab_{field}"] for field in CATEGORICAL_FIELDS}
+            dates = {field: meta[f"date_{field}"] for field in DATE_FIELDS}
+        self._snapshot = _Snapshot(embeddings, ids, codes, vocab, dates, generation)
+        logger.info(f"📂 Loaded vector index generation {os.path.basename(generation)} ({len(ids)} tenders)")
+        return True
+
+    def reload_if_changed(self, min_interval_seconds: float = RELOAD_CHECK_SECONDS) -> bool:
+        """Load the generation CURRENT points at if it isn't the loaded one; reads CURRENT at most once per interval"""
+        now = time.monotonic()
+        if now - self._checked_at < min_interval_seconds:
+            return False
+        self._checked_at = now
+        try:
+            with open(os.path.join(self.directory, "CURRENT")) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return False
+        loaded = os.path.basename(self._snapshot.path) if self._snapshot is not None and self._snapshot.path else None
+        return name != loaded and self.load()
+
+    def build(self, tenders: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Write a new generation from tender rows that carry an `embedding`, then swap it in"""
+        start = time.perf_counter()
+        tenders = list(tenders)
+        rows = [
+            t for t in tenders
+            if isinstance(t.get("embedding"), (list, tuple, np.ndarray)) and len(t["embedding"]) == self.dims
+        ]
+
+        embeddings = np.asarray([t["embedding"] for t in rows], dtype=np.float32).reshape(len(rows), self.dims)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
+
+        metadata = {"ids": np.asarray([str(t["id"]) for t in rows], dtype=str)}
+        for field in CATEGORICAL_FIELDS:
+            values = np.asarray([t.get(field) or "" for t in rows], dtype=str)
+            vocab, codes = np.unique(values, return_inverse=True)
+            metadata[f"vocab_{field}"] = vocab
+            metadata[f"code_{field}"] = codes.astype(np.int32)
+        for field in DATE_FIELDS:
+            metadata[f"date_{field}"] = np.asarray([_to_datetime64(t.get(field)) for t in rows], dtype="datetime64[s]")
+
+        os.makedirs(self.directory, exist_ok=True)
+        generation_name = f"gen-{time.time_ns()}-{os.getpid()}"
+        generation = os.path.join(self.directory, generation_name)
+        os.makedirs(generation, exist_ok=True)
+        np.save(os.path.join(generation, "embeddings.npy"), embeddings)
+        np.savez(os.path.join(generation, "metadata.npz"), **metadata)
+
+        pointer_tmp = os.path.join(self.directory, f"CURRENT.{os.getpid()}")
+        with open(pointer_tmp, "w") as f:
+            f.write(generation_name)
+        os.replace(pointer_tmp, os.path.join(self.directory, "CURRENT"))
+
+        previous = self._snapshot.path if self._snapshot is not None else None
+        self.load()
+        self._prune(keep={generation_name, os.path.basename(previous) if previous else None})
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"✅ Vector index rebuilt: {len(rows)} tenders in {elapsed:.1f}s")
+        return {"tenders": len(rows), "skipped": len(tenders) - len(rows), "seconds": round(elapsed, 3)}
+
+    def _prune(self, keep: set):
+        """Drop old generations; the one just replaced stays for readers still mapping it"""
+        for name in os.listdir(self.directory):
+            if name.startswith("gen-") and name not in keep:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def _category_mask(self, snap: _Snapshot, field: str, values: Optional[List[str]]) -> Optional[np.ndarray]:
+        if not values:
+            return None
+        wanted = np.flatnonzero(np.isin(snap.vocab[field], np.asarray(values, dtype=str)))
+        return np.isin(snap.codes[field], wanted)
+
+    def _date_mask(self, snap: _Snapshot, field: str, after: Optional[str], before: Optional[str]) -> Optional[np.ndarray]:
+        if not after and not before:
+            return None
+        column = snap.dates[field]
+        mask = ~np.isnat(column)
+        if after:
+            mask &= column >= _to_datetime64(after)
+        if before:
+            mask &= column <= _to_datetime64(before)
+        return mask
+
+    def _filter_mask(self, snap: _Snapshot, regions: Optional[List[str]] = None,
+                     procurement_method: Optional[str] = None,
+                     procurement_category: Optional[List[str]] = None,
+                     notice_type: Optional[List[str]] = None,
+                     status: Optional[List[str]] = None,
+                     contracting_entity_name: Optional[List[str]] = None,
+                     closing_date_after: Optional[str] = None,
+                     closing_date_before: Optional[str] = None,
+                     publication_date_after: Optional[str] = None,
+                     publication_date_before: Optional[str] = None) -> np.ndarray:
+        """Boolean row mask equivalent to SearchService._build_filters"""
+        mask = np.ones(len(snap), dtype=bool)
+        partial_masks = [
+            self._category_mask(snap, "delivery_location", regions),
+            self._category_mask(snap, "procurement_method", [procurement_method] if procurement_method else None),
+            self._category_mask(snap, "category_primary", procurement_category),
+            self._category_mask(snap, "procurement_type", notice_type),
+            self._category_mask(snap, "status", status),
+            self._category_mask(snap, "contracting_entity_name", contracting_entity_name),
+            self._date_mask(snap, "closing_date", closing_date_after, closing_date_before),
+            self._date_mask(snap, "published_date", publication_date_after, publication_date_before),
+        ]
+        for partial in partial_masks:
+            if partial is not None:
+                mask &= partial
+        return mask
+
+    def _archived_mask(self, snap: _Snapshot, closed_statuses: List[str]) -> np.ndarray:
+        """Rows that are closed by status (case-insensitive) or past their closing date"""
+        closed_codes = np.flatnonzero(np.isin(np.char.lower(snap.vocab["status"]), np.asarray(closed_statuses, dtype=str)))
+        closing = snap.dates["closing_date"]
+        expired = ~np.isnat(closing) & (closing < np.datetime64("now", "s"))
+        return np.isin(snap.codes["status"], closed_codes) | expired
+
+    def search(self, query_vector: List[float], limit: int = 20,
+               exclude_closed_statuses: Optional[List[str]] = None, **filters) -> List[Tuple[str, float]]:
+        """Top-k (id, cosine similarity) among rows passing the filters, optionally open tenders only"""
+        snap = self._snapshot
+        if snap is None or len(snap) == 0 or limit <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        scores = snap.embeddings @ query
+        mask = self._filter_mask(snap, **filters)
+        if exclude_closed_statuses:
+            mask &= ~self._archived_mask(snap, exclude_closed_statuses)
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+        candidate_scores = scores[candidates]
+        if len(candidates) > limit:
+            top = np.argpartition(-candidate_scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        # Same tie-break as the ES query: score desc, then soonest closing date
+        closing = snap.dates["closing_date"][candidates[top]].astype("int64").astype(np.float64)
+        closing[np.isnat(snap.dates["closing_date"][candidates[top]])] = np.inf
+        order = np.lexsort((closing, -candidate_scores[top]))
+        rows = candidates[top][order]
+        return [(str(snap.ids[row]), float(scores[row])) for row in rows]